@@ -0,0 +1,108 @@
+"""compare the throughput of concurrent page reads on the sync and async crud layers
+
+every query against the `slow_user` view waits `latency` seconds in the database, like
+a busy server would, the sync layer serves one read at a time per worker thread while
+the async layer awaits all of them on one event loop
+
+needs `sqlalchemy[asyncio]` and `aiosqlite`
+run with: python -m benchmarks.bench_concurrency [reads] [latency_ms]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+from flask import Flask
+from sqlalchemy import Column
+from sqlalchemy import event
+from sqlalchemy import Integer
+from sqlalchemy import String
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+
+from flask_model_management.async_crud import get_async_crud
+from flask_model_management.crud import get_crud
+from flask_model_management.domain import Model
+from flask_model_management.manager import ModelManager
+from flask_model_management.paging import Page
+from tests.models import db
+from tests.models import populate
+
+
+class SlowUser(db.Model):
+    __tablename__ = "slow_user"
+
+    id = Column(Integer, primary_key=True)
+    first_name = Column(String)
+    last_name = Column(String)
+
+
+def add_sleep(engine, latency):
+    @event.listens_for(engine, "connect")
+    def connect(dbapi_connection, connection_record):
+        dbapi_connection.create_function("sleep", 0, lambda: time.sleep(latency) or 1)
+
+
+def create_app(path, latency):
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{path}"
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {"connect_args": {"check_same_thread": False}}
+    db.init_app(app)
+
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=NullPool)
+    add_sleep(async_engine.sync_engine, latency)
+
+    manager = ModelManager(db=db, async_engine=async_engine)
+    manager.register_model(SlowUser)
+    manager.init_app(app)
+
+    with app.app_context():
+        add_sleep(db.engine, latency)
+        # every table `populate` seeds, `slow_user` is a view over `user`
+        tables = [table for table in db.metadata.sorted_tables if table is not SlowUser.__table__]
+        db.metadata.create_all(db.engine, tables=tables)
+        populate(db.session)
+        # the scalar subquery makes each statement wait once, not once per row
+        db.session.execute(
+            text(
+                "CREATE VIEW slow_user AS SELECT id, first_name, last_name FROM user "
+                "WHERE (SELECT sleep()) = 1"
+            )
+        )
+        db.session.commit()
+
+    return app, async_engine
+
+
+def bench_sync(model, reads):
+    started = time.perf_counter()
+    for _ in range(reads):
+        get_crud().read_page(model, {}, Page())
+    return reads / (time.perf_counter() - started)
+
+
+async def bench_async(model, reads):
+    started = time.perf_counter()
+    await asyncio.gather(*[get_async_crud().read_page(model, {}, Page()) for _ in range(reads)])
+    return reads / (time.perf_counter() - started)
+
+
+def main(reads=50, latency_ms=50):
+    directory = tempfile.mkdtemp()
+    app, async_engine = create_app(os.path.join(directory, "bench.db"), latency_ms / 1000)
+    model = Model(SlowUser)
+
+    with app.app_context():
+        sync = bench_sync(model, reads)
+        asynchronous = asyncio.run(bench_async(model, reads))
+        asyncio.run(async_engine.dispose())
+
+    print(f"{reads} page reads with {latency_ms}ms of database latency per query")
+    print(f"sync  {sync:>8.1f} reads/s")
+    print(f"async {asynchronous:>8.1f} reads/s ({asynchronous / sync:.1f}x)")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,207 @@
+"""latency, throughput and peak memory of every endpoint at growing table sizes
+
+each case is run through the test client against the `tests/models.py` models, the
+`user` table is rebuilt with `size` synthetic rows before each size is measured
+
+run with: python -m benchmarks.bench_endpoints [--sizes 1000,100000,1000000]
+          [--url postgresql://localhost/bench] [--repeat 5] [--output results.json]
+compare two runs with: python -m benchmarks.compare before.json after.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from importlib.metadata import version
+
+import sqlalchemy
+from flask import Flask
+from sqlalchemy import insert
+from sqlalchemy import text
+
+from flask_model_management.manager import ModelManager
+from tests.models import db
+from tests.models import random_type_table_mock_data
+from tests.models import RandomTypeTable
+from tests.models import User
+
+DEFAULT_SIZES = (1000, 100000)
+DEFAULT_REPEAT = 5
+
+# how many rows are inserted per statement when loading a table
+LOAD_BATCH_SIZE = 10000
+
+# how many rows the bulk update & delete cases change
+MUTATE_ROWS = 1000
+
+API = "/model-management/api/user"
+
+
+def create_app(url):
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = url
+    db.init_app(app)
+
+    manager = ModelManager(db=db)
+    manager.register_model(User)
+    manager.register_model(RandomTypeTable)
+    manager.init_app(app)
+    return app
+
+
+def load(size):
+    """Replace the user table with `size` synthetic rows"""
+    db.drop_all()
+    db.create_all()
+    for start in range(0, size, LOAD_BATCH_SIZE):
+        rows = [
+            {"first_name": f"first {i}", "last_name": f"last {i % 100}", "is_admin": i % 2 == 0}
+            for i in range(start, min(start + LOAD_BATCH_SIZE, size))
+        ]
+        db.session.execute(insert(User.__table__), rows)
+    db.session.execute(insert(RandomTypeTable.__table__), random_type_table_mock_data)
+    db.session.commit()
+    if db.engine.dialect.name in ("sqlite", "postgresql"):
+        db.session.execute(text("ANALYZE"))
+        db.session.commit()
+
+
+def check(resp):
+    assert resp.status_code == 200, resp.status_code
+    if resp.is_json:
+        assert resp.json["success"], resp.json["message"]
+    return resp
+
+
+def cases(client, size):
+    """(name, rows handled per call, call) for a table of `size` rows"""
+    last = size - MUTATE_ROWS
+    yield "create", 1, lambda: check(client.post(API, data={"insert_first_name": "new"}))
+    yield "read_all", size, lambda: check(client.get(API))
+    yield "read_filtered", size // 100, lambda: check(
+        client.get(API, query_string={"filter_last_name": "last 1"})
+    )
+    yield "read_columnar", size, lambda: check(
+        client.get(API, query_string={"columns": "id,first_name", "orient": "columns"})
+    )
+    yield "read_page", 10, lambda: check(
+        client.get(API, query_string={"draw": 1, "start": size // 2, "length": 10})
+    )
+    yield "read_single", 1, lambda: check(client.get(f"{API}/{size // 2}"))
+    yield "export_ndjson", size, lambda: check(client.get(f"{API}/export")).data
+    yield "update_bulk", MUTATE_ROWS, lambda: check(
+        client.put(API, data={"filter_id__gt": last, "insert_last_name": "updated"})
+    )
+    yield "render_read_page", 0, lambda: check(client.get("/model-management/user/read"))
+    yield "render_update_form", 0, lambda: check(
+        client.get("/model-management/user/update", query_string={"filter_id": 1})
+    )
+    yield "render_table", 0, lambda: check(client.get("/model-management/user/"))
+    # last as it changes what the other cases would read
+    yield "delete_bulk", MUTATE_ROWS, lambda: check(
+        client.delete(API, data={"filter_id__gt": last})
+    )
+
+
+def measure(call, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        call()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def peak_memory(call):
+    tracemalloc.start()
+    try:
+        call()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def bench(app, size, repeat):
+    client = app.test_client()
+    with app.app_context():
+        load(size)
+
+    results = []
+    for name, rows, call in cases(client, size):
+        # bulk deletes can only run once per load so they're measured once
+        runs = 1 if name == "delete_bulk" else repeat
+        memory = peak_memory(call) if name != "delete_bulk" else None
+        timings = measure(call, runs)
+        median = statistics.median(timings)
+        results.append(
+            {
+                "case": name,
+                "size": size,
+                "rows": rows,
+                "repeat": runs,
+                "min_ms": min(timings) * 1000,
+                "median_ms": median * 1000,
+                "max_ms": max(timings) * 1000,
+                "requests_per_s": 1 / median,
+                "rows_per_s": rows / median if rows else None,
+                "peak_memory_kb": memory / 1024 if memory is not None else None,
+            }
+        )
+    return results
+
+
+def environment(url):
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True
+        ).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        "commit": commit or None,
+        "python": platform.python_version(),
+        "flask": version("flask"),
+        "sqlalchemy": version("sqlalchemy"),
+        "dialect": sqlalchemy.engine.make_url(url).get_backend_name(),
+        "machine": platform.machine(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default=",".join(str(size) for size in DEFAULT_SIZES))
+    parser.add_argument("--url", help="database url, default is a temporary sqlite file")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--output", help="write the results as json here, default is stdout")
+    args = parser.parse_args(argv)
+
+    url = args.url or "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+    app = create_app(url)
+
+    results = []
+    for size in [int(size) for size in args.sizes.split(",")]:
+        for result in bench(app, size, args.repeat):
+            results.append(result)
+            print(
+                f"{result['case']:<20} {size:>9} rows {result['median_ms']:>10.2f} ms "
+                f"{result['requests_per_s']:>9.1f} req/s "
+                f"{(result['peak_memory_kb'] or 0) / 1024:>8.1f} MB peak",
+                file=sys.stderr,
+            )
+
+    report = json.dumps({"environment": environment(url), "results": results}, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report)
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""compare the encode time and size of a bulk read in each response format: json (by row
+and by column), msgpack and arrow, and json compressed with gzip and zstd
+
+times include serializing the rows, but not reading them from the database, formats
+whose library isn't installed are skipped
+run with: python -m benchmarks.bench_formats [rows]
+"""
+import json
+import sys
+import timeit
+
+from sqlalchemy import create_engine
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from benchmarks.bench_serialize import load
+from flask_model_management.domain import Model
+from flask_model_management.export import arrow_encoder
+from flask_model_management.export import msgpack
+from flask_model_management.export import pyarrow
+from flask_model_management.formats import compress
+from flask_model_management.formats import zstandard
+from tests.models import db
+from tests.models import RandomTypeTable
+from tests.models import User
+
+
+def encoders(model, rows):
+    serializer = model.serializer
+
+    def to_json():
+        return json.dumps(serializer.rows(rows)).encode()
+
+    def to_json_columnar():
+        return json.dumps(serializer.columnar(serializer.rows(rows))).encode()
+
+    cases = {
+        "json": to_json,
+        "json_columnar": to_json_columnar,
+        "json+gzip": lambda: compress(to_json(), "gzip"),
+    }
+    if zstandard is not None:
+        cases["json+zstd"] = lambda: compress(to_json(), "zstd")
+    if msgpack is not None:
+        cases["msgpack"] = lambda: msgpack.packb(serializer.rows(rows))
+    if pyarrow is not None:
+        cases["arrow"] = lambda: b"".join(arrow_encoder(model.columns, rows))
+        if zstandard is not None:
+            cases["arrow+zstd"] = lambda: compress(cases["arrow"](), "zstd")
+    return cases
+
+
+def bench(model, rows, repeat=5):
+    results = {}
+    for name, encode in encoders(model, rows).items():
+        seconds = min(timeit.repeat(encode, number=1, repeat=repeat))
+        results[name] = {
+            "us_per_row": seconds / len(rows) * 1e6,
+            "bytes_per_row": len(encode()) / len(rows),
+        }
+    return results
+
+
+def main(rows=10000):
+    engine = create_engine("sqlite://")
+    db.metadata.create_all(engine)
+    with Session(engine) as session:
+        for model in (User, RandomTypeTable):
+            load(session, model, rows)
+            model = Model(model)
+            table_rows = session.execute(select(*model.model.__table__.columns)).all()
+            for name, result in bench(model, table_rows).items():
+                print(
+                    f"{model.name:<20} {name:<16} "
+                    f"{result['us_per_row']:>8.2f} us/row "
+                    f"{result['bytes_per_row']:>8.1f} bytes/row"
+                )
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
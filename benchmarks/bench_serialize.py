@@ -0,0 +1,71 @@
+"""compare the old `parse_entry` serialization with the compiled `Serializer`
+
+run with: python -m benchmarks.bench_serialize [rows]
+"""
+
+import json
+import sys
+import timeit
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from flask_model_management.domain import Model
+from tests.models import db
+from tests.models import random_type_table_mock_data
+from tests.models import RandomTypeTable
+from tests.models import User
+
+
+def parse_entry(row):
+    """the serialization used before `Serializer`, kept here as the baseline"""
+    return {
+        k: str(v) if v else "NULL" for k, v in row.__dict__.items() if k != "_sa_instance_state"
+    }
+
+
+def load(session, model, rows):
+    if model is RandomTypeTable:
+        session.add_all(RandomTypeTable(**random_type_table_mock_data[0]) for _ in range(rows))
+    else:
+        session.add_all(User(first_name=f"first {i}", last_name=f"last {i}") for i in range(rows))
+    session.commit()
+    return session.query(model).all()
+
+
+def bench(model, entries, repeat=10):
+    serializer = Model(model).serializer
+    results = {}
+    for name, serialize in (
+        ("parse_entry", lambda: [parse_entry(e) for e in entries]),
+        ("serializer", lambda: serializer.entries(entries)),
+        ("serializer_columnar", lambda: serializer.columnar(serializer.entries(entries))),
+    ):
+        seconds = min(timeit.repeat(serialize, number=1, repeat=repeat))
+        with_json = min(timeit.repeat(lambda: json.dumps(serialize()), number=1, repeat=repeat))
+        payload = json.dumps(serialize())
+        results[name] = {
+            "us_per_row": seconds / len(entries) * 1e6,
+            "us_per_row_with_json": with_json / len(entries) * 1e6,
+            "bytes_per_row": len(payload) / len(entries),
+        }
+    return results
+
+
+def main(rows=10000):
+    engine = create_engine("sqlite://")
+    db.metadata.create_all(engine)
+    with Session(engine) as session:
+        for model in (User, RandomTypeTable):
+            entries = load(session, model, rows)
+            for name, result in bench(model, entries).items():
+                print(
+                    f"{model.__tablename__:<20} {name:<20} "
+                    f"{result['us_per_row']:>8.2f} us/row "
+                    f"{result['us_per_row_with_json']:>8.2f} us/row with json "
+                    f"{result['bytes_per_row']:>8.1f} bytes/row"
+                )
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,90 @@
+"""compare the startup cost of registering every model with `register_model` against
+`register_base`, which only registers a model when it is first used
+
+startup is timed from registration to the first response of the index page
+run with: python -m benchmarks.bench_startup [models ...]
+"""
+import sys
+import time
+
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import Boolean
+from sqlalchemy import Column
+from sqlalchemy import DateTime
+from sqlalchemy import Integer
+from sqlalchemy import String
+from sqlalchemy.orm import declarative_base
+
+from flask_model_management.manager import ModelManager
+
+DEFAULT_MODELS = (10, 100, 400, 1000)
+
+
+def make_models(count):
+    base = declarative_base()
+    models = [
+        type(
+            f"Model{i}",
+            (base,),
+            {
+                "__tablename__": f"model_{i}",
+                "id": Column(Integer, primary_key=True),
+                "name": Column(String(255), nullable=False),
+                "description": Column(String),
+                "active": Column(Boolean, default=True),
+                "created_at": Column(DateTime),
+            },
+        )
+        for i in range(count)
+    ]
+    return base, models
+
+
+def startup(register):
+    started = time.perf_counter()
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    manager = ModelManager(db=SQLAlchemy(app))
+    register(manager)
+    manager.init_app(app)
+    assert app.test_client().get("/model-management/").status_code == 200
+    return time.perf_counter() - started
+
+
+def first_use(register, tablename):
+    """The cost of the first visit to one model's page after startup"""
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    db = SQLAlchemy(app)
+    manager = ModelManager(db=db)
+    register(manager)
+    manager.init_app(app)
+    started = time.perf_counter()
+    app.test_client().get(f"/model-management/{tablename}/read")
+    return time.perf_counter() - started
+
+
+def main(*counts):
+    print(f"{'models':>8} {'register_model':>16} {'register_base':>16} {'first use':>12}")
+    for count in counts or DEFAULT_MODELS:
+        base, models = make_models(count)
+
+        def eager(manager):
+            for model in models:
+                manager.register_model(model)
+
+        def lazy(manager):
+            manager.register_base(base)
+
+        eager_seconds = min(startup(eager) for _ in range(3))
+        lazy_seconds = min(startup(lazy) for _ in range(3))
+        first_use_seconds = min(first_use(lazy, "model_0") for _ in range(3))
+        print(
+            f"{count:>8} {eager_seconds * 1000:>13.1f} ms {lazy_seconds * 1000:>13.1f} ms "
+            f"{first_use_seconds * 1000:>9.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
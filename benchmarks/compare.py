@@ -0,0 +1,50 @@
+"""compare two `bench_endpoints` results and flag the cases that got slower
+
+run with: python -m benchmarks.compare before.json after.json [--threshold 10]
+exits with 1 if any case's median got slower by more than the threshold (in percent)
+"""
+
+import argparse
+import json
+import sys
+
+DEFAULT_THRESHOLD = 10
+
+
+def load(path):
+    with open(path) as f:
+        report = json.load(f)
+    return report["environment"], {(r["case"], r["size"]): r for r in report["results"]}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    before_environment, before = load(args.before)
+    after_environment, after = load(args.after)
+    print(f"before: {before_environment}")
+    print(f"after:  {after_environment}")
+
+    regressions = 0
+    for key in sorted(before.keys() & after.keys(), key=lambda key: (key[1], key[0])):
+        old, new = before[key]["median_ms"], after[key]["median_ms"]
+        change = (new - old) / old * 100 if old else 0
+        flag = ""
+        if change > args.threshold:
+            flag = "  SLOWER"
+            regressions += 1
+        elif change < -args.threshold:
+            flag = "  faster"
+        print(
+            f"{key[0]:<20} {key[1]:>9} rows {old:>10.2f} -> {new:>10.2f} ms {change:>+7.1f}%{flag}"
+        )
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+import gzip
+import hashlib
+import mimetypes
+import threading
+
+import attr
+from flask import abort
+from flask import request
+from flask import Response
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+# a url with the asset's digest never changes so it can be cached for a year
+IMMUTABLE = "public, max-age=31536000, immutable"
+# without it the browser has to check it still has the latest version
+REVALIDATE = "no-cache"
+
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg")
+
+
+def compress(content, mimetype):
+    """The encodings an asset can be sent with, compressed once when it is first read"""
+    encodings = {}
+    if not mimetype.startswith(COMPRESSIBLE_TYPES):
+        return encodings
+
+    if brotli is not None:
+        encodings["br"] = brotli.compress(content)
+    encodings["gzip"] = gzip.compress(content, compresslevel=9, mtime=0)
+    return encodings
+
+
+@attr.s
+class Asset:
+    content = attr.ib(repr=False)
+    mimetype = attr.ib()
+    digest = attr.ib()
+    encodings = attr.ib(factory=dict, repr=False)
+
+    @classmethod
+    def from_path(cls, path):
+        with open(path, "rb") as f:
+            content = f.read()
+        mimetype = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        digest = hashlib.sha256(content).hexdigest()[:16]
+        return cls(content, mimetype, digest, compress(content, mimetype))
+
+    def encoding_for(self, accept_encodings):
+        for encoding in ("br", "gzip"):
+            if encoding in self.encodings and accept_encodings[encoding]:
+                return encoding
+        return None
+
+
+@attr.s
+class StaticAssets:
+    """The blueprint's static files, served with content hashed urls
+
+    `url_params` adds the digest of a file to its url as `v`, a request with the right
+    digest is cached for good by the browser (a new version has a new url), every file
+    is read, hashed and compressed once and then served from memory
+    """
+
+    directory = attr.ib()
+    _assets = attr.ib(factory=dict, repr=False)
+    _lock = attr.ib(factory=threading.Lock, repr=False)
+
+    def get(self, filename):
+        with self._lock:
+            if filename not in self._assets:
+                path = safe_join(str(self.directory), filename)
+                try:
+                    asset = Asset.from_path(path) if path else None
+                except OSError:
+                    asset = None
+                # only files that exist are kept so made up names can't fill the memory
+                if asset is None:
+                    return None
+                self._assets[filename] = asset
+            return self._assets[filename]
+
+    def url_params(self, filename):
+        asset = self.get(filename)
+        return {"v": asset.digest} if asset is not None else {}
+
+    def send(self, filename):
+        asset = self.get(filename)
+        if asset is None:
+            abort(404)
+
+        encoding = asset.encoding_for(request.accept_encodings)
+        response = Response(
+            asset.encodings[encoding] if encoding else asset.content, mimetype=asset.mimetype
+        )
+        if encoding:
+            response.content_encoding = encoding
+        response.vary.add("Accept-Encoding")
+        response.set_etag(asset.digest + (f"-{encoding}" if encoding else ""))
+        response.headers["Cache-Control"] = (
+            IMMUTABLE if request.args.get("v") == asset.digest else REVALIDATE
+        )
+        return response.make_conditional(request)
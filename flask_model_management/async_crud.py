@@ -0,0 +1,210 @@
+"""The read operations on an `AsyncSession`, needs `sqlalchemy[asyncio]` & `flask[async]`"""
+import asyncio
+import time
+from functools import partial
+
+import attr
+from flask import current_app
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.pool import NullPool
+
+from .crud import CRUD
+from .crud import CRUDApplication
+from .crud import CRUDFailure
+from .crud import get_counter
+from .crud import get_result_cache
+from .crud import log_operation
+from .etags import read_fingerprint
+from .instrumentation import phase
+from .limits import LimitExceeded
+from .limits import statement_timeout
+from .limits import StatementTimeout
+
+# how long after its statement timeout a query the database didn't stop is cancelled
+STATEMENT_TIMEOUT_GRACE = 1
+
+
+def create_async_sessionmaker(engine):
+    """Flask runs each async view on an event loop of its own, a connection pooled on
+    one loop can't be used on the next so the engine mustn't pool them"""
+    if not isinstance(engine.pool, NullPool):
+        raise ValueError(
+            "The async_engine must not pool connections, create it with poolclass=NullPool"
+        )
+    return async_sessionmaker(engine, expire_on_commit=False)
+
+
+def get_async_session():
+    return current_app.extensions["model_management"].async_session()
+
+
+def get_async_crud():
+    return AsyncCRUDApplication(AsyncCRUD)
+
+
+async def run_sync(session, seconds, fn, *args):
+    """Await `fn(sync_session, *args)` on an `AsyncSession` within a statement timeout,
+    the dialect's own, and for dialects or drivers that don't enforce it the statement
+    is cancelled `STATEMENT_TIMEOUT_GRACE` seconds later"""
+    if not seconds:
+        return await session.run_sync(fn, *args)
+
+    def timed(sync_session, *args):
+        with statement_timeout(sync_session, seconds):
+            return fn(sync_session, *args)
+
+    try:
+        return await asyncio.wait_for(
+            session.run_sync(timed, *args), seconds + STATEMENT_TIMEOUT_GRACE
+        )
+    except asyncio.TimeoutError as e:
+        raise StatementTimeout(f"Cancelled after the {seconds}s statement timeout") from e
+
+
+@attr.s
+class AsyncCRUD(CRUD):
+    """`CRUD` reads awaited on an `AsyncSession`, so a slow query waits on the event
+    loop instead of holding a thread
+
+    Statements are built by `CRUD` so the results are the same, every query has its
+    own session so the queries of one read can run at the same time
+    """
+
+    async def run(self, fn, *args):
+        """Await `fn(sync_session, *args)` on a new session within the statement timeout"""
+        async with get_async_session() as session:
+            try:
+                return await run_sync(session, self.limits.statement_timeout, fn, *args)
+            except Exception as e:
+                raise CRUDFailure(str(e), "read") from e
+
+    async def execute(self, statement) -> list:
+        return await self.run(lambda session: session.execute(statement).all())
+
+    async def run_count(self, count, criteria=(), key=None):
+        """Run a sync `count(session, criteria, key)` e.g. `counting.Counter.count`"""
+        return await self.run(count, criteria, key)
+
+    async def read_one(self, identity: tuple):
+        return await self.run(lambda session: session.get(self.model, identity))
+
+    async def get_criteria(self, filter_by: dict) -> list:
+        """`CRUD.get_criteria` with `check_indexed`'s query awaited"""
+        criteria = self.compile_criteria(filter_by)
+        await self.run(lambda session: self.check_indexed(filter_by, session))
+        return criteria
+
+    async def read(self, filter_by: dict, columns=None) -> list:
+        criteria = await self.get_criteria(filter_by)
+        rows = await self.execute(self.limit_rows(self.get_select(filter_by, columns, criteria)))
+        try:
+            self.check_rows(rows)
+        except LimitExceeded as e:
+            raise CRUDFailure(str(e), "read") from e
+        return rows
+
+    async def read_labels(self, references: dict, rows) -> dict:
+        selects = self.get_label_selects(references, rows)
+        results = await asyncio.gather(*[self.execute(statement) for _, statement in selects])
+        return self.collect_labels(selects, results)
+
+    async def read_page(self, filter_by: dict, page, columns=None, count=None) -> tuple:
+        """Like `CRUD.read_page` but the page and its counts are queried concurrently"""
+        count = count or self.exact_count
+        try:
+            self.check_page(page)
+        except LimitExceeded as e:
+            raise CRUDFailure(str(e), "read") from e
+
+        criteria = await self.get_criteria(filter_by)
+        criteria += self.get_search_criteria(page.search, page.search_columns)
+        statement = self.paginate(self.get_select(filter_by, columns, criteria), page)
+
+        queries = [self.execute(statement), self.run_count(count)]
+        if criteria:
+            queries.append(self.run_count(count, criteria, self.count_key(filter_by, page)))
+
+        rows, records_total, *records_filtered = await asyncio.gather(*queries)
+        return rows, records_total, records_filtered[0] if records_filtered else records_total
+
+
+@attr.s
+class AsyncCRUDApplication(CRUDApplication):
+    """`CRUDApplication` with its reads awaited, writes are inherited and stay sync"""
+
+    async def fingerprint(self, model):
+        """The model's `etags.read_fingerprint`"""
+        return await self.crud_for(model).run(
+            read_fingerprint, model.model.__table__, model.fingerprint
+        )
+
+    async def read_single(self, model, identity):
+        started = time.perf_counter()
+        with phase("query"):
+            entry = await self.crud_for(model).read_one(identity)
+        with phase("serialize"):
+            result = model.serializer.entry(entry) if entry is not None else None
+        log_operation("READ SINGLE", started, result, table=model.name, identity=identity)
+        return result
+
+    async def cached(self, model, operation, parts, read, depends_on=()):
+        cache = get_result_cache([model.name, *depends_on])
+        if cache is None:
+            return await read()
+
+        started = time.perf_counter()
+        key = cache.key(model.name, operation, *parts, depends_on=depends_on)
+        with phase("cache"):
+            result = cache.get(model.name, key)
+        if result is not None:
+            log_operation(f"{operation} CACHED", started, None, table=model.name, parts=parts)
+            return result
+
+        result = await read()
+        with phase("cache"):
+            cache.set(key, result)
+        return result
+
+    async def read_bulk(self, model, filter_by, columns=None, columnar=False):
+        parts = self.read_parts(filter_by, columns, columnar)
+        read = partial(self.read_bulk_uncached, model, filter_by, columns, columnar)
+        return await self.cached(model, "READ", parts, read)
+
+    async def read_bulk_uncached(self, model, filter_by, columns=None, columnar=False):
+        started = time.perf_counter()
+        with phase("query"):
+            rows = await self.crud_for(model).read(filter_by, columns or model.column_names)
+        with phase("serialize"):
+            rows, result = self.serialize_rows(model, rows, columnar)
+        log_operation("READ", started, rows, table=model.name, filter=filter_by)
+        return result
+
+    async def read_arrow(self, model, filter_by, columns=None):
+        started = time.perf_counter()
+        with phase("query"):
+            rows = await self.crud_for(model).read(filter_by, columns or model.column_names)
+        result = self.encode_arrow(model, rows, columns)
+        log_operation("READ", started, None, table=model.name, filter=filter_by, format="arrow")
+        return result
+
+    async def read_page(self, model, filter_by, page, columns=None, columnar=False):
+        parts = self.read_parts(filter_by, columns, columnar, page)
+        read = partial(self.read_page_uncached, model, filter_by, page, columns, columnar)
+        result = await self.cached(model, "READ PAGE", parts, read, model.referenced_tablenames)
+        # a page asked for without `draw` has a url that stays the same, see `conditional`
+        return dict(result, draw=page.draw) if page.draw is not None else result
+
+    async def read_page_uncached(self, model, filter_by, page, columns=None, columnar=False):
+        started = time.perf_counter()
+        with phase("query"):
+            rows, records_total, records_filtered = await self.crud_for(model).read_page(
+                filter_by,
+                page,
+                columns or model.column_names,
+                count=partial(get_counter().count, model),
+            )
+            references = self.page_references(model, columns)
+            labels = await self.crud_for(model).read_labels(references, rows)
+        return self.page_result(
+            model, filter_by, page, rows, records_total, records_filtered, columnar, started, labels
+        )
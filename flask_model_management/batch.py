@@ -0,0 +1,85 @@
+import attr
+from werkzeug.datastructures import MultiDict
+
+from .crud import get_crud
+from .limits import LimitExceeded
+
+BATCH_OPERATIONS = ("create", "update", "delete")
+
+# how many operations one batch, and so one transaction, can have
+MAX_BATCH_OPERATIONS = 1000
+
+
+def batch_form_data(filter_by, insert) -> MultiDict:
+    """Turn the `filter` and `insert` objects of a batch operation into the form data
+    its model's form expects"""
+    form_data = MultiDict()
+    for prefix, values in (("filter_", filter_by), ("insert_", insert)):
+        for k, v in (values or {}).items():
+            if v is not None and v != "":
+                form_data.add(prefix + k, str(v))
+
+    return form_data
+
+
+@attr.s
+class BatchOperation:
+    """One create, update or delete of a batch, validated by its model's form"""
+
+    model = attr.ib()
+    operation = attr.ib()
+    form = attr.ib()
+
+    @property
+    def filter_params(self):
+        return self.form.filter_params if self.operation != "create" else None
+
+    @property
+    def insert_params(self):
+        return self.form.insert_params if self.operation != "delete" else None
+
+
+def parse_batch(entries, get_model) -> tuple:
+    """Validate every posted operation before any of them is run
+
+    `entries` are objects like `{"tablename": "user", "operation": "update", "filter":
+    {"id": 1}, "insert": {"is_admin": true}}`, returns the `BatchOperation`s and the
+    errors by the index of their entry, which are empty when the batch is valid
+
+    Filters are checked against the `unindexed_filter_rows` limit here too, as checking
+    it between operations would query the tables halfway through the transaction
+    """
+    if not isinstance(entries, list) or not all(isinstance(entry, dict) for entry in entries):
+        return [], [{"index": None, "message": "Expected a json array of operations"}]
+    if len(entries) > MAX_BATCH_OPERATIONS:
+        message = f"A batch can have at most {MAX_BATCH_OPERATIONS} operations"
+        return [], [{"index": None, "message": message}]
+
+    operations = []
+    errors = []
+    for index, entry in enumerate(entries):
+        model = get_model(str(entry.get("tablename")))
+        operation = entry.get("operation")
+        if model is None:
+            errors.append({"index": index, "message": f"Unknown table: {entry.get('tablename')}"})
+            continue
+        if operation not in BATCH_OPERATIONS or operation not in model.operations:
+            message = f"Operations can only {', '.join(BATCH_OPERATIONS)} {model.name}"
+            errors.append({"index": index, "message": message})
+            continue
+
+        form = model.form(operation, batch_form_data(entry.get("filter"), entry.get("insert")))
+        if not form.validate():
+            errors.append({"index": index, "message": f"Invalid query fields: {form.errors}"})
+            continue
+
+        if operation != "create":
+            try:
+                get_crud().crud_for(model).check_indexed(form.filter_params)
+            except LimitExceeded as e:
+                errors.append({"index": index, "message": str(e)})
+                continue
+
+        operations.append(BatchOperation(model, operation, form))
+
+    return operations, errors
@@ -0,0 +1,141 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+import attr
+
+DEFAULT_CACHE_SIZE = 1024
+
+# how long a cached read is used for, in seconds
+DEFAULT_CACHE_TTL = 60
+
+CACHE_PREFIX = "model_management"
+
+
+@attr.s
+class LocalCache:
+    """An in-process, size bounded LRU cache with expiry
+
+    It has the same `get`/`set`/`incr` methods as a redis client so it can stand in for
+    one, counters are kept apart from the values so they are never evicted
+    """
+
+    max_size = attr.ib(default=DEFAULT_CACHE_SIZE)
+    _values = attr.ib(factory=OrderedDict, repr=False)
+    _counters = attr.ib(factory=dict, repr=False)
+    _lock = attr.ib(factory=threading.Lock, repr=False)
+
+    def get(self, key):
+        with self._lock:
+            if key in self._counters:
+                # like redis, counters are read back as strings
+                return str(self._counters[key])
+
+            item = self._values.get(key)
+            if item is None:
+                return None
+
+            expires, value = item
+            if expires is not None and expires <= time.monotonic():
+                del self._values[key]
+                return None
+
+            self._values.move_to_end(key)
+            return value
+
+    def set(self, key, value, ex=None):
+        expires = time.monotonic() + ex if ex else None
+        with self._lock:
+            self._values[key] = (expires, value)
+            self._values.move_to_end(key)
+            while len(self._values) > self.max_size:
+                self._values.popitem(last=False)
+
+    def incr(self, key):
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def __len__(self):
+        return len(self._values)
+
+
+@attr.s
+class RedisCache:
+    """A redis (or redis-like) client as a cache backend, values are stored as json
+
+    The client's own eviction bounds its size, use a `volatile-*` policy so the
+    table versions (which have no expiry) are kept
+    """
+
+    client = attr.ib()
+
+    def get(self, key):
+        value = self.client.get(key)
+        return json.loads(value) if value is not None else None
+
+    def set(self, key, value, ex=None):
+        self.client.set(key, json.dumps(value), ex=ex)
+
+    def incr(self, key):
+        return self.client.incr(key)
+
+
+@attr.s
+class ResultCache:
+    """Caches the results of reads until they expire or this extension writes to the table
+
+    Every table has a version which is part of each key, a write bumps the version so
+    all of the table's cached reads are skipped at once without having to find them
+    """
+
+    backend = attr.ib(factory=LocalCache)
+    ttl = attr.ib(default=DEFAULT_CACHE_TTL)
+    prefix = attr.ib(default=CACHE_PREFIX)
+    _hits = attr.ib(factory=dict, repr=False)
+    _misses = attr.ib(factory=dict, repr=False)
+    _lock = attr.ib(factory=threading.Lock, repr=False)
+
+    def version(self, tablename):
+        return int(self.backend.get(f"{self.prefix}:version:{tablename}") or 0)
+
+    def key(self, tablename, *parts, depends_on=()):
+        """A key for a read of a table, `parts` are anything that changes its result and
+        `depends_on` other tables it reads, a write to any of them changes the key"""
+        if depends_on:
+            parts += tuple((name, self.version(name)) for name in depends_on)
+        digest = hashlib.sha1(repr(parts).encode()).hexdigest()
+        return f"{self.prefix}:{tablename}:{self.version(tablename)}:{digest}"
+
+    def get(self, tablename, key):
+        value = self.backend.get(key)
+        counts = self._hits if value is not None else self._misses
+        with self._lock:
+            counts[tablename] = counts.get(tablename, 0) + 1
+        return value
+
+    def set(self, key, value):
+        self.backend.set(key, value, ex=self.ttl)
+
+    def invalidate(self, tablename):
+        self.backend.incr(f"{self.prefix}:version:{tablename}")
+
+    def summary(self):
+        """Hits, misses and hit ratio for each table"""
+        with self._lock:
+            tables = sorted(set(self._hits) | set(self._misses))
+            rows = []
+            for table in tables:
+                hits = self._hits.get(table, 0)
+                misses = self._misses.get(table, 0)
+                rows.append(
+                    {
+                        "table": table,
+                        "hits": hits,
+                        "misses": misses,
+                        "ratio": hits / (hits + misses),
+                    }
+                )
+        return rows
@@ -0,0 +1,130 @@
+import threading
+import time
+from collections import OrderedDict
+
+import attr
+from sqlalchemy import func
+from sqlalchemy import select
+from sqlalchemy import text
+
+EXACT = "exact"
+ESTIMATE = "estimate"
+CACHED = "cached"
+
+COUNT_STRATEGIES = (EXACT, ESTIMATE, CACHED)
+
+# how long a cached exact count is used for, in seconds
+DEFAULT_COUNT_TTL = 60
+# how many counts are cached, each filter and search of a table has its own
+DEFAULT_COUNT_CACHE_SIZE = 1024
+
+# the planner's own idea of how many rows a table has, which costs nothing to read
+# but is only as fresh as the last ANALYZE (or autovacuum)
+ESTIMATE_QUERIES = {
+    "postgresql": "SELECT reltuples FROM pg_class WHERE oid = to_regclass(:table)",
+    "sqlite": "SELECT stat FROM sqlite_stat1 WHERE tbl = :table",
+    "mysql": (
+        "SELECT table_rows FROM information_schema.tables "
+        "WHERE table_schema = DATABASE() AND table_name = :table"
+    ),
+}
+ESTIMATE_QUERIES["mariadb"] = ESTIMATE_QUERIES["mysql"]
+
+# sqlite_stat1 doesn't exist until the database is analyzed
+SQLITE_STAT_EXISTS = "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'"
+
+
+def parse_estimate(value):
+    if value is None:
+        return None
+    # sqlite_stat1 holds "<rows> <rows per index value> ..."
+    if isinstance(value, str):
+        value = value.split()[0]
+
+    # postgres uses -1 for a table that has never been analyzed
+    value = int(float(value))
+    return value if value >= 0 else None
+
+
+@attr.s
+class Count:
+    """The number of entries matching a filter and whether it is only an estimate"""
+
+    value = attr.ib()
+    estimated = attr.ib(default=False)
+
+
+@attr.s
+class Counter:
+    """Counts the entries of a table with the model's count strategy
+
+    - exact: a `COUNT(*)` every time
+    - estimate: the dialect's statistics for the whole table, an exact count for filters
+    - cached: an exact count, reused for the model's `count_ttl` seconds or until this
+      extension writes to the table, the least recently used of more than `max_size`
+      counts are dropped
+    """
+
+    max_size = attr.ib(default=DEFAULT_COUNT_CACHE_SIZE)
+    _cache = attr.ib(factory=OrderedDict, repr=False)
+    _lock = attr.ib(factory=threading.Lock, repr=False)
+
+    @staticmethod
+    def exact(session, table, criteria=()) -> int:
+        return session.execute(select(func.count()).select_from(table).where(*criteria)).scalar()
+
+    @staticmethod
+    def estimate(session, table):
+        dialect = session.get_bind().dialect.name
+        query = ESTIMATE_QUERIES.get(dialect)
+        if query is None:
+            return None
+
+        name = table.fullname if dialect == "postgresql" else table.name
+        # the session may be in the middle of someone else's transaction e.g. a batch, so
+        # a failure mustn't roll it back: sqlite is checked first, the rest use a savepoint
+        if dialect == "sqlite":
+            if session.execute(text(SQLITE_STAT_EXISTS)).scalar() is None:
+                return None
+            value = session.execute(text(query), {"table": name}).scalar()
+        else:
+            try:
+                with session.begin_nested():
+                    value = session.execute(text(query), {"table": name}).scalar()
+            except Exception:
+                return None
+
+        return parse_estimate(value)
+
+    def count(self, model, session, criteria=(), key=None) -> Count:
+        """Count entries of `model` matching `criteria`, `key` identifies the criteria
+        in the cache and is None for the whole table"""
+        table = model.model.__table__
+
+        if model.count_strategy == ESTIMATE and not criteria:
+            estimate = self.estimate(session, table)
+            if estimate is not None:
+                return Count(estimate, estimated=True)
+
+        if model.count_strategy != CACHED:
+            return Count(self.exact(session, table, criteria))
+
+        cache_key = (table.name, key)
+        with self._lock:
+            cached = self._cache.get(cache_key)
+            if cached is not None and cached[0] > time.monotonic():
+                self._cache.move_to_end(cache_key)
+                return Count(cached[1])
+
+        value = self.exact(session, table, criteria)
+        with self._lock:
+            self._cache[cache_key] = (time.monotonic() + model.count_ttl, value)
+            self._cache.move_to_end(cache_key)
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+        return Count(value)
+
+    def invalidate(self, tablename):
+        with self._lock:
+            for cache_key in [k for k in self._cache if k[0] == tablename]:
+                del self._cache[cache_key]
@@ -1,23 +1,171 @@
+import logging
+import operator
+import reprlib
+import time
+from functools import partial
+
 import attr
 from flask import current_app
+from sqlalchemy import and_
+from sqlalchemy import delete
+from sqlalchemy import func
+from sqlalchemy import insert as insert_
+from sqlalchemy import inspect
+from sqlalchemy import literal
+from sqlalchemy import or_
+from sqlalchemy import select
+from sqlalchemy import true
+from sqlalchemy import update
+from werkzeug.datastructures import MultiDict
+
+from .counting import Count
+from .counting import Counter
+from .etags import read_fingerprint
+from .explain import explain
+from .explain import get_indexed_columns
+from .export import arrow_encoder
+from .instrumentation import phase
+from .limits import LimitExceeded
+from .limits import Limits
+from .limits import statement_timeout
+from .paging import Order
+from .serialize import get_encoder
 
 CRUD_OPERATIONS = ("create", "read", "update", "delete")
 
+# how many entries are fetched from the cursor at a time when streaming
+EXPORT_BATCH_SIZE = 1000
+
+# how many entries are inserted per transaction when creating in bulk
+CREATE_BATCH_SIZE = 1000
+
+# how many keys one query for the labels of referenced entries looks up
+LABEL_BATCH_SIZE = 1000
+
+# how many suggestions a foreign key's autocomplete returns by default and at most
+AUTOCOMPLETE_LIMIT = 10
+MAX_AUTOCOMPLETE_LIMIT = 100
+
+# how many rows of a result are included in the operation log line
+LOG_SAMPLE_SIZE = 3
+
+sample_repr = reprlib.Repr()
+sample_repr.maxlist = LOG_SAMPLE_SIZE
+sample_repr.maxdict = 10
+sample_repr.maxstring = 80
+sample_repr.maxother = 80
+
+
+def prefix_range(column, prefix):
+    """Predicates for the values of `column` starting with `prefix` as a range, which
+    a b-tree index on the column serves whatever its collation or the database's LIKE"""
+    if not prefix:
+        return []
+    following = prefix[:-1] + chr(ord(prefix[-1]) + 1) if ord(prefix[-1]) < 0x10FFFF else None
+    criteria = [column >= prefix]
+    if following is not None:
+        criteria.append(column < following)
+    return criteria
+
+
+def starts_with(column, prefix):
+    return and_(*prefix_range(column, prefix)) if prefix else true()
+
+
+# how each filter operator is compiled, all but `contains` can use a b-tree index
+OPERATORS = {
+    "": operator.eq,
+    "gt": operator.gt,
+    "ge": operator.ge,
+    "lt": operator.lt,
+    "le": operator.le,
+    "between": lambda column, values: column.between(*values),
+    "in": lambda column, values: column.in_(values),
+    "null": lambda column, is_null: column.is_(None) if is_null else column.isnot(None),
+    "startswith": starts_with,
+    "contains": lambda column, value: column.contains(value, autoescape=True),
+}
+
 
 def get_logger():
     return current_app.logger
 
 
+def payload_logging_enabled():
+    return current_app.extensions["model_management"].log_payloads
+
+
+def log_operation(operation, started, data, **details):
+    """Log one line per operation with its inputs, row count, duration and a sample
+
+    Nothing is formatted unless INFO is enabled, the full payload is only logged (at
+    DEBUG) when the manager is created with `log_payloads=True`
+    """
+    logger = get_logger()
+    if not logger.isEnabledFor(logging.INFO):
+        return
+
+    rows = data if isinstance(data, list) else [] if data is None else [data]
+    logger.info(
+        "CRUD APP %s: %s rows=%d duration=%.1fms sample=%s",
+        operation,
+        " ".join(f"{k}={sample_repr.repr(v)}" for k, v in details.items()),
+        len(rows),
+        (time.perf_counter() - started) * 1000,
+        sample_repr.repr(rows[:LOG_SAMPLE_SIZE]),
+    )
+    if payload_logging_enabled() and logger.isEnabledFor(logging.DEBUG):
+        logger.debug("CRUD APP %s: data output: %s", operation, data)
+
+
 def get_session():
     return current_app.extensions["model_management"].db.session
 
 
+def get_limits(model):
+    """The manager's limits with any set for the model taking precedence"""
+    return current_app.extensions["model_management"].limits.merge(model.limits)
+
+
+def get_read_session():
+    """The session for read only queries, on the manager's replica when it has one"""
+    return current_app.extensions["model_management"].read_session()
+
+
+def get_counter():
+    return current_app.extensions["model_management"].counter
+
+
+def get_result_cache(tablenames=()):
+    """The manager's result cache, None when it has none or reads of the tables can't
+    be cached right now, see `ModelManager.caches_reads`"""
+    manager = current_app.extensions["model_management"]
+    if manager.cache is None or not manager.caches_reads(tablenames):
+        return None
+    return manager.cache
+
+
+def notify_written(tablename):
+    """Tell the manager this extension has committed a write to a table"""
+    current_app.extensions["model_management"].written(tablename)
+
+
 @attr.s
 class CRUDFailure(Exception):
     message = attr.ib()
     operation_name = attr.ib()
 
 
+def insert_form_data(row: dict) -> MultiDict:
+    """Turn a row of column name to value into the form data a create form expects"""
+    form_data = MultiDict()
+    for k, v in row.items():
+        if v is not None and v != "":
+            form_data.add("insert_" + k, str(v))
+
+    return form_data
+
+
 def get_crud():
     return CRUDApplication(CRUD)
 
@@ -27,14 +175,340 @@ class CRUD:
     """A service that accepts sqlalchemy models performs crud operations on them"""
 
     model = attr.ib()
+    limits = attr.ib(factory=Limits)
+
+    @property
+    def table(self):
+        return self.model.__table__
+
+    @property
+    def primary_keys(self):
+        return inspect(self.model).primary_key
+
+    def get_criteria(self, filter_by: dict) -> list:
+        """Compile filters into predicates for one WHERE clause, see `check_indexed`
 
-    def get_entries(self, session, filter_by: dict):
-        query = session.query(self.model)
+        A filter is keyed by a column name, optionally with an operator after a double
+        underscore e.g. `{"id__gt": 10}`, without one it is an equality
+        """
+        criteria = self.compile_criteria(filter_by)
+        self.check_indexed(filter_by)
+        return criteria
+
+    def compile_criteria(self, filter_by: dict) -> list:
+        criteria = []
         if filter_by:
             for k, v in filter_by.items():
-                query = query.filter_by(**{k: v})
+                name, _, op = k.partition("__")
+                if op not in OPERATORS:
+                    raise CRUDFailure(f"Unknown filter operator: {op}", "filter")
+                criteria.append(OPERATORS[op](getattr(self.model, name), v))
+
+        return criteria
+
+    def table_exceeds(self, session, rows) -> bool:
+        """Whether the table has more than `rows` entries, from the database's statistics
+        when it has them or else by counting no more than `rows + 1` entries"""
+        estimate = Counter.estimate(session, self.table)
+        if estimate is not None:
+            return estimate > rows
+
+        entries = select(literal(1)).select_from(self.table).limit(rows + 1).subquery()
+        return session.execute(select(func.count()).select_from(entries)).scalar() > rows
+
+    def check_indexed(self, filter_by: dict, session=None):
+        """Refuse filters that no index serves on tables with more entries than the
+        `unindexed_filter_rows` limit, as they would read every entry, the table is sized
+        on `session` (default the read session)"""
+        max_rows = self.limits.unindexed_filter_rows
+        if max_rows is None or not filter_by:
+            return
+
+        indexed = get_indexed_columns(self.table)
+        for k in filter_by:
+            name, _, op = k.partition("__")
+            if name in indexed and op != "contains":
+                return
+
+        if self.table_exceeds(session or get_read_session(), max_rows):
+            raise LimitExceeded(
+                f"{self.table.name} has more than {max_rows} entries, filter it on an "
+                f"indexed column: {', '.join(sorted(indexed))}"
+            )
+
+    def get_search_criteria(self, search, columns) -> list:
+        if not search or not columns:
+            return []
+
+        return [or_(*[self.table.c[name].ilike(f"%{search}%") for name in columns])]
+
+    def get_projection(self, columns=None) -> list:
+        if not columns:
+            return list(self.table.columns)
+
+        return [self.table.c[name] for name in columns]
+
+    def get_select(self, filter_by: dict, columns=None, criteria=None):
+        """A core select of just the `columns` asked for (default all) which returns
+        lightweight rows rather than entries tracked by the session"""
+        if criteria is None:
+            criteria = self.get_criteria(filter_by)
+        return select(*self.get_projection(columns)).where(*criteria)
+
+    def get_query(self, session, criteria):
+        return session.query(self.model).filter(*criteria)
+
+    def get_entries(self, session, criteria):
+        """The entries matching already compiled `criteria`, see `get_criteria`"""
+        return self.get_query(session, criteria).all()
+
+    def count(self, session, criteria=()) -> int:
+        return session.query(func.count()).select_from(self.model).filter(*criteria).scalar()
+
+    def exact_count(self, session, criteria=(), key=None) -> Count:
+        return Count(self.count(session, criteria))
+
+    def timeout(self, session):
+        return statement_timeout(session, self.limits.statement_timeout)
+
+    def limit_rows(self, statement):
+        """Fetch one more row than `max_rows` so going over it can be noticed"""
+        max_rows = self.limits.max_rows
+        return statement if max_rows is None else statement.limit(max_rows + 1)
+
+    def check_rows(self, rows):
+        max_rows = self.limits.max_rows
+        if max_rows is not None and len(rows) > max_rows:
+            raise LimitExceeded(
+                f"More than {max_rows} entries match, add filters or read a page at a time"
+            )
+
+    def check_page(self, page):
+        max_rows = self.limits.max_rows
+        if max_rows is not None and (page.length is None or page.length > max_rows):
+            raise LimitExceeded(f"Pages can have at most {max_rows} entries")
+
+    def check_affected(self, session, operation, criteria):
+        """Fail before an update or delete changes more than `max_affected` entries"""
+        max_affected = self.limits.max_affected
+        if max_affected is None:
+            return
+
+        count = self.count(session, criteria)
+        if count > max_affected:
+            raise LimitExceeded(
+                f"{count} entries match, more than the {max_affected} one {operation} can change"
+            )
+
+    def preview(self, filter_by: dict) -> int:
+        """How many entries an update or delete with these filters would change"""
+        session = get_session()
+
+        try:
+            with self.timeout(session):
+                count = self.count(session, self.get_criteria(filter_by))
+        except Exception as e:
+            session.rollback()
+            raise CRUDFailure(str(e), "preview") from e
 
-        return query.all()
+        return count
+
+    @staticmethod
+    def get_label_selects(references: dict, rows) -> list:
+        """(foreign key names, select) for the labels of the entries `rows` reference
+
+        References to the same column with the same label are looked up together so a
+        page costs one query per referenced table however many rows it has
+        """
+        groups = {}
+        for name, reference in references.items():
+            label = reference.label
+            if label is None:
+                continue
+            keys = {row._mapping[name] for row in rows} - {None}
+            if keys:
+                names, group_keys = groups.setdefault((reference.column, label), ([], set()))
+                names.append(name)
+                group_keys.update(keys)
+
+        selects = []
+        for (column, label), (names, keys) in groups.items():
+            keys = sorted(keys)
+            for start in range(0, len(keys), LABEL_BATCH_SIZE):
+                batch = keys[start : start + LABEL_BATCH_SIZE]
+                selects.append((names, select(column, label).where(column.in_(batch))))
+        return selects
+
+    @staticmethod
+    def collect_labels(selects, results) -> dict:
+        """The label of each referenced key by foreign key name, keys are strings as
+        they're sent as json objects"""
+        labels = {}
+        for (names, _), rows in zip(selects, results):
+            for name in names:
+                found = labels.setdefault(name, {})
+                found.update((str(key), label) for key, label in rows if label is not None)
+        return labels
+
+    def read_labels(self, references: dict, rows) -> dict:
+        """The labels of the entries referenced by `rows`, see `get_label_selects`"""
+        selects = self.get_label_selects(references, rows)
+        if not selects:
+            return {}
+
+        session = get_read_session()
+        try:
+            with self.timeout(session):
+                results = [session.execute(statement).all() for _, statement in selects]
+        except Exception as e:
+            session.rollback()
+            raise CRUDFailure(str(e), "read") from e
+
+        return self.collect_labels(selects, results)
+
+    @staticmethod
+    def get_autocomplete_select(reference, prefix: str, limit: int):
+        """At most `limit` (key, label) of the entries a foreign key can reference whose
+        label starts with `prefix`, in label order so an index on it serves the seek and
+        the order, without a label column it's just (key,) of the key equal to `prefix`"""
+        column, label = reference.column, reference.label
+        if label is not None:
+            criteria = prefix_range(label, prefix)
+            return select(column, label).where(*criteria).order_by(label).limit(limit)
+
+        try:
+            key = column.type.python_type(prefix)
+        except (TypeError, ValueError):
+            return None
+        return select(column).where(column == key).limit(limit)
+
+    def autocomplete(self, reference, prefix: str, limit: int = AUTOCOMPLETE_LIMIT) -> list:
+        statement = self.get_autocomplete_select(reference, prefix, limit)
+        if statement is None:
+            return []
+
+        session = get_read_session()
+        try:
+            with self.timeout(session):
+                rows = session.execute(statement).all()
+        except Exception as e:
+            session.rollback()
+            raise CRUDFailure(str(e), "read") from e
+
+        return rows
+
+    def explain(self, operation, filter_by: dict, insert=None):
+        """The `explain.Plan` of a read, update or delete with these filters, none of
+        them are run and unindexed filters aren't refused so their cost can be seen"""
+        criteria = self.compile_criteria(filter_by)
+        if operation == "update" and insert:
+            statement = update(self.table).where(*criteria).values(**insert)
+        elif operation == "delete":
+            statement = delete(self.table).where(*criteria)
+        else:
+            statement = self.get_select(filter_by, criteria=criteria)
+
+        session = get_read_session() if operation == "read" else get_session()
+        try:
+            with self.timeout(session):
+                plan = explain(session, statement)
+        except Exception as e:
+            session.rollback()
+            raise CRUDFailure(str(e), "explain") from e
+        finally:
+            if operation != "read":
+                session.rollback()
+
+        if plan is None:
+            dialect = session.get_bind().dialect.name
+            raise CRUDFailure(f"Can't explain queries on {dialect}", "explain")
+        return plan, str(statement.compile(dialect=session.get_bind().dialect))
+
+    @staticmethod
+    def count_key(filter_by: dict, page) -> str:
+        """Identifies the entries a page's filters & search match for `counting.Counter`"""
+        return repr((sorted(filter_by.items()), page.search))
+
+    def paginate(self, query, page):
+        """Order and limit a query to a single page, seeking past `page.after` on the
+        primary key when possible so the database never has to skip over rows
+
+        The primary key columns are always the last of the order so entries that tie on
+        the rest keep their place between pages
+        """
+        order = page.order
+        if not order and len(self.primary_keys) == 1:
+            order = [Order(self.primary_keys[0].name)]
+
+        is_keyset = (
+            page.after is not None
+            and len(self.primary_keys) == 1
+            and len(order) == 1
+            and order[0].column == self.primary_keys[0].name
+        )
+
+        if is_keyset:
+            primary_key = self.table.c[order[0].column]
+            if order[0].descending:
+                query = query.filter(primary_key < page.after)
+            else:
+                query = query.filter(primary_key > page.after)
+
+        ordered = {o.column for o in order}
+        order = order + [Order(key.name) for key in self.primary_keys if key.name not in ordered]
+        query = query.order_by(
+            *[
+                self.table.c[o.column].desc() if o.descending else self.table.c[o.column].asc()
+                for o in order
+            ]
+        )
+
+        if not is_keyset and page.start:
+            query = query.offset(page.start)
+        if page.length is not None:
+            query = query.limit(page.length)
+
+        return query
+
+    def get_returning_columns(self, session, operation, returning) -> list:
+        """The columns to project with RETURNING, or nothing if the dialect can't"""
+        if not returning:
+            return []
+
+        dialect = session.get_bind().dialect
+        # sqlalchemy >= 2.0 splits support per statement, 1.4 only has full_returning
+        flag = (
+            f"{operation}_returning" if hasattr(dialect, "update_returning") else "full_returning"
+        )
+        if not getattr(dialect, flag, False):
+            return []
+
+        if "*" in returning:
+            return list(self.table.columns)
+
+        return [self.table.c[name] for name in returning if name in self.table.c]
+
+    def execute_set(self, operation, statement, criteria, returning=()) -> tuple:
+        session = get_session()
+
+        returning = self.get_returning_columns(session, operation, returning)
+        if returning:
+            statement = statement.returning(*returning)
+
+        try:
+            with self.timeout(session):
+                self.check_affected(session, operation, criteria)
+                result = session.execute(statement)
+            rows = result.all() if returning else []
+            count = len(rows) if returning else result.rowcount
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            raise CRUDFailure(str(e), operation) from e
+
+        notify_written(self.table.name)
+
+        return count, rows
 
     def create(self, insert: dict):
         session = get_session()
@@ -42,54 +516,303 @@ class CRUD:
         entry = self.model(**insert)
         session.add(entry)
         try:
+            with self.timeout(session):
+                session.flush()
             session.commit()
         except Exception as e:
             session.rollback()
             raise CRUDFailure(str(e), "create") from e
 
+        notify_written(self.table.name)
+
         session.refresh(entry)
         return entry
 
-    def read(self, filter_by: dict) -> list:
+    def stage(self, session, operation, filter_by=None, insert=None, orm_events=False):
+        """Run one operation of a batch on `session` without committing, returns the
+        created entry or how many entries were updated or deleted
+
+        Updates and deletes are a single statement unless `orm_events`, like their bulk
+        endpoints, and are bound by `max_affected` on their own, their filters have been
+        checked by `batch.parse_batch` already
+        """
+        with self.timeout(session):
+            if operation == "create":
+                entry = self.model(**insert)
+                session.add(entry)
+                session.flush()
+                return entry
+
+            criteria = self.compile_criteria(filter_by)
+            if operation == "update" and not insert:
+                return 0
+            self.check_affected(session, operation, criteria)
+
+            if orm_events:
+                entries = self.get_entries(session, criteria)
+                for entry in entries:
+                    if operation == "update":
+                        for k, v in insert.items():
+                            setattr(entry, k, v)
+                    else:
+                        session.delete(entry)
+                session.flush()
+                return len(entries)
+
+            if operation == "update":
+                statement = update(self.table).where(*criteria).values(**insert)
+            else:
+                statement = delete(self.table).where(*criteria)
+            return session.execute(statement).rowcount
+
+    def create_many(self, inserts: list, batch_size: int = CREATE_BATCH_SIZE) -> tuple:
+        """Insert entries in batches, one transaction per batch
+
+        Each batch is sent as executemany, grouped by the columns given as every
+        parameter set of an executemany must share the same keys. A failing batch
+        is rolled back and reported as `(start, stop, message)` but doesn't stop
+        the batches after it
+        """
         session = get_session()
 
+        count = 0
+        failures = []
+        for start in range(0, len(inserts), batch_size):
+            batch = inserts[start : start + batch_size]
+            groups = {}
+            for insert in batch:
+                groups.setdefault(tuple(sorted(insert)), []).append(insert)
+
+            try:
+                with self.timeout(session):
+                    for group in groups.values():
+                        session.execute(insert_(self.table), group)
+                session.commit()
+            except Exception as e:
+                session.rollback()
+                failures.append((start, start + len(batch), str(e)))
+            else:
+                count += len(batch)
+
+        if count:
+            notify_written(self.table.name)
+
+        return count, failures
+
+    def read_one(self, identity: tuple):
+        session = get_read_session()
+
+        try:
+            with self.timeout(session):
+                entry = session.get(self.model, identity)
+        except Exception as e:
+            session.rollback()
+            raise CRUDFailure(str(e), "read") from e
+
+        return entry
+
+    def update_one(self, identity: tuple, insert: dict):
+        session = get_session()
+
+        try:
+            with self.timeout(session):
+                entry = session.get(self.model, identity)
+                if entry is None:
+                    return None
+
+                for k, v in insert.items():
+                    setattr(entry, k, v)
+                session.flush()
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            raise CRUDFailure(str(e), "update") from e
+
+        notify_written(self.table.name)
+
+        session.refresh(entry)
+        return entry
+
+    def delete_one(self, identity: tuple):
+        session = get_session()
+
+        try:
+            with self.timeout(session):
+                entry = session.get(self.model, identity)
+                if entry is None:
+                    return None
+
+                session.delete(entry)
+                session.flush()
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            raise CRUDFailure(str(e), "delete") from e
+
+        notify_written(self.table.name)
+
+        return entry
+
+    def execute_chunk(self, operation, filter_by: dict, insert=None, after=None, size=None):
+        """Update or delete the next `size` matching entries after the primary key `after`
+        in one transaction, so a job over millions of entries never holds long locks
+
+        Returns the last primary key of the chunk, None when none are left, and how
+        many entries were changed
+        """
+        if len(self.primary_keys) != 1:
+            raise CRUDFailure("Chunks need a single primary key column", operation)
+
+        session = get_session()
+        primary_key = self.table.c[self.primary_keys[0].name]
+        criteria = self.get_criteria(filter_by)
+        if after is not None:
+            criteria.append(primary_key > after)
+
+        try:
+            with self.timeout(session):
+                keys = select(primary_key).where(*criteria).order_by(primary_key).limit(size)
+                last = session.execute(select(func.max(keys.subquery().c[0]))).scalar()
+                if last is None:
+                    session.rollback()
+                    return None, 0
+
+                criteria.append(primary_key <= last)
+                if operation == "update":
+                    statement = update(self.table).where(*criteria).values(**insert)
+                else:
+                    statement = delete(self.table).where(*criteria)
+                count = session.execute(statement).rowcount
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            raise CRUDFailure(str(e), operation) from e
+
+        notify_written(self.table.name)
+
+        return last, count
+
+    def read(self, filter_by: dict, columns=None) -> list:
+        session = get_read_session()
+
         try:
-            result = self.get_entries(session, filter_by)
+            with self.timeout(session):
+                result = session.execute(self.limit_rows(self.get_select(filter_by, columns))).all()
+            self.check_rows(result)
         except Exception as e:
             session.rollback()
             raise CRUDFailure(str(e), "read") from e
 
         return result
 
+    def read_page(self, filter_by: dict, page, columns=None, count=None) -> tuple:
+        """A page of rows with the total & filtered `Count`s
+
+        `count(session, criteria, key)` counts the entries matching criteria, `key`
+        identifies them and is None for the whole table, the default counts exactly
+        """
+        session = get_read_session()
+        count = count or self.exact_count
+
+        try:
+            self.check_page(page)
+            criteria = self.get_criteria(filter_by)
+            criteria += self.get_search_criteria(page.search, page.search_columns)
+
+            with self.timeout(session):
+                key = self.count_key(filter_by, page) if criteria else None
+                records_total = count(session, [], None)
+                records_filtered = count(session, criteria, key) if criteria else records_total
+
+                statement = self.paginate(self.get_select(filter_by, columns, criteria), page)
+                rows = session.execute(statement).all()
+        except Exception as e:
+            session.rollback()
+            raise CRUDFailure(str(e), "read") from e
+
+        return rows, records_total, records_filtered
+
+    def stream(self, filter_by: dict, columns=None, batch_size: int = EXPORT_BATCH_SIZE):
+        """Iterate over every matching row holding only `batch_size` rows in memory
+
+        The query is executed here, not lazily, so a failure is raised before a
+        response has started streaming, the statement timeout lasts until the rows
+        are all fetched or the iterator is closed
+        """
+        session = get_read_session()
+
+        statement = self.get_select(filter_by, columns)
+        statement = statement.execution_options(stream_results=True, yield_per=batch_size)
+
+        def fetch():
+            with self.timeout(session):
+                result = session.execute(statement)
+                yield
+                yield from result
+
+        rows = fetch()
+        try:
+            next(rows)
+        except Exception as e:
+            session.rollback()
+            raise CRUDFailure(str(e), "read") from e
+
+        return rows
+
     def update(self, filter_by: dict, insert: dict) -> list:
         session = get_session()
 
-        entries = self.get_entries(session, filter_by)
-        for entry in entries:
-            for k, v in insert.items():
-                setattr(entry, k, v)
         try:
+            with self.timeout(session):
+                criteria = self.get_criteria(filter_by)
+                self.check_affected(session, "update", criteria)
+                entries = self.get_entries(session, criteria)
+                for entry in entries:
+                    for k, v in insert.items():
+                        setattr(entry, k, v)
+                session.flush()
             session.commit()
         except Exception as e:
             session.rollback()
             raise CRUDFailure(str(e), "update") from e
 
+        notify_written(self.table.name)
+
         return entries
 
+    def update_set(self, filter_by: dict, insert: dict, returning=()) -> tuple:
+        """Update every matching entry with one UPDATE ... WHERE, bypassing the ORM"""
+        if not insert:
+            return 0, []
+
+        criteria = self.get_criteria(filter_by)
+        statement = update(self.table).where(*criteria).values(**insert)
+        return self.execute_set("update", statement, criteria, returning)
+
+    def delete_set(self, filter_by: dict, returning=()) -> tuple:
+        """Delete every matching entry with one DELETE ... WHERE, bypassing the ORM"""
+        criteria = self.get_criteria(filter_by)
+        statement = delete(self.table).where(*criteria)
+        return self.execute_set("delete", statement, criteria, returning)
+
     def delete(self, filter_by) -> list:
         session = get_session()
 
-        entries = self.get_entries(session, filter_by)
-        if entries:
-            for entry in entries:
-                session.delete(entry)
-
         try:
+            with self.timeout(session):
+                criteria = self.get_criteria(filter_by)
+                self.check_affected(session, "delete", criteria)
+                entries = self.get_entries(session, criteria)
+                for entry in entries:
+                    session.delete(entry)
+                session.flush()
             session.commit()
         except Exception as e:
             session.rollback()
             raise CRUDFailure(str(e), "delete") from e
 
+        notify_written(self.table.name)
+
         return entries
 
 
@@ -97,48 +820,392 @@ class CRUD:
 class CRUDApplication:
     crud = attr.ib()
 
-    @staticmethod
-    def parse_entry(row):
-        return {
-            k: str(v) if v else "NULL" for k, v in row.__dict__.items() if k != "_sa_instance_state"
-        }
+    def crud_for(self, model):
+        return self.crud(model.model, get_limits(model))
 
     def create_single(self, model, insert):
-        get_logger().info(f"CRUD APP CREATE: insert: {insert}")
-        entry = self.crud(model.model).create(insert)
-        result = self.parse_entry(entry)
-        get_logger().info(f"CRUD APP CREATE: data output: {result}")
+        started = time.perf_counter()
+        with phase("query"):
+            entry = self.crud_for(model).create(insert)
+        with phase("serialize"):
+            result = model.serializer.entry(entry)
+        log_operation("CREATE", started, result, table=model.name, insert=insert)
+        return result
+
+    def create_bulk(self, model, inserts, batch_size=CREATE_BATCH_SIZE):
+        """Validate each row against the model's create form and insert the valid ones
+
+        `inserts` are dicts of column name to raw (string or json) value, the result
+        reports invalid rows and failed batches by their index in `inserts`
+        """
+        started = time.perf_counter()
+        valid = []
+        indices = []
+        failures = []
+        for index, insert in enumerate(inserts):
+            form = model.form("create", insert_form_data(insert))
+            if form.validate():
+                valid.append(form.insert_params)
+                indices.append(index)
+            else:
+                failures.append({"rows": [index], "message": f"Invalid fields: {form.errors}"})
+
+        with phase("query"):
+            count, batch_failures = self.crud_for(model).create_many(valid, batch_size)
+        for start, stop, message in batch_failures:
+            failures.append({"rows": indices[start:stop], "message": message})
+
+        result = {"count": count, "failures": failures}
+        log_operation(
+            "CREATE BULK",
+            started,
+            failures,
+            table=model.name,
+            received=len(inserts),
+            count=count,
+            batch_size=batch_size,
+        )
         return result
 
-    def create_bulk(self):
-        raise NotImplementedError()
+    def batch(self, operations, dry_run=False):
+        """Run `batch.BatchOperation`s in order in one transaction with one commit, if
+        any fails none of them are kept, a `dry_run` rolls back once all have run
 
-    def read_single(self):
-        raise NotImplementedError()
+        Returns a result per operation: the created entry or how many entries changed
+        """
+        started = time.perf_counter()
+        session = get_session()
+        results = []
+        try:
+            with phase("query"):
+                for operation in operations:
+                    model = operation.model
+                    result = self.crud_for(model).stage(
+                        session,
+                        operation.operation,
+                        filter_by=operation.filter_params,
+                        insert=operation.insert_params,
+                        orm_events=model.orm_events,
+                    )
+                    if operation.operation == "create":
+                        result = {"data": model.serializer.entry(result)}
+                    else:
+                        result = {"count": result}
+                    results.append(
+                        dict(result, tablename=model.name, operation=operation.operation)
+                    )
+
+                if dry_run:
+                    session.rollback()
+                else:
+                    session.commit()
+        except Exception as e:
+            session.rollback()
+            message = e.message if isinstance(e, CRUDFailure) else str(e)
+            # every operation before the failed one has a result
+            failed = f"Operation {len(results)}" if len(results) < len(operations) else "Commit"
+            raise CRUDFailure(f"{failed} failed, nothing was changed: {message}", "batch") from e
+
+        if not dry_run:
+            for tablename in sorted({operation.model.name for operation in operations}):
+                notify_written(tablename)
+
+        log_operation(
+            "BATCH",
+            started,
+            results,
+            tables=sorted({operation.model.name for operation in operations}),
+            operations=len(operations),
+            dry_run=dry_run,
+        )
+        return results
+
+    def read_single(self, model, identity):
+        started = time.perf_counter()
+        with phase("query"):
+            entry = self.crud_for(model).read_one(identity)
+        with phase("serialize"):
+            result = model.serializer.entry(entry) if entry is not None else None
+        log_operation("READ SINGLE", started, result, table=model.name, identity=identity)
+        return result
+
+    def cached(self, model, operation, parts, read, depends_on=()):
+        """The result of `read()`, from the manager's result cache when it has one
+
+        `parts` are everything the result depends on besides the table's contents and
+        the contents of the `depends_on` tables
+        """
+        cache = get_result_cache([model.name, *depends_on])
+        if cache is None:
+            return read()
+
+        started = time.perf_counter()
+        key = cache.key(model.name, operation, *parts, depends_on=depends_on)
+        with phase("cache"):
+            result = cache.get(model.name, key)
+        if result is not None:
+            log_operation(f"{operation} CACHED", started, None, table=model.name, parts=parts)
+            return result
 
-    def read_bulk(self, model, filter_by):
-        get_logger().info(f"CRUD APP READ: filter: {filter_by}")
-        entries = self.crud(model.model).read(filter_by)
-        result = [self.parse_entry(e) for e in entries]
-        get_logger().info(f"CRUD APP READ: data output: {result}")
+        result = read()
+        with phase("cache"):
+            cache.set(key, result)
         return result
 
-    def update_single(self):
-        raise NotImplementedError()
+    @staticmethod
+    def read_parts(filter_by, columns=None, columnar=False, page=None):
+        """Everything a read's result depends on besides the table's contents"""
+        parts = (sorted(filter_by.items()), columns, columnar)
+        if page is not None:
+            # `draw` only pairs the response with its request so it isn't part of this
+            parts += (attr.astuple(attr.evolve(page, draw=None)),)
+        return parts
+
+    @staticmethod
+    def serialize_rows(model, rows, columnar=False):
+        """Serialized rows and the result to send, one array per column if `columnar`"""
+        rows = model.serializer.rows(rows)
+        return rows, model.serializer.columnar(rows) if columnar else rows
+
+    def read_bulk(self, model, filter_by, columns=None, columnar=False):
+        parts = self.read_parts(filter_by, columns, columnar)
+        read = partial(self.read_bulk_uncached, model, filter_by, columns, columnar)
+        return self.cached(model, "READ", parts, read)
 
-    def update_bulk(self, model, filter_by, insert):
-        get_logger().info(f"CRUD APP UPDATE: filter: {filter_by}, insert: {insert}")
-        entries = self.crud(model.model).update(filter_by, insert)
-        result = [self.parse_entry(e) for e in entries]
-        get_logger().info(f"CRUD APP UPDATE: data output: {result}")
+    def read_bulk_uncached(self, model, filter_by, columns=None, columnar=False):
+        started = time.perf_counter()
+        with phase("query"):
+            rows = self.crud_for(model).read(filter_by, columns or model.column_names)
+        with phase("serialize"):
+            rows, result = self.serialize_rows(model, rows, columnar)
+        log_operation("READ", started, rows, table=model.name, filter=filter_by)
         return result
 
-    def delete_single(self):
-        raise NotImplementedError()
+    @staticmethod
+    def encode_arrow(model, rows, columns=None):
+        with phase("encode"):
+            columns = model.columns_named(columns or model.column_names)
+            return b"".join(arrow_encoder(columns, rows))
+
+    def read_arrow(self, model, filter_by, columns=None):
+        """A bulk read as an arrow IPC stream, encoded from the database's values rather
+        than serialized ones so it isn't cached"""
+        started = time.perf_counter()
+        with phase("query"):
+            rows = self.crud_for(model).read(filter_by, columns or model.column_names)
+        result = self.encode_arrow(model, rows, columns)
+        log_operation("READ", started, None, table=model.name, filter=filter_by, format="arrow")
+        return result
+
+    def read_page(self, model, filter_by, page, columns=None, columnar=False):
+        parts = self.read_parts(filter_by, columns, columnar, page)
+        read = partial(self.read_page_uncached, model, filter_by, page, columns, columnar)
+        result = self.cached(model, "READ PAGE", parts, read, model.referenced_tablenames)
+        # a page asked for without `draw` has a url that stays the same, see `conditional`
+        return dict(result, draw=page.draw) if page.draw is not None else result
+
+    @staticmethod
+    def page_references(model, columns=None) -> dict:
+        """The foreign keys a page has, whose referenced entries are labelled"""
+        references = model.references
+        if columns:
+            references = {name: references[name] for name in columns if name in references}
+        return references
+
+    def read_page_uncached(self, model, filter_by, page, columns=None, columnar=False):
+        started = time.perf_counter()
+        with phase("query"):
+            rows, records_total, records_filtered = self.crud_for(model).read_page(
+                filter_by,
+                page,
+                columns or model.column_names,
+                count=partial(get_counter().count, model),
+            )
+            labels = self.crud_for(model).read_labels(self.page_references(model, columns), rows)
+        return self.page_result(
+            model, filter_by, page, rows, records_total, records_filtered, columnar, started, labels
+        )
+
+    def page_result(
+        self,
+        model,
+        filter_by,
+        page,
+        rows,
+        records_total,
+        records_filtered,
+        columnar,
+        started,
+        labels=None,
+    ):
+        with phase("serialize"):
+            rows, data = self.serialize_rows(model, rows, columnar)
+            result = {
+                "recordsTotal": records_total.value,
+                "recordsFiltered": records_filtered.value,
+                "recordsEstimated": records_total.estimated or records_filtered.estimated,
+                "data": data,
+                "labels": labels or {},
+            }
+        log_operation(
+            "READ PAGE",
+            started,
+            rows,
+            table=model.name,
+            filter=filter_by,
+            start=page.start,
+            length=page.length,
+            after=page.after,
+            filtered=records_filtered.value,
+        )
+        return result
+
+    def fingerprint(self, model):
+        """The model's `etags.read_fingerprint`"""
+        session = get_read_session()
+        try:
+            with self.crud_for(model).timeout(session):
+                return read_fingerprint(session, model.model.__table__, model.fingerprint)
+        except Exception as e:
+            session.rollback()
+            raise CRUDFailure(str(e), "read") from e
+
+    def count(self, model) -> Count:
+        """How many entries the model's table has, using the model's count strategy"""
+        session = get_read_session()
+        try:
+            with self.crud_for(model).timeout(session):
+                return get_counter().count(model, session)
+        except Exception as e:
+            session.rollback()
+            raise CRUDFailure(str(e), "read") from e
+
+    def autocomplete(self, model, reference, prefix, limit=AUTOCOMPLETE_LIMIT):
+        """Suggestions for a foreign key of `model`: the referenced entries whose label
+        starts with `prefix` as `{"value": key, "label": label}`"""
+        started = time.perf_counter()
+        limit = min(max(limit, 1), MAX_AUTOCOMPLETE_LIMIT)
+        with phase("query"):
+            rows = self.crud_for(model).autocomplete(reference, prefix, limit)
+        with phase("serialize"):
+            encode = get_encoder(reference.column.type.python_type)
+            # the last value is the label, or the key again when there's no label column
+            result = [
+                {"value": encode(row[0]) if encode else row[0], "label": str(row[-1])}
+                for row in rows
+            ]
+        log_operation(
+            "AUTOCOMPLETE",
+            started,
+            result,
+            table=model.name,
+            references=reference.tablename,
+            prefix=prefix,
+        )
+        return result
+
+    def explain(self, model, operation, filter_by, insert=None):
+        started = time.perf_counter()
+        with phase("query"):
+            plan, statement = self.crud_for(model).explain(operation, filter_by, insert)
+        result = dict(attr.asdict(plan), statement=statement)
+        log_operation(
+            f"EXPLAIN {operation.upper()}",
+            started,
+            plan.lines,
+            table=model.name,
+            filter=filter_by,
+            estimated_rows=plan.estimated_rows,
+        )
+        return result
+
+    def export(self, model, filter_by, export_format, columns=None):
+        started = time.perf_counter()
+        columns = columns or model.column_names
+        with phase("query"):
+            rows = self.crud_for(model).stream(filter_by, columns)
+        log_operation(
+            "EXPORT",
+            started,
+            None,
+            table=model.name,
+            filter=filter_by,
+            format=export_format.name,
+            columns=columns,
+        )
+        if export_format.typed:
+            return export_format.encode(model.columns_named(columns), rows)
+        return export_format.encode(columns, model.serializer.iter_rows(rows))
+
+    def update_single(self, model, identity, insert):
+        started = time.perf_counter()
+        with phase("query"):
+            entry = self.crud_for(model).update_one(identity, insert)
+        with phase("serialize"):
+            result = model.serializer.entry(entry) if entry is not None else None
+        log_operation(
+            "UPDATE SINGLE", started, result, table=model.name, identity=identity, insert=insert
+        )
+        return result
+
+    def update_bulk(self, model, filter_by, insert, returning=()):
+        started = time.perf_counter()
+        if model.orm_events:
+            with phase("query"):
+                entries = self.crud_for(model).update(filter_by, insert)
+            with phase("serialize"):
+                result = {"count": len(entries), "data": model.serializer.entries(entries)}
+        else:
+            with phase("query"):
+                count, rows = self.crud_for(model).update_set(filter_by, insert, returning)
+            with phase("serialize"):
+                result = {"count": count, "data": model.serializer.rows(rows)}
+        log_operation(
+            "UPDATE",
+            started,
+            result["data"],
+            table=model.name,
+            filter=filter_by,
+            insert=insert,
+            count=result["count"],
+        )
+        return result
+
+    def preview(self, model, filter_by):
+        """A dry run of a bulk update or delete, how many entries it would change"""
+        started = time.perf_counter()
+        with phase("query"):
+            count = self.crud_for(model).preview(filter_by)
+        log_operation("PREVIEW", started, None, table=model.name, filter=filter_by, count=count)
+        return {"count": count, "max_affected": get_limits(model).max_affected}
+
+    def delete_single(self, model, identity):
+        started = time.perf_counter()
+        with phase("query"):
+            entry = self.crud_for(model).delete_one(identity)
+        with phase("serialize"):
+            result = model.serializer.entry(entry) if entry is not None else None
+        log_operation("DELETE SINGLE", started, result, table=model.name, identity=identity)
+        return result
 
-    def delete_bulk(self, model, filter_by):
-        get_logger().info(f"CRUD APP UPDATE: filter: {filter_by}")
-        entries = self.crud(model.model).delete(filter_by)
-        result = [self.parse_entry(e) for e in entries]
-        get_logger().info(f"CRUD APP UPDATE: data output: {result}")
+    def delete_bulk(self, model, filter_by, returning=()):
+        started = time.perf_counter()
+        if model.orm_events:
+            with phase("query"):
+                entries = self.crud_for(model).delete(filter_by)
+            with phase("serialize"):
+                result = {"count": len(entries), "data": model.serializer.entries(entries)}
+        else:
+            with phase("query"):
+                count, rows = self.crud_for(model).delete_set(filter_by, returning)
+            with phase("serialize"):
+                result = {"count": count, "data": model.serializer.rows(rows)}
+        log_operation(
+            "DELETE",
+            started,
+            result["data"],
+            table=model.name,
+            filter=filter_by,
+            count=result["count"],
+        )
         return result
@@ -0,0 +1,72 @@
+import threading
+
+import attr
+from sqlalchemy import MetaData
+from sqlalchemy import Table
+from sqlalchemy.orm import registry as Registry
+
+
+def get_registry(source):
+    """The sqlalchemy registry of a declarative base, `db` or registry"""
+    if isinstance(source, Registry):
+        return source
+    # flask_sqlalchemy.SQLAlchemy
+    if hasattr(source, "Model"):
+        source = source.Model
+    if isinstance(getattr(source, "registry", None), Registry):
+        return source.registry
+    raise TypeError(f"Expected a declarative base, registry or MetaData, got: {source!r}")
+
+
+@attr.s
+class LazyModels:
+    """The models of a declarative base, `db`, registry or `MetaData`, found by table name
+    without looking at their columns, so any number of them costs nothing up front
+
+    Tables of a bare `MetaData` (with a primary key) are mapped to a class when asked for
+    """
+
+    source = attr.ib()
+    options = attr.ib(factory=dict)
+    _classes = attr.ib(default=None, repr=False)
+    _base = attr.ib(default=None, repr=False)
+    _lock = attr.ib(factory=threading.Lock, repr=False)
+
+    @property
+    def classes(self) -> dict:
+        if self._classes is None:
+            if isinstance(self.source, MetaData):
+                classes = {
+                    table.name: table
+                    for table in self.source.tables.values()
+                    if table.primary_key.columns
+                }
+            else:
+                classes = {
+                    mapper.local_table.name: mapper.class_
+                    for mapper in get_registry(self.source).mappers
+                    # subclasses sharing a table are managed through their base
+                    if mapper.inherits is None and isinstance(mapper.local_table, Table)
+                }
+            self._classes = classes
+        return self._classes
+
+    @property
+    def tablenames(self):
+        return self.classes.keys()
+
+    def get(self, tablename):
+        """The mapped class of a table, or None if it isn't one of these models"""
+        with self._lock:
+            cls = self.classes.get(tablename)
+            if not isinstance(cls, Table):
+                return cls
+
+            # a table of a bare MetaData, mapped the first time it's needed
+            if self._base is None:
+                self._base = Registry(metadata=self.source).generate_base()
+            name = "".join(part.title() for part in tablename.split("_"))
+            cls = type(name, (self._base,), {"__table__": cls})
+            cls.__tablename__ = tablename
+            self.classes[tablename] = cls
+            return cls
@@ -3,17 +3,29 @@ from datetime import date
 from datetime import datetime
 from decimal import Decimal
 from functools import partial
+from urllib.parse import quote
+from urllib.parse import unquote
 
 import attr
+from markupsafe import Markup
+from sqlalchemy import inspect
 from wtforms import DecimalField
 from wtforms import FloatField
 from wtforms import IntegerField
 from wtforms import StringField
 from wtforms.fields import DateField
-from wtforms.fields import DateTimeField
 from wtforms.fields import RadioField
+from wtforms.widgets import TextInput
 
+from .counting import COUNT_STRATEGIES
+from .counting import DEFAULT_COUNT_TTL
+from .counting import EXACT
 from .crud import CRUD_OPERATIONS
+from .explain import get_indexed_columns
+from .instrumentation import phase
+from .serialize import get_decoder
+from .serialize import get_encoder
+from .serialize import Serializer
 
 
 def true_false_or_none(value):
@@ -25,7 +37,150 @@ def true_false_or_none(value):
         return None
 
 
-def field_from_column(column):
+class ListField(StringField):
+    """A comma separated list of values, each coerced to the type of a column"""
+
+    def __init__(self, label=None, validators=None, coerce=str, size=None, **kwargs):
+        super().__init__(label, validators, **kwargs)
+        self.coerce = coerce
+        self.size = size
+
+    def process_formdata(self, valuelist):
+        self.data = None
+        if not valuelist or not valuelist[0].strip():
+            return
+
+        try:
+            data = [self.coerce(value.strip()) for value in valuelist[0].split(",")]
+        except ValueError as e:
+            raise ValueError(f"Not a valid list of values: {e}") from e
+
+        if self.size is not None and len(data) != self.size:
+            raise ValueError(f"Expected {self.size} comma separated values")
+        self.data = data
+
+    def _value(self):
+        return ",".join(str(value) for value in self.data) if self.data else ""
+
+
+class DecodedField(StringField):
+    """A value written the way the api serializes it e.g. an ISO datetime or base64
+    bytes, see `serialize.get_encoder`"""
+
+    def __init__(self, label=None, validators=None, decode=str, encode=str, **kwargs):
+        super().__init__(label, validators, **kwargs)
+        self.decode = decode
+        self.encode = encode
+
+    def process_formdata(self, valuelist):
+        self.data = None
+        if not valuelist or not valuelist[0].strip():
+            return
+
+        try:
+            self.data = self.decode(valuelist[0].strip())
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Not a valid value: {e}") from e
+
+    def _value(self):
+        return str(self.encode(self.data)) if self.data is not None else ""
+
+
+def coerce_from_column(column):
+    """Turn a string from a form into the python type of a column"""
+    decoder = get_decoder(column.type.python_type)
+    if column.type == bool:
+        return true_false_or_none
+    elif decoder is not None:
+        return decoder
+    elif column.type == date:
+        return lambda value: datetime.strptime(value, "%Y-%m-%d").date()
+    elif column.type in (int, float, Decimal):
+        return column.type.python_type
+    else:
+        return str
+
+
+# (operator, label) available to filter each type of column, each is compiled into
+# a predicate a b-tree index can serve, see `crud.OPERATORS`
+RANGE_OPERATORS = (
+    ("gt", "greater than"),
+    ("ge", "greater than or equal to"),
+    ("lt", "less than"),
+    ("le", "less than or equal to"),
+    ("between", "between, comma separated"),
+)
+LIST_OPERATORS = (("in", "in, comma separated"),)
+NULL_OPERATORS = (("null", "null"),)
+PREFIX_OPERATORS = (("startswith", "starts with"),)
+# a leading wildcard can't use an index so this is only offered on searchable columns
+SEARCH_OPERATORS = (("contains", "contains"),)
+
+RANGE_TYPES = (int, float, Decimal, datetime, date)
+
+# the description of the filter fields an index can serve
+INDEXED = "indexed"
+
+# the api's own routes under `/api/<tablename>/`, a single entry with one of these as
+# its primary key is addressed with a character of it percent encoded, see `format_identity`
+RESERVED_IDENTITIES = ("explain", "export", "jobs")
+
+
+def format_identity(values) -> str:
+    """The `<pk>` of a single entry url for its primary key `values`, each is percent
+    encoded so a comma separates them unambiguously, see `Model.parse_identity`"""
+    identity = ",".join(quote(str(value), safe="") for value in values)
+    if identity in RESERVED_IDENTITIES:
+        identity = f"%{ord(identity[0]):02X}{identity[1:]}"
+    return identity
+
+
+def field_from_operator(column, operator, label):
+    label = f"{column.name} {label}"
+    # a leading wildcard can't use the column's index
+    description = INDEXED if column.indexed and operator != "contains" else ""
+    if operator in ("gt", "ge", "lt", "le"):
+        return field_from_column(column, label, description=description)
+    elif operator in ("in", "between"):
+        size = 2 if operator == "between" else None
+        return ListField(
+            label, coerce=coerce_from_column(column), size=size, description=description
+        )
+    elif operator == "null":
+        return RadioField(
+            label,
+            coerce=true_false_or_none,
+            choices=(("true", "is null"), ("false", "is not null"), ("none", "either")),
+            description=description,
+        )
+    else:
+        return StringField(label, filters=[lambda x: x or None], description=description)
+
+
+class AutocompleteInput(TextInput):
+    """A text input suggesting the entries a foreign key references as the user types,
+    from the `references` endpoint of the model's table"""
+
+    def __init__(self, tablename, column_name):
+        super().__init__()
+        self.tablename = tablename
+        self.column_name = column_name
+
+    def __call__(self, field, **kwargs):
+        from .manager import get_url
+
+        options = f"{field.id}-options"
+        kwargs.setdefault("autocomplete", "off")
+        kwargs["list"] = options
+        kwargs["data-autocomplete"] = get_url(
+            "references", tablename=self.tablename, column=self.column_name
+        )
+        return super().__call__(field, **kwargs) + Markup(f'<datalist id="{options}"></datalist>')
+
+
+def field_from_column(column, label=None, tablename=None, description=""):
+    """A form field for a column, with `tablename` a foreign key's field suggests the
+    entries it can reference"""
     if column.type == int:
         field = IntegerField
     elif column.type == bool:
@@ -38,14 +193,20 @@ def field_from_column(column):
         field = FloatField
     elif column.type == Decimal:
         field = DecimalField
-    elif column.type == datetime:
-        field = DateTimeField
+    elif get_decoder(column.type.python_type) is not None:
+        python_type = column.type.python_type
+        field = partial(
+            DecodedField, decode=get_decoder(python_type), encode=get_encoder(python_type)
+        )
     elif column.type == date:
         field = DateField
     else:
         # stops '' being passed
         field = partial(StringField, filters=[lambda x: x or None])
-    return field(column.name)
+
+    if column.references is not None and tablename is not None:
+        field = partial(field, widget=AutocompleteInput(tablename, column.name))
+    return field(label or column.name, description=description)
 
 
 @attr.s(eq=False)
@@ -66,6 +227,50 @@ class ColumnType:
         return self.python_type.__name__
 
 
+def get_label_column(table):
+    """The column that names the entries of a table: its first indexed text column which
+    isn't a key, None without one as looking entries up by their label would scan"""
+    indexed = get_indexed_columns(table)
+    for col in table.columns:
+        if col.primary_key or col.foreign_keys or col.name not in indexed:
+            continue
+        try:
+            if issubclass(col.type.python_type, str):
+                return col
+        except NotImplementedError:
+            continue
+    return None
+
+
+@attr.s
+class Reference:
+    """The entries a foreign key column references and the column that labels them"""
+
+    foreign_key = attr.ib(repr=False)
+    # the name of the label column, default is `get_label_column` of the referenced table
+    label_name = attr.ib(default=None)
+    # the label column, resolved once, None when entries are only matched on their key
+    label = attr.ib(init=False, default=None, repr=False, eq=False)
+
+    def __attrs_post_init__(self):
+        if self.label_name is not None:
+            self.label = self.table.c[self.label_name]
+        else:
+            self.label = get_label_column(self.table)
+
+    @property
+    def column(self):
+        return self.foreign_key.column
+
+    @property
+    def table(self):
+        return self.column.table
+
+    @property
+    def tablename(self):
+        return self.table.name
+
+
 @attr.s
 class Column:
     """A representation of a sqlalchemy model column"""
@@ -78,6 +283,25 @@ class Column:
     primary_key = attr.ib(default=False)
     foreign_key = attr.ib(default=False)
     autoincrement = attr.ib(default=False)
+    searchable = attr.ib(default=False)
+    # for a column with a single foreign key, what it references, see `Reference`
+    references = attr.ib(default=None)
+    # whether an index can look entries up by this column alone
+    indexed = attr.ib(default=False)
+
+    @property
+    def operators(self):
+        """The (operator, label) pairs this column can be filtered with beyond equality"""
+        operators = []
+        if self.type in RANGE_TYPES:
+            operators += RANGE_OPERATORS + LIST_OPERATORS
+        elif self.type == str:
+            operators += LIST_OPERATORS + PREFIX_OPERATORS
+            if self.searchable:
+                operators += SEARCH_OPERATORS
+        if self.nullable:
+            operators += NULL_OPERATORS
+        return operators
 
     @property
     def is_key(self):
@@ -88,9 +312,15 @@ class Column:
         return not self.required
 
     @classmethod
-    def from_sqlalchemy_column(cls, col):
+    def from_sqlalchemy_column(
+        cls, col, searchable=False, label_name=None, indexed=False, key=None
+    ):
+        references = None
+        if len(col.foreign_keys) == 1:
+            references = Reference(next(iter(col.foreign_keys)), label_name)
+
         column = cls(
-            col.key,
+            key or col.key,
             col.name,
             ColumnType.from_sqlalchemy_col_type(col.type),
             required=(not col.nullable),
@@ -98,6 +328,9 @@ class Column:
             primary_key=col.primary_key,
             foreign_key=bool(col.foreign_keys),
             autoincrement=col.autoincrement,
+            searchable=searchable,
+            references=references,
+            indexed=indexed,
         )
         return column
 
@@ -110,17 +343,55 @@ class Model:
     excluded_columns = attr.ib(factory=list)
     excluded_operations = attr.ib(factory=list)
     view_decorators = attr.ib(factory=list)
+    # bulk update/delete run as a single statement unless the model relies on orm
+    # events (validators, cascades, listeners) which only fire per entry
+    orm_events = attr.ib(default=False)
+    # columns that can be searched for text anywhere in them, which can't use an index
+    # so is opt in: the global search and the `contains` filter only use these
+    searchable_columns = attr.ib(factory=list)
+    # how the entries are counted for pages and the table view, see `counting.Counter`
+    count_strategy = attr.ib(default=EXACT, validator=attr.validators.in_(COUNT_STRATEGIES))
+    count_ttl = attr.ib(default=DEFAULT_COUNT_TTL)
+    # overrides the manager's limits on what one operation can cost, see `limits.Limits`
+    limits = attr.ib(default=None)
+    # the column labelling the entries each foreign key column references, by the
+    # foreign key's name, default is the referenced table's first indexed text column,
+    # without one they are matched on their key
+    reference_labels = attr.ib(factory=dict)
+    # a column whose max changes with every write e.g. `updated_at`, or "count", read
+    # for every ETag so writes made outside this extension are noticed too
+    fingerprint = attr.ib(default=None)
+
+    # derived from the sqlalchemy model once and reused on every request, call
+    # `invalidate` if `excluded_columns` is changed after registration
+    _columns = attr.ib(init=False, default=None, repr=False, eq=False)
+    _form_classes = attr.ib(init=False, factory=dict, repr=False, eq=False)
+    _serializer = attr.ib(init=False, default=None, repr=False, eq=False)
+    _pages = attr.ib(init=False, factory=dict, repr=False, eq=False)
+
+    def __attrs_post_init__(self):
+        self._columns = self.get_columns()
 
     @property
     def name(self):
         return str(self.model.__tablename__)
 
-    @property
-    def columns(self):
+    def get_columns(self):
         cols = []
+        indexed = get_indexed_columns(self.model.__table__)
+        # entries have a column under its mapper attribute's name e.g. `id = Column("ID")`
+        keys = {col: prop.key for prop in inspect(self.model).column_attrs for col in prop.columns}
         for col in self.model.__table__.columns:
             if col.name not in self.excluded_columns:
-                cols.append(Column.from_sqlalchemy_column(col))
+                cols.append(
+                    Column.from_sqlalchemy_column(
+                        col,
+                        searchable=col.name in self.searchable_columns,
+                        label_name=self.reference_labels.get(col.name),
+                        indexed=col.name in indexed,
+                        key=keys.get(col),
+                    )
+                )
 
             elif col.name in self.excluded_columns and not col.nullable:
                 warnings.warn(
@@ -131,6 +402,76 @@ class Model:
 
         return cols
 
+    @property
+    def columns(self):
+        if self._columns is None:
+            self._columns = self.get_columns()
+        return self._columns
+
+    @property
+    def column_names(self):
+        return [column.name for column in self.columns]
+
+    def columns_named(self, names):
+        by_name = {column.name: column for column in self.columns}
+        return [by_name[name] for name in names]
+
+    def invalidate(self):
+        """Forget the cached columns, form classes and pages so they're rebuilt on next use"""
+        self._columns = None
+        self._form_classes.clear()
+        self._serializer = None
+        self._pages.clear()
+
+    @property
+    def serializer(self):
+        if self._serializer is None:
+            self._serializer = Serializer.from_columns(self.columns)
+        return self._serializer
+
+    @property
+    def primary_keys(self):
+        """The primary key columns in the mapper's order, which `session.get` takes"""
+        by_name = {column.name: column for column in self.columns}
+        return [by_name[col.name] for col in inspect(self.model).primary_key if col.name in by_name]
+
+    @property
+    def references(self):
+        """The foreign key columns by name with what they reference"""
+        return {column.name: column.references for column in self.columns if column.references}
+
+    @property
+    def referenced_tablenames(self):
+        return sorted({reference.tablename for reference in self.references.values()})
+
+    def coerce_primary_key(self, value):
+        """Turn a primary key value from a url into its python type, keyset paging
+        is only supported for models with a single primary key column"""
+        primary_keys = self.primary_keys
+        if value in (None, "") or len(primary_keys) != 1:
+            return None
+
+        try:
+            return primary_keys[0].type.python_type(value)
+        except (TypeError, ValueError):
+            return None
+
+    def parse_identity(self, value):
+        """Turn a primary key from a url into a tuple for `session.get`, composite keys
+        are given in `primary_keys` order separated by commas e.g. `/api/<tablename>/1,2`
+        with each value percent encoded, see `format_identity`"""
+        primary_keys = self.primary_keys
+        values = value.split(",")
+        if not primary_keys or len(values) != len(primary_keys):
+            return None
+
+        try:
+            return tuple(
+                coerce_from_column(column)(unquote(v)) for column, v in zip(primary_keys, values)
+            )
+        except (TypeError, ValueError):
+            return None
+
     @property
     def operations(self):
         allowed_operations = [
@@ -138,7 +479,19 @@ class Model:
         ]
         return allowed_operations
 
-    def form(self, operation, multi_dict):
-        from .form import get_form
+    def form_class(self, operation):
+        if operation not in self._form_classes:
+            from .form import get_form_class
+
+            self._form_classes[operation] = get_form_class(self, operation)
+        return self._form_classes[operation]
 
-        return get_form(self, operation, multi_dict)
+    def page(self, key, render):
+        """A page of this model, `render()`ed the first time it's asked for by `key`"""
+        if key not in self._pages:
+            self._pages[key] = render()
+        return self._pages[key]
+
+    def form(self, operation, multi_dict):
+        with phase("form"):
+            return self.form_class(operation)(multi_dict, meta={"csrf": False})
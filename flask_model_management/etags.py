@@ -0,0 +1,94 @@
+import hashlib
+import threading
+import uuid
+from datetime import datetime
+from datetime import timezone
+
+import attr
+from sqlalchemy import func
+from sqlalchemy import select
+
+from .cache import CACHE_PREFIX
+
+# a fingerprint that counts the entries of the table, rather than the max of a column
+COUNT_FINGERPRINT = "count"
+
+
+def utcnow():
+    return datetime.now(timezone.utc).replace(microsecond=0)
+
+
+@attr.s
+class TableVersions:
+    """A version and last modified time per table, bumped whenever this extension
+    writes to it, so a read can tell whether its result could have changed without
+    querying the table
+
+    Versions are kept in memory, so only this process's writes bump them, unless a
+    `backend` every process shares is given (a cache backend e.g. `cache.RedisCache`).
+    `instance` is part of every ETag so a version from another run never matches, with
+    a backend it is kept there too so every process has the same one
+    """
+
+    backend = attr.ib(default=None)
+    prefix = attr.ib(default=CACHE_PREFIX)
+    started = attr.ib(factory=utcnow)
+    _instance = attr.ib(factory=lambda: uuid.uuid4().hex, repr=False)
+    _versions = attr.ib(factory=dict, repr=False)
+    _modified = attr.ib(factory=dict, repr=False)
+    _lock = attr.ib(factory=threading.Lock, repr=False)
+
+    @property
+    def instance(self):
+        if self.backend is None:
+            return self._instance
+
+        key = f"{self.prefix}:etag:instance"
+        instance = self.backend.get(key)
+        if instance is None:
+            # processes racing to set it only ever miss a 304, never send a stale one
+            instance = self._instance
+            self.backend.set(key, instance)
+        return instance
+
+    def bump(self, tablename):
+        if self.backend is not None:
+            self.backend.incr(f"{self.prefix}:etag:version:{tablename}")
+            self.backend.set(f"{self.prefix}:etag:modified:{tablename}", utcnow().timestamp())
+            return
+
+        with self._lock:
+            self._versions[tablename] = self._versions.get(tablename, 0) + 1
+            self._modified[tablename] = utcnow()
+
+    def version(self, tablename):
+        if self.backend is not None:
+            return int(self.backend.get(f"{self.prefix}:etag:version:{tablename}") or 0)
+        return self._versions.get(tablename, 0)
+
+    def modified(self, tablename):
+        if self.backend is not None:
+            timestamp = self.backend.get(f"{self.prefix}:etag:modified:{tablename}")
+            return datetime.fromtimestamp(float(timestamp), timezone.utc) if timestamp else None
+        return self._modified.get(tablename)
+
+    def last_modified(self, tablenames):
+        """When any of the tables were last written to, or when counting started"""
+        return max([self.modified(name) or self.started for name in tablenames])
+
+    def etag(self, tablenames, *parts):
+        """An ETag for a read of the tables, `parts` are anything else its response
+        depends on e.g. the query string"""
+        versions = [(name, self.version(name)) for name in tablenames]
+        key = repr((self.instance, versions, parts)).encode()
+        return hashlib.sha1(key).hexdigest()
+
+
+def read_fingerprint(session, table, fingerprint):
+    """The database's own idea of whether the table changed, to notice writes made
+    outside this extension: the entry count or the max of a column like `updated_at`"""
+    if fingerprint == COUNT_FINGERPRINT:
+        statement = select(func.count()).select_from(table)
+    else:
+        statement = select(func.max(table.c[fingerprint]))
+    return session.execute(statement).scalar()
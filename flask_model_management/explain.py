@@ -0,0 +1,108 @@
+import re
+
+import attr
+from sqlalchemy import UniqueConstraint
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement
+from sqlalchemy.sql.expression import Executable
+
+# the estimate of the top node of a postgres plan e.g. "(cost=0.00..35.50 rows=2550 width=4)"
+POSTGRESQL_ROWS = re.compile(r"rows=(\d+)")
+
+
+def get_indexed_columns(table) -> set:
+    """The names of the columns of a table an index can look up on its own: the first
+    column of its primary key, of each index and of each unique constraint"""
+    leading = list(table.primary_key.columns)[:1]
+    leading += [list(index.columns)[0] for index in table.indexes if index.columns]
+    leading += [
+        list(constraint.columns)[0]
+        for constraint in table.constraints
+        if isinstance(constraint, UniqueConstraint) and constraint.columns
+    ]
+    leading += [col for col in table.columns if col.index or col.unique]
+    return {col.name for col in leading}
+
+
+class Explain(Executable, ClauseElement):
+    """`<prefix> <statement>` e.g. `EXPLAIN SELECT ...`, its parameters are bound as usual
+    so the plan is the one the statement itself would get"""
+
+    inherit_cache = False
+
+    def __init__(self, statement, prefix="EXPLAIN"):
+        self.statement = statement
+        self.prefix = prefix
+
+
+@compiles(Explain)
+def compile_explain(element, compiler, **kwargs):
+    sql = f"{element.prefix} {compiler.process(element.statement, **kwargs)}"
+    # the rows are the plan's not the statement's, so neither its result columns are
+    # used to read them nor is it treated as an update or delete
+    compiler.isinsert = compiler.isupdate = compiler.isdelete = False
+    compiler._result_columns = []
+    return sql
+
+
+@attr.s
+class Plan:
+    """A statement's query plan as the database reports it, the statement isn't run
+
+    `estimated_rows` is the planner's estimate of the rows it reads or changes, None
+    when the dialect doesn't estimate, `full_scan` is whether a table is read in full
+    rather than through an index
+    """
+
+    dialect = attr.ib()
+    lines = attr.ib(factory=list)
+    estimated_rows = attr.ib(default=None)
+    full_scan = attr.ib(default=False)
+
+
+def sqlite_plan(session, statement):
+    # sqlite doesn't estimate rows, each step is a SCAN (every row) or a SEARCH (index)
+    rows = session.execute(Explain(statement, "EXPLAIN QUERY PLAN")).all()
+    lines = [row[-1] for row in rows]
+    full_scan = any(line.startswith("SCAN") and " USING " not in line for line in lines)
+    return Plan("sqlite", lines, full_scan=full_scan)
+
+
+def postgresql_plan(session, statement):
+    lines = list(session.execute(Explain(statement)).scalars())
+    match = POSTGRESQL_ROWS.search(lines[0]) if lines else None
+    return Plan(
+        "postgresql",
+        lines,
+        estimated_rows=int(match.group(1)) if match else None,
+        full_scan=any("Seq Scan" in line for line in lines),
+    )
+
+
+def mysql_plan(session, statement):
+    rows = session.execute(Explain(statement)).mappings().all()
+    lines = [
+        ", ".join(f"{key}={value}" for key, value in row.items() if value is not None)
+        for row in rows
+    ]
+    return Plan(
+        session.get_bind().dialect.name,
+        lines,
+        estimated_rows=rows[0]["rows"] if rows else None,
+        # "ALL" is a full table scan, "index" a full scan of an index
+        full_scan=any(row["type"] == "ALL" for row in rows),
+    )
+
+
+PLANS = {
+    "sqlite": sqlite_plan,
+    "postgresql": postgresql_plan,
+    "mysql": mysql_plan,
+    "mariadb": mysql_plan,
+}
+
+
+def explain(session, statement):
+    """The `Plan` of a statement, None on dialects without a supported EXPLAIN"""
+    plan = PLANS.get(session.get_bind().dialect.name)
+    return plan(session, statement) if plan is not None else None
@@ -0,0 +1,178 @@
+import csv
+import io
+import json
+from datetime import date
+from datetime import datetime
+from datetime import time
+from datetime import timedelta
+from itertools import islice
+
+import attr
+
+from .serialize import get_encoder
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None
+
+try:
+    import pyarrow
+except ImportError:  # pragma: no cover
+    pyarrow = None
+
+# rows are buffered into chunks of roughly this many characters before being
+# handed to the server, one write per row is far slower than one per chunk
+CHUNK_SIZE = 64 * 1024
+
+# rows per arrow record batch, each is encoded as one block per column
+ARROW_BATCH_SIZE = 10000
+
+
+def ndjson_encoder(columns, rows):
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write(json.dumps(row))
+        buffer.write("\n")
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def csv_encoder(columns, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow([row.get(column) for column in columns])
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def msgpack_encoder(columns, rows):
+    buffer = io.BytesIO()
+    packer = msgpack.Packer()
+    for row in rows:
+        buffer.write(packer.pack(row))
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def arrow_type(python_type):
+    """The arrow type of a column's python type, values of types arrow doesn't have
+    (or decimals, whose precision isn't known) are sent as text like in json"""
+    if python_type is None:
+        return pyarrow.string()
+    # bool is an int and a datetime is a date so they're checked first
+    for types, arrow in (
+        (bool, pyarrow.bool_),
+        (int, pyarrow.int64),
+        (float, pyarrow.float64),
+        (str, pyarrow.string),
+        (datetime, lambda: pyarrow.timestamp("us")),
+        (date, pyarrow.date32),
+        (time, lambda: pyarrow.time64("us")),
+        (timedelta, lambda: pyarrow.duration("us")),
+        (bytes, pyarrow.binary),
+    ):
+        if issubclass(python_type, types):
+            return arrow()
+    return pyarrow.string()
+
+
+def arrow_schema(columns):
+    """The arrow schema of the model's `columns` and how to convert each column's
+    values to its arrow type, None when arrow takes them as they are"""
+    fields = []
+    encoders = []
+    for column in columns:
+        python_type = column.type.python_type
+        arrow = arrow_type(python_type)
+        fields.append(pyarrow.field(column.name, arrow))
+        encoders.append(get_encoder(python_type) if arrow == pyarrow.string() else None)
+    return pyarrow.schema(fields), encoders
+
+
+def arrow_batch(schema, encoders, rows):
+    values = list(zip(*rows)) if rows else [()] * len(schema)
+    arrays = []
+    for field, encoder, column in zip(schema, encoders, values):
+        if encoder is not None:
+            column = [encoder(value) if value is not None else None for value in column]
+        arrays.append(pyarrow.array(column, type=field.type))
+    return pyarrow.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def arrow_encoder(columns, rows):
+    """An arrow IPC stream, one record batch per `ARROW_BATCH_SIZE` rows
+
+    Unlike the other encoders it is given the model's columns and the database's
+    values, not serialized rows, so every column keeps its type
+    """
+    schema, encoders = arrow_schema(columns)
+    rows = iter(rows)
+    buffer = io.BytesIO()
+    with pyarrow.ipc.new_stream(buffer, schema) as writer:
+        while True:
+            batch = list(islice(rows, ARROW_BATCH_SIZE))
+            if not batch:
+                break
+            writer.write_batch(arrow_batch(schema, encoders, batch))
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+
+    # the schema of an empty stream and its end of stream marker
+    yield buffer.getvalue()
+
+
+@attr.s
+class ExportFormat:
+    """A way of streaming rows out of the database"""
+
+    name = attr.ib()
+    mimetype = attr.ib()
+    extension = attr.ib()
+    encoder = attr.ib()
+    # encodes the database's values typed by the model's columns, not serialized rows
+    typed = attr.ib(default=False)
+
+    def encode(self, columns, rows):
+        return self.encoder(columns, rows)
+
+
+EXPORT_FORMATS = {
+    export_format.name: export_format
+    for export_format in (
+        ExportFormat("ndjson", "application/x-ndjson", "ndjson", ndjson_encoder),
+        ExportFormat("csv", "text/csv", "csv", csv_encoder),
+    )
+}
+
+# only offered when their library is installed
+if msgpack is not None:
+    EXPORT_FORMATS["msgpack"] = ExportFormat(
+        "msgpack", "application/msgpack", "msgpack", msgpack_encoder
+    )
+if pyarrow is not None:
+    EXPORT_FORMATS["arrow"] = ExportFormat(
+        "arrow", "application/vnd.apache.arrow.stream", "arrows", arrow_encoder, typed=True
+    )
+
+
+def get_export_format(name):
+    return EXPORT_FORMATS.get(name)
@@ -2,6 +2,12 @@ from flask_wtf import FlaskForm
 from wtforms import SubmitField
 
 from .domain import field_from_column
+from .domain import field_from_operator
+from .domain import INDEXED
+from .instrumentation import phase
+
+# separates a column from an operator in a filter field e.g. `filter_id__gt`
+OPERATOR_SEP = "__"
 
 
 class CRUDForm(FlaskForm):
@@ -9,13 +15,27 @@ class CRUDForm(FlaskForm):
 
     confirm = SubmitField("Confirm")
 
+    def validate(self, *args, **kwargs):
+        with phase("validate"):
+            return super().validate(*args, **kwargs)
+
     @property
     def fields(self):
         return [field for field in self if field.name not in self.HIDDEN_FIELDS]
 
     @property
     def filter_fields(self):
-        return self._get_labelled_fields("filter_")
+        return [
+            field
+            for field in self._get_labelled_fields("filter_")
+            if OPERATOR_SEP not in field.name
+        ]
+
+    @property
+    def operator_fields(self):
+        return [
+            field for field in self._get_labelled_fields("filter_") if OPERATOR_SEP in field.name
+        ]
 
     @property
     def insert_fields(self):
@@ -42,6 +62,16 @@ class CRUDForm(FlaskForm):
     def insert_params(self):
         return self._get_labelled_params("insert_")
 
+    @property
+    def replace_params(self):
+        """Every insert param including the empty ones, for replacing a whole entry"""
+        params = {}
+        for k, v in self.data.items():
+            if k.startswith("insert_") and k not in self.HIDDEN_FIELDS:
+                params[self.strip_prefix(k)] = v
+
+        return params
+
     @property
     def is_filter(self):
         return any([attr.startswith("filter_") for attr in self.data])
@@ -85,13 +115,24 @@ def get_protocols(operation_name):
         raise ValueError("must be a crud operation")
 
 
-def get_form(model, operation, multi_dict):
+def get_form_class(model, operation):
     form = type(f"{operation.title()}Form", (CRUDForm,), {})
 
     for column in model.columns:
         protocols = get_protocols(operation)
         for protocol in protocols:
             name = protocol + "_" + column.name
-            setattr(form, name, field_from_column(column))
+            description = INDEXED if protocol == "filter" and column.indexed else ""
+            field = field_from_column(column, tablename=model.name, description=description)
+            setattr(form, name, field)
 
-    return form(multi_dict, meta={"csrf": False})
+            if protocol == "filter":
+                for operator, label in column.operators:
+                    field = field_from_operator(column, operator, label)
+                    setattr(form, name + OPERATOR_SEP + operator, field)
+
+    return form
+
+
+def get_form(model, operation, multi_dict):
+    return model.form_class(operation)(multi_dict, meta={"csrf": False})
@@ -0,0 +1,115 @@
+import gzip
+import zlib
+
+from flask import request
+
+from .export import EXPORT_FORMATS
+from .export import get_export_format
+from .export import msgpack
+from .export import pyarrow
+from .instrumentation import phase
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+ARROW = "application/vnd.apache.arrow.stream"
+
+# responses of these types are compressed when the client accepts it
+COMPRESSIBLE_MIMETYPES = (JSON, MSGPACK, ARROW, "application/x-ndjson", "text/csv")
+# below this many bytes compressing costs more than it saves
+MIN_COMPRESS_SIZE = 1024
+# fast levels, a response is compressed every time it is sent
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+
+def is_available(mimetype):
+    if mimetype == MSGPACK:
+        return msgpack is not None
+    elif mimetype == ARROW:
+        return pyarrow is not None
+    return True
+
+
+def negotiate(*mimetypes):
+    """The one of `mimetypes` the client's `Accept` prefers, the first when it has no
+    preference (e.g. `*/*`), those whose library isn't installed aren't offered"""
+    offered = [mimetype for mimetype in mimetypes if is_available(mimetype)]
+    return request.accept_mimetypes.best_match(offered, default=offered[0])
+
+
+def negotiate_export_format():
+    """The export format asked for with `?format=`, or else by `Accept`"""
+    name = request.args.get("format")
+    if name:
+        return get_export_format(name)
+
+    by_mimetype = {
+        export_format.mimetype: export_format for export_format in EXPORT_FORMATS.values()
+    }
+    return by_mimetype[negotiate(*by_mimetype)]
+
+
+def get_content_encoding():
+    """The compression the client's `Accept-Encoding` allows, zstd over gzip"""
+    if zstandard is not None and request.accept_encodings["zstd"]:
+        return "zstd"
+    elif request.accept_encodings["gzip"]:
+        return "gzip"
+    return None
+
+
+def compress(data, encoding):
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def compress_stream(chunks, encoding):
+    """Compress a streamed response as it is sent, one compressor for the whole stream"""
+    if encoding == "zstd":
+        compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+    else:
+        # 31 is a deflate stream with a gzip header and trailer
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    try:
+        for chunk in chunks:
+            data = compressor.compress(chunk.encode() if isinstance(chunk, str) else chunk)
+            if data:
+                yield data
+        yield compressor.flush()
+    finally:
+        if hasattr(chunks, "close"):
+            chunks.close()
+
+
+def encode_response(response):
+    """Compress a response of the api with the client's preferred encoding, responses
+    negotiated by `Accept` and `Accept-Encoding` say so with `Vary`"""
+    if response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return response
+
+    response.vary.update(("Accept", "Accept-Encoding"))
+    encoding = get_content_encoding()
+    if encoding is None or response.status_code != 200 or response.content_encoding:
+        return response
+
+    if response.is_streamed:
+        response.response = compress_stream(response.response, encoding)
+    elif response.content_length is not None and response.content_length >= MIN_COMPRESS_SIZE:
+        with phase("compress"):
+            response.set_data(compress(response.get_data(), encoding))
+    else:
+        return response
+
+    response.content_encoding = encoding
+    etag, weak = response.get_etag()
+    if etag:
+        # the compressed body is different bytes, see `conditional`
+        response.set_etag(f"{etag}-{encoding}", weak)
+    return response
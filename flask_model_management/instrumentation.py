@@ -0,0 +1,183 @@
+import contextlib
+import math
+import threading
+import time
+from collections import deque
+
+import attr
+from flask import current_app
+from flask import g
+from flask import has_request_context
+from flask.signals import Namespace
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# how many requests are kept per (table, operation) to calculate percentiles from
+SAMPLE_LIMIT = 1000
+
+PERCENTILES = (50, 95, 99)
+
+signals = Namespace()
+
+# sent with the `RequestTimings` of every instrumented request once it is finished
+operation_timed = signals.signal("model-management-operation-timed")
+
+
+def get_timings():
+    """The timings of the current request, or None if it isn't being instrumented"""
+    if has_request_context():
+        return g.get("_model_management_timings")
+    return None
+
+
+@contextlib.contextmanager
+def phase(name):
+    """Time a phase of the current request, a no-op when instrumentation is off"""
+    timings = get_timings()
+    if timings is None:
+        yield
+        return
+
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add_phase(name, time.perf_counter() - started)
+
+
+def percentile(samples, p):
+    """The nearest-rank percentile of a sorted list"""
+    if not samples:
+        return None
+    rank = math.ceil(p / 100 * len(samples))
+    return samples[max(rank - 1, 0)]
+
+
+@attr.s
+class RequestTimings:
+    """Where the time of one request went, all durations are in seconds"""
+
+    table = attr.ib()
+    operation = attr.ib()
+    started = attr.ib(factory=time.perf_counter)
+    phases = attr.ib(factory=dict)
+    statements = attr.ib(default=0)
+    db_time = attr.ib(default=0.0)
+    total = attr.ib(default=None)
+
+    def add_phase(self, name, duration):
+        self.phases[name] = self.phases.get(name, 0.0) + duration
+
+    def add_statement(self, duration):
+        self.statements += 1
+        self.db_time += duration
+
+    def finish(self):
+        self.total = time.perf_counter() - self.started
+
+    @property
+    def server_timing(self):
+        metrics = [f"{name};dur={duration * 1000:.2f}" for name, duration in self.phases.items()]
+        metrics.append(f'db;dur={self.db_time * 1000:.2f};desc="{self.statements} statements"')
+        metrics.append(f"total;dur={self.total * 1000:.2f}")
+        return ", ".join(metrics)
+
+
+@attr.s
+class OperationStats:
+    """Recent timings of one operation on one table"""
+
+    table = attr.ib()
+    operation = attr.ib()
+    count = attr.ib(default=0)
+    totals = attr.ib(factory=lambda: deque(maxlen=SAMPLE_LIMIT))
+    db_times = attr.ib(factory=lambda: deque(maxlen=SAMPLE_LIMIT))
+    statements = attr.ib(factory=lambda: deque(maxlen=SAMPLE_LIMIT))
+
+    def add(self, timings):
+        self.count += 1
+        self.totals.append(timings.total)
+        self.db_times.append(timings.db_time)
+        self.statements.append(timings.statements)
+
+    def summary(self):
+        totals = sorted(self.totals)
+        db_times = sorted(self.db_times)
+        summary = {"table": self.table, "operation": self.operation, "count": self.count}
+        for p in PERCENTILES:
+            summary[f"p{p}"] = percentile(totals, p)
+            summary[f"db_p{p}"] = percentile(db_times, p)
+        summary["mean_statements"] = sum(self.statements) / len(self.statements)
+        return summary
+
+
+class Instrumentation:
+    """Per-request phase timings, SQL statement counts & an in-process aggregate
+
+    Timings are sent with the `operation_timed` signal, passed to any callback
+    registered with `connect`, added as a `Server-Timing` response header and
+    aggregated into percentiles per table and operation
+    """
+
+    _listening = False
+
+    def __init__(self):
+        self.callbacks = []
+        self.stats = {}
+        self.lock = threading.Lock()
+
+    def connect(self, callback):
+        """Call `callback(timings)` with the `RequestTimings` of every request"""
+        self.callbacks.append(callback)
+        return callback
+
+    @classmethod
+    def listen(cls):
+        # listening on the Engine class catches every engine and bind, statements
+        # outside an instrumented request return straight away
+        if cls._listening:
+            return
+
+        event.listen(Engine, "before_cursor_execute", before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", after_cursor_execute)
+        cls._listening = True
+
+    def start(self, table, operation):
+        g._model_management_timings = RequestTimings(table, operation)
+
+    def finish(self, response):
+        timings = get_timings()
+        if timings is None:
+            return response
+
+        timings.finish()
+        response.headers["Server-Timing"] = timings.server_timing
+
+        with self.lock:
+            key = (timings.table, timings.operation)
+            if key not in self.stats:
+                self.stats[key] = OperationStats(timings.table, timings.operation)
+            self.stats[key].add(timings)
+
+        operation_timed.send(current_app._get_current_object(), timings=timings)
+        for callback in self.callbacks:
+            callback(timings)
+
+        return response
+
+    def summary(self):
+        with self.lock:
+            summaries = [stats.summary() for stats in self.stats.values()]
+        return sorted(summaries, key=lambda summary: (str(summary["table"]), summary["operation"]))
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if get_timings() is not None:
+        conn.info.setdefault("_model_management_started", []).append(time.perf_counter())
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    timings = get_timings()
+    started = conn.info.get("_model_management_started")
+    if timings is not None and started:
+        timings.add_statement(time.perf_counter() - started.pop())
@@ -0,0 +1,271 @@
+import json
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+
+import attr
+from sqlalchemy import Column
+from sqlalchemy import DateTime
+from sqlalchemy import insert
+from sqlalchemy import Integer
+from sqlalchemy import MetaData
+from sqlalchemy import select
+from sqlalchemy import String
+from sqlalchemy import Table
+from sqlalchemy import Text
+from sqlalchemy import update
+from werkzeug.datastructures import MultiDict
+
+from .crud import CRUD
+from .crud import CRUDFailure
+from .crud import get_limits
+
+PENDING = "pending"
+RUNNING = "running"
+CANCELLED = "cancelled"
+FAILED = "failed"
+DONE = "done"
+
+JOB_OPERATIONS = ("update", "delete")
+
+# how many entries each transaction of a job changes
+DEFAULT_CHUNK_SIZE = 10000
+
+# how many jobs run at the same time
+DEFAULT_JOB_WORKERS = 2
+
+# seconds a running job can go without saving progress before it's thought to be stopped
+# and can be resumed, it has to be longer than any one chunk takes
+DEFAULT_JOB_LEASE = 300
+
+metadata = MetaData()
+
+
+def utcnow():
+    return datetime.now(timezone.utc)
+
+
+def as_utc(value):
+    """Databases that don't keep the offset (sqlite, mysql) read the times back naive"""
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+# progress is kept in the database so a job can be resumed by another worker
+job_table = Table(
+    "model_management_job",
+    metadata,
+    Column("id", String(32), primary_key=True),
+    Column("tablename", String(255), nullable=False, index=True),
+    Column("operation", String(16), nullable=False),
+    Column("form_data", Text, nullable=False),
+    Column("chunk_size", Integer, nullable=False),
+    Column("status", String(16), nullable=False),
+    Column("last_key", String(255)),
+    Column("count", Integer, nullable=False, default=0),
+    Column("error", Text),
+    # the runner holding the job, only it can save progress, see `JobStore.claim`
+    Column("owner", String(32)),
+    Column("created_at", DateTime(timezone=True), nullable=False),
+    Column("updated_at", DateTime(timezone=True), nullable=False),
+)
+
+
+@attr.s
+class Job:
+    """A bulk update or delete run in chunks of `chunk_size` entries in primary key order
+
+    `form_data` is the submitted form, kept as is so a resumed job validates it again,
+    `last_key` is the primary key the last committed chunk ended at, `updated_at` is
+    refreshed by every chunk so a running job that stops doing so has lost its lease
+    """
+
+    tablename = attr.ib()
+    operation = attr.ib()
+    form_data = attr.ib()
+    chunk_size = attr.ib(default=DEFAULT_CHUNK_SIZE)
+    id = attr.ib(factory=lambda: uuid.uuid4().hex)
+    status = attr.ib(default=PENDING)
+    last_key = attr.ib(default=None)
+    count = attr.ib(default=0)
+    error = attr.ib(default=None)
+    owner = attr.ib(factory=lambda: uuid.uuid4().hex)
+    created_at = attr.ib(factory=utcnow, converter=as_utc)
+    updated_at = attr.ib(factory=utcnow, converter=as_utc)
+
+    def lease_expired(self, lease=DEFAULT_JOB_LEASE):
+        return self.updated_at < utcnow() - timedelta(seconds=lease)
+
+    @classmethod
+    def from_row(cls, row):
+        values = dict(row._mapping)
+        values["form_data"] = MultiDict(json.loads(values["form_data"]))
+        return cls(**values)
+
+    def to_row(self):
+        values = attr.asdict(self)
+        values["form_data"] = json.dumps(list(self.form_data.items(multi=True)))
+        return values
+
+    def to_json(self):
+        values = attr.asdict(self)
+        del values["form_data"]
+        del values["owner"]
+        values["created_at"] = self.created_at.isoformat()
+        values["updated_at"] = self.updated_at.isoformat()
+        return values
+
+
+@attr.s
+class JobStore:
+    """Keeps jobs in the `model_management_job` table, created on first use"""
+
+    engine = attr.ib()
+    _created = attr.ib(default=False, repr=False)
+
+    def connect(self):
+        if not self._created:
+            metadata.create_all(self.engine, checkfirst=True)
+            self._created = True
+        return self.engine.begin()
+
+    def add(self, job):
+        with self.connect() as connection:
+            connection.execute(insert(job_table).values(**job.to_row()))
+
+    def get(self, job_id):
+        with self.connect() as connection:
+            row = connection.execute(select(job_table).where(job_table.c.id == job_id)).first()
+        return Job.from_row(row) if row is not None else None
+
+    def list(self, tablename):
+        statement = (
+            select(job_table)
+            .where(job_table.c.tablename == tablename)
+            .order_by(job_table.c.created_at.desc())
+        )
+        with self.connect() as connection:
+            return [Job.from_row(row) for row in connection.execute(statement)]
+
+    def set_status(self, job, status, error=None, expected=None):
+        """Change a job's status, only if it is currently one of `expected` when given
+        and `job` is still its owner, returns whether it was changed"""
+        statement = update(job_table).where(
+            job_table.c.id == job.id, job_table.c.owner == job.owner
+        )
+        if expected is not None:
+            statement = statement.where(job_table.c.status.in_(expected))
+        job.updated_at = utcnow()
+        with self.connect() as connection:
+            result = connection.execute(
+                statement.values(status=status, error=error, updated_at=job.updated_at)
+            )
+        if result.rowcount:
+            job.status = status
+            job.error = error
+        return bool(result.rowcount)
+
+    def claim(self, job):
+        """Take the job over to run it, only if it hasn't changed since it was read,
+        returns whether it was claimed"""
+        owner = uuid.uuid4().hex
+        updated_at = utcnow()
+        statement = (
+            update(job_table)
+            .where(
+                job_table.c.id == job.id,
+                job_table.c.status == job.status,
+                job_table.c.updated_at == job.updated_at,
+            )
+            .values(status=RUNNING, error=None, owner=owner, updated_at=updated_at)
+        )
+        with self.connect() as connection:
+            if not connection.execute(statement).rowcount:
+                return False
+
+        job.status = RUNNING
+        job.error = None
+        job.owner = owner
+        job.updated_at = updated_at
+        return True
+
+    def save_progress(self, job):
+        """Record a committed chunk, returns False if the job has been cancelled or
+        claimed by another runner"""
+        job.updated_at = utcnow()
+        statement = (
+            update(job_table)
+            .where(
+                job_table.c.id == job.id,
+                job_table.c.status == RUNNING,
+                job_table.c.owner == job.owner,
+            )
+            .values(last_key=job.last_key, count=job.count, updated_at=job.updated_at)
+        )
+        with self.connect() as connection:
+            return bool(connection.execute(statement).rowcount)
+
+
+@attr.s
+class JobRunner:
+    """Runs jobs on a thread pool owned by the `ModelManager`"""
+
+    max_workers = attr.ib(default=DEFAULT_JOB_WORKERS)
+    _executor = attr.ib(default=None, repr=False)
+    _futures = attr.ib(factory=dict, repr=False)
+    _lock = attr.ib(factory=threading.Lock, repr=False)
+
+    @property
+    def executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    self.max_workers, thread_name_prefix="model_management_job"
+                )
+            return self._executor
+
+    def is_running(self, job_id):
+        future = self._futures.get(job_id)
+        return future is not None and not future.done()
+
+    def submit(self, app, store, model, job):
+        self._futures[job.id] = self.executor.submit(run_job, app, store, model, job)
+
+    def shutdown(self, wait=True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+
+
+def run_job(app, store, model, job):
+    """Commit one chunk at a time until no matching entries are left or the job is
+    cancelled, progress is saved after every chunk"""
+    with app.app_context():
+        form = model.form(job.operation, job.form_data)
+        if not form.validate():
+            store.set_status(job, FAILED, f"Invalid query fields: {form.errors}")
+            return
+
+        crud = CRUD(model.model, get_limits(model))
+        insert = form.insert_params if job.operation == "update" else None
+        after = model.coerce_primary_key(job.last_key)
+        try:
+            while True:
+                last, count = crud.execute_chunk(
+                    job.operation, form.filter_params, insert, after, job.chunk_size
+                )
+                if last is None:
+                    store.set_status(job, DONE, expected=(RUNNING,))
+                    return
+
+                after = last
+                job.last_key = str(last)
+                job.count += count
+                if not store.save_progress(job):
+                    return
+        except CRUDFailure as e:
+            store.set_status(job, FAILED, e.message, expected=(RUNNING,))
+        except Exception as e:
+            app.logger.exception("model management job %s failed", job.id)
+            store.set_status(job, FAILED, str(e), expected=(RUNNING,))
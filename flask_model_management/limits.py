@@ -0,0 +1,118 @@
+import contextlib
+import time
+
+import attr
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+# how many sqlite virtual machine instructions run between checks of the deadline
+SQLITE_PROGRESS_STEPS = 1000
+
+
+class LimitExceeded(Exception):
+    """An operation would cost more than its `Limits` allow"""
+
+
+class StatementTimeout(LimitExceeded):
+    """A statement ran for longer than its `Limits.statement_timeout`"""
+
+
+@attr.s(frozen=True)
+class Limits:
+    """Bounds on what a single operation can cost, None is unlimited
+
+    - statement_timeout: seconds any one statement can run for
+    - max_rows: rows a read can return, longer pages & bigger bulk reads fail
+    - max_affected: entries an update or delete can change, they are counted first
+    - unindexed_filter_rows: entries a table can have and still be filtered without any
+      filter an index can serve, bigger tables refuse such filters rather than scan
+    """
+
+    statement_timeout = attr.ib(default=None)
+    max_rows = attr.ib(default=None)
+    max_affected = attr.ib(default=None)
+    unindexed_filter_rows = attr.ib(default=None)
+
+    def merge(self, other):
+        """These limits with the ones set in `other` taking precedence"""
+        if other is None:
+            return self
+        return attr.evolve(self, **{k: v for k, v in attr.asdict(other).items() if v is not None})
+
+
+def set_progress_handler(session, handler):
+    connection = session.connection().connection
+    if hasattr(connection.dbapi_connection, "set_progress_handler"):
+        connection.dbapi_connection.set_progress_handler(handler, SQLITE_PROGRESS_STEPS)
+    else:
+        # aiosqlite runs statements on its own thread, so it is set there, this is only
+        # reached from `AsyncSession.run_sync` which can await it
+        from sqlalchemy.util import await_only
+
+        await_only(
+            connection.driver_connection.set_progress_handler(handler, SQLITE_PROGRESS_STEPS)
+        )
+
+
+@contextlib.contextmanager
+def sqlite_timeout(session, seconds):
+    # sqlite has no timeout but interrupts a statement when its progress handler says so
+    deadline = time.monotonic() + seconds
+    set_progress_handler(session, lambda: time.monotonic() > deadline)
+    try:
+        yield
+    finally:
+        set_progress_handler(session, None)
+
+
+@contextlib.contextmanager
+def mysql_timeout(session, seconds):
+    # only applies to SELECTs, and is per connection so is put back afterwards
+    session.execute(text(f"SET SESSION max_execution_time = {int(seconds * 1000)}"))
+    try:
+        yield
+    finally:
+        session.execute(text("SET SESSION max_execution_time = DEFAULT"))
+
+
+@contextlib.contextmanager
+def mariadb_timeout(session, seconds):
+    session.execute(text(f"SET SESSION max_statement_time = {float(seconds)}"))
+    try:
+        yield
+    finally:
+        session.execute(text("SET SESSION max_statement_time = DEFAULT"))
+
+
+@contextlib.contextmanager
+def postgresql_timeout(session, seconds):
+    # lasts until the end of the transaction
+    session.execute(text(f"SET LOCAL statement_timeout = {int(seconds * 1000)}"))
+    yield
+
+
+TIMEOUTS = {
+    "sqlite": sqlite_timeout,
+    "mysql": mysql_timeout,
+    "mariadb": mariadb_timeout,
+    "postgresql": postgresql_timeout,
+}
+
+
+@contextlib.contextmanager
+def statement_timeout(session, seconds):
+    """Cancel the statements run on `session` in this block after `seconds`, on dialects
+    without a way to do so it does nothing"""
+    timeout = TIMEOUTS.get(session.get_bind().dialect.name)
+    if not seconds or timeout is None:
+        yield
+        return
+
+    started = time.monotonic()
+    try:
+        with timeout(session, seconds):
+            yield
+    except DBAPIError as e:
+        if time.monotonic() - started < seconds:
+            raise
+        raise StatementTimeout(f"Cancelled after the {seconds}s statement timeout") from e
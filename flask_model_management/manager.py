@@ -1,16 +1,69 @@
+import csv
+import inspect
+import io
 import os
+import threading
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+from functools import wraps
 from pathlib import Path
 
+from flask import abort
 from flask import Blueprint
 from flask import current_app
+from flask import g
+from flask import has_request_context
 from flask import jsonify
+from flask import make_response
 from flask import render_template
 from flask import request
+from flask import Response
+from flask import session
+from flask import stream_with_context
 from flask import url_for
-
+from sqlalchemy.orm import Session
+
+from .assets import StaticAssets
+from .batch import parse_batch
+from .cache import LocalCache
+from .cache import ResultCache
+from .counting import Counter
+from .counting import DEFAULT_COUNT_TTL
+from .counting import EXACT
+from .crud import AUTOCOMPLETE_LIMIT
+from .crud import CREATE_BATCH_SIZE
 from .crud import CRUDFailure
 from .crud import get_crud
+from .discovery import LazyModels
 from .domain import Model
+from .domain import RESERVED_IDENTITIES
+from .etags import TableVersions
+from .formats import ARROW
+from .formats import encode_response
+from .formats import get_content_encoding
+from .formats import JSON
+from .formats import MSGPACK
+from .formats import msgpack
+from .formats import negotiate
+from .formats import negotiate_export_format
+from .instrumentation import Instrumentation
+from .instrumentation import phase
+from .instrumentation import SAMPLE_LIMIT
+from .jobs import CANCELLED
+from .jobs import DEFAULT_CHUNK_SIZE
+from .jobs import DEFAULT_JOB_LEASE
+from .jobs import DEFAULT_JOB_WORKERS
+from .jobs import DONE
+from .jobs import Job
+from .jobs import JOB_OPERATIONS
+from .jobs import JobRunner
+from .jobs import JobStore
+from .jobs import PENDING
+from .jobs import RUNNING
+from .limits import LimitExceeded
+from .limits import Limits
+from .paging import Page
 
 URL_PREFIX = "/model-management"
 APP_NAME = "model_management"
@@ -21,22 +74,218 @@ STATIC_DIR = THIS_DIR / "static"
 
 EXTENSION = "model_management"
 
+# set for `read_your_writes` seconds after a client writes so its reads use the primary
+READ_PRIMARY_COOKIE = "model_management_read_primary"
+DEFAULT_READ_YOUR_WRITES = 5
+
+# the operations whose query plan can be shown before they're run
+EXPLAIN_OPERATIONS = ("read", "update", "delete")
+
+# how many models are listed per page of the index
+INDEX_PAGE_LENGTH = 50
+# the sidebar lists every model up to this many, beyond it only the current one
+SIDEBAR_MODELS = 25
+
 
 def get_model_manager():
     return current_app.extensions["model_management"]
 
 
 def get_model(tablename):
-    return current_app.extensions["model_management"].models[tablename]
+    model = current_app.extensions["model_management"].get_model(tablename)
+    if model is None:
+        abort(404)
+    return model
+
+
+def get_returning(form_data):
+    returning = form_data.get("returning")
+    return [name.strip() for name in returning.split(",")] if returning else []
+
+
+def get_uploaded_rows(req):
+    """Rows posted as a json array of objects, a csv `file` upload or a csv body"""
+    if req.is_json:
+        rows = req.get_json(silent=True)
+        if isinstance(rows, list) and all(isinstance(row, dict) for row in rows):
+            return rows
+        return None
+
+    if "file" in req.files:
+        stream = req.files["file"].stream
+    elif req.mimetype == "text/csv":
+        stream = io.BytesIO(req.get_data())
+    else:
+        return None
+
+    return list(csv.DictReader(io.TextIOWrapper(stream, encoding="utf-8")))
+
+
+def get_columns(model):
+    """The columns asked for with `?columns=<col>,<col>`, or None for all of them"""
+    columns = request.args.get("columns")
+    if not columns:
+        return None
+
+    names = [name.strip() for name in columns.split(",")]
+    unknown = [name for name in names if name not in model.column_names]
+    if unknown:
+        raise CRUDFailure(f"Unknown columns: {', '.join(unknown)}", "read")
+    return names
+
+
+def is_columnar():
+    """Whether rows should be sent as one array per column: `?orient=columns`"""
+    return request.args.get("orient") == "columns"
+
+
+def is_dry_run():
+    """Whether a bulk update or delete should only count what it would change"""
+    return request.values.get("dry_run", "").lower() == "true"
+
+
+def respond(**kwargs):
+    # only successful reads are given an ETag, see `conditional`
+    g.model_management_success = kwargs.get("success", False)
+    if negotiate(JSON, MSGPACK) == MSGPACK:
+        with phase("encode"):
+            return Response(msgpack.packb(kwargs), mimetype=MSGPACK)
+    with phase("jsonify"):
+        return jsonify(**kwargs)
+
+
+def respond_arrow(data):
+    """Rows as an arrow IPC stream, which has no room for a message so only successes
+    are sent like this"""
+    g.model_management_success = True
+    return Response(data, mimetype=ARROW)
+
+
+class NotModified(Response):
+    """A 304 which keeps its `Last-Modified`, werkzeug drops it with the entity headers"""
+
+    def __init__(self, etag, last_modified):
+        super().__init__(status=304)
+        self.set_etag(etag)
+        self.last_modified = last_modified
+
+    def get_wsgi_headers(self, environ):
+        headers = super().get_wsgi_headers(environ)
+        if "Last-Modified" in self.headers:
+            headers["Last-Modified"] = self.headers["Last-Modified"]
+        return headers
+
+
+def get_read_etag(model, fingerprint=None):
+    """The ETag & last modified time of a read of `model` with this request's query
+    string, from the versions of the tables it reads and the model's fingerprint"""
+    manager = get_model_manager()
+    tablenames = [model.name] + model.referenced_tablenames
+    # `_` is a cache buster jquery adds, it doesn't change the response
+    args = [(k, v) for k, v in request.args.items(multi=True) if k != "_"]
+    etag = manager.versions.etag(
+        tablenames, fingerprint, request.path, args, request.headers.get("Accept")
+    )
+    return etag, manager.versions.last_modified(tablenames)
+
+
+def conditional(view):
+    """Answer a read whose `If-None-Match` has its current ETag with a 304 before any
+    query is run or anything is serialized, otherwise send the ETag with the response,
+    only for models the manager `uses_etags` for
+
+    `Cache-Control: no-cache` makes the browser ask every time rather than guess how
+    long the response stays fresh
+    """
+
+    def etag_model(tablename):
+        model = get_model(tablename)
+        manager = get_model_manager()
+        tablenames = [model.name] + model.referenced_tablenames
+        if not manager.uses_etags(model) or not manager.caches_reads(tablenames):
+            return None
+        return model
+
+    def not_modified(model, fingerprint):
+        etag, last_modified = get_read_etag(model, fingerprint)
+        # a compressed response's ETag has its encoding, see `encode_response`
+        encoding = get_content_encoding()
+        etags = [etag, f"{etag}-{encoding}"] if encoding else [etag]
+        matched = [tag for tag in etags if request.if_none_match.contains_weak(tag)]
+        if matched:
+            # a 304 has the validators a 200 would, so caches can update what they hold
+            response = NotModified(matched[0], last_modified)
+        else:
+            response = None
+        return response, etag, last_modified
+
+    def with_etag(response, etag, last_modified):
+        response = make_response(response)
+        if etag is None:
+            return response
+        if response.status_code == 200 and g.get("model_management_success"):
+            response.set_etag(etag)
+            response.last_modified = last_modified
+        response.headers["Cache-Control"] = "no-cache"
+        return response
+
+    if inspect.iscoroutinefunction(view):
+        from .async_crud import get_async_crud
+
+        @wraps(view)
+        async def async_wrapper(tablename, **kwargs):
+            response, etag, last_modified = None, None, None
+            model = etag_model(tablename)
+            if model is not None:
+                # the fingerprint is read on the async engine like the rest of the view
+                fingerprint = (
+                    await get_async_crud().fingerprint(model) if model.fingerprint else None
+                )
+                response, etag, last_modified = not_modified(model, fingerprint)
+            if response is None:
+                response = await view(tablename, **kwargs)
+            return with_etag(response, etag, last_modified)
+
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(tablename, **kwargs):
+        response, etag, last_modified = None, None, None
+        model = etag_model(tablename)
+        if model is not None:
+            fingerprint = get_crud().fingerprint(model) if model.fingerprint else None
+            response, etag, last_modified = not_modified(model, fingerprint)
+        if response is None:
+            response = view(tablename, **kwargs)
+        return with_etag(response, etag, last_modified)
+
+    return wrapper
 
 
 def get_url(endpoint, **params):
-    location = get_model_manager().name + "." + endpoint
-    return url_for(location, **params)
+    manager = get_model_manager()
+    if endpoint == "static":
+        params.update(manager.assets.url_params(params["filename"]))
+    return url_for(manager.name + "." + endpoint, **params)
 
 
 class ModelManager:
-    def __init__(self, name=None, url_prefix=None, db=None):
+    def __init__(
+        self,
+        name=None,
+        url_prefix=None,
+        db=None,
+        log_payloads=False,
+        instrument=False,
+        cache=None,
+        async_engine=None,
+        read_bind=None,
+        read_your_writes=DEFAULT_READ_YOUR_WRITES,
+        limits=None,
+        job_workers=DEFAULT_JOB_WORKERS,
+        job_lease=DEFAULT_JOB_LEASE,
+        etags=None,
+    ):
         # set endpoint
         # default is `model_management`
         self.name = name or APP_NAME
@@ -48,12 +297,76 @@ class ModelManager:
         # set location for models to be stored
         self.models = {}
 
+        # bases whose models are registered when first used, see `register_base`
+        self.lazy_models = []
+        self._lock = threading.Lock()
+
         # set db object
         self.db = db
 
+        # log the full data output of every operation at DEBUG
+        # default is off, only counts, durations and a small sample are logged
+        self.log_payloads = log_payloads
+
+        # time each request's phases & sql, see `instrumentation.Instrumentation`
+        # default is off
+        self.instrumentation = Instrumentation() if instrument else None
+
+        # counts entries with each model's count strategy & caches them
+        self.counter = Counter()
+
+        # cache the results of reads until this extension writes to the table
+        # default is off, pass `True` for an in-process cache or a `cache.ResultCache`
+        self.cache = ResultCache() if cache is True else cache or None
+
+        # serve reads from async views on this `sqlalchemy.ext.asyncio.AsyncEngine`
+        # default is off, needs `sqlalchemy[asyncio]` & `flask[async]`
+        self.async_session = None
+        if async_engine is not None:
+            from .async_crud import create_async_sessionmaker
+
+            self.async_session = create_async_sessionmaker(async_engine)
+
+        # send read only queries to a replica, either an `Engine` or the key of one of
+        # flask-sqlalchemy's `SQLALCHEMY_BINDS`, default is off (everything on `db.session`)
+        self.read_bind = read_bind
+
+        # after a client writes its reads go to the primary for this many seconds so it
+        # sees its own changes while the replica catches up
+        self.read_your_writes = read_your_writes
+
+        # bound the cost of every operation, see `limits.Limits`, models can override them
+        # default is unlimited
+        self.limits = limits or Limits()
+
+        # runs chunked bulk update & delete jobs in the background, see `jobs.JobRunner`
+        self.jobs = JobRunner(job_workers)
+        self.job_lease = job_lease
+        self._job_stores = {}
+
+        # static files are served from memory, compressed and with content hashed urls
+        self.assets = StaticAssets(STATIC_DIR)
+
+        # bumped on every write so reads can be answered with 304 Not Modified, kept in
+        # the cache's backend when it is shared between processes e.g. redis
+        shared = self.cache is not None and not isinstance(self.cache.backend, LocalCache)
+        self.versions = TableVersions(self.cache.backend if shared else None)
+
+        # send reads with an ETag, see `conditional`. The default only does when it can't
+        # go stale: versions are shared or the model has a `fingerprint`, `True` always
+        # does, which is only right for an app run in one process, `False` never does
+        self.etags = etags
+
     def register_model(
         self,
         model,
+        orm_events: bool = False,
+        searchable_columns: list = None,
+        count_strategy: str = EXACT,
+        count_ttl: int = DEFAULT_COUNT_TTL,
+        limits: Limits = None,
+        reference_labels: dict = None,
+        fingerprint: str = None,
         # excluded_columns: list = None,
         # excluded_operations: list = None,
         # decorators: list = None,
@@ -64,9 +377,117 @@ class ModelManager:
         #     "view_decorators": decorators or [],
         # }
 
-        model = Model(model)
+        model = Model(
+            model,
+            orm_events=orm_events,
+            searchable_columns=searchable_columns or [],
+            count_strategy=count_strategy,
+            count_ttl=count_ttl,
+            limits=limits,
+            reference_labels=reference_labels or {},
+            fingerprint=fingerprint,
+        )
 
         self.models[model.name] = model
+        return model
+
+    def register_base(self, base, **options):
+        """Manage every model of a declarative base, `db`, registry or `MetaData`
+
+        Models are only found by their table name here, each one is registered (with
+        the `register_model` options given) the first time it's used, so startup costs
+        the same however many models there are
+        """
+        self.lazy_models.append(LazyModels(base, options))
+
+    def get_model(self, tablename):
+        """A registered model, registering it from a base the first time, or None"""
+        model = self.models.get(tablename)
+        if model is not None:
+            return model
+
+        with self._lock:
+            if tablename in self.models:
+                return self.models[tablename]
+            for lazy_models in self.lazy_models:
+                cls = lazy_models.get(tablename)
+                if cls is not None:
+                    return self.register_model(cls, **lazy_models.options)
+        return None
+
+    @property
+    def tablenames(self):
+        """The names of every model that can be managed, registered or not"""
+        tablenames = set(self.models)
+        for lazy_models in self.lazy_models:
+            tablenames.update(lazy_models.tablenames)
+        return sorted(tablenames)
+
+    def uses_etags(self, model):
+        if self.etags is not None:
+            return self.etags
+        return self.versions.backend is not None or model.fingerprint is not None
+
+    def written(self, tablename):
+        """Called after this extension commits a write to a table"""
+        self.counter.invalidate(tablename)
+        self.versions.bump(tablename)
+        if self.cache is not None:
+            self.cache.invalidate(tablename)
+        g.model_management_written = True
+
+    @property
+    def read_engine(self):
+        if isinstance(self.read_bind, str):
+            return self.db.engines[self.read_bind]
+        return self.read_bind
+
+    def reads_primary(self):
+        """Whether reads go to the primary: there is no replica, or this request (or a
+        recent one from the same client) has written"""
+        return (
+            self.read_bind is None
+            or g.get("model_management_written", False)
+            or (has_request_context() and READ_PRIMARY_COOKIE in request.cookies)
+        )
+
+    def caches_reads(self, tablenames):
+        """Whether a read of the tables can be cached, or answered from the cache, and
+        sent with an ETag
+
+        With a replica, not while this client reads its own writes from the primary,
+        as the cache could still have the replica's older result under the new version,
+        nor for `read_your_writes` seconds after any write to the tables, as the replica
+        may not have it yet
+        """
+        if self.read_bind is None:
+            return True
+        if self.reads_primary():
+            return False
+
+        # modified times are to the second so a second is added
+        window = timedelta(seconds=(self.read_your_writes or 0) + 1)
+        now = datetime.now(timezone.utc)
+        for tablename in tablenames:
+            modified = self.versions.modified(tablename)
+            if modified is not None and now - modified < window:
+                return False
+        return True
+
+    def read_session(self):
+        if self.reads_primary():
+            return self.db.session
+
+        if "model_management_read_session" not in g:
+            g.model_management_read_session = Session(bind=self.read_engine)
+        return g.model_management_read_session
+
+    @property
+    def job_store(self):
+        engine = self.db.engine
+        if engine not in self._job_stores:
+            self._job_stores[engine] = JobStore(engine)
+        return self._job_stores[engine]
 
     def init_app(self, app, db=None):
         if db:
@@ -82,34 +503,128 @@ class ModelManager:
     def setup_app(self, app):
         blueprint = self.create_blueprint()
 
+        if self.async_session is not None:
+            from .async_crud import get_async_crud
+
+        if self.read_bind is not None:
+
+            @blueprint.after_request
+            def read_primary_after_writes(response):
+                if g.get("model_management_written", False) and self.read_your_writes:
+                    response.set_cookie(
+                        READ_PRIMARY_COOKIE,
+                        "1",
+                        max_age=self.read_your_writes,
+                        path=self.url_prefix,
+                        httponly=True,
+                    )
+                return response
+
+            @app.teardown_appcontext
+            def close_read_session(exc):
+                session = g.pop("model_management_read_session", None)
+                if session is not None:
+                    session.close()
+
         @blueprint.context_processor
         def processors():
             rv = {
                 "get_url": get_url,
                 "model_manager": get_model_manager(),
+                "reserved_identities": RESERVED_IDENTITIES,
+                "sidebar_models": SIDEBAR_MODELS,
             }
             return rv
 
+        if self.instrumentation is not None:
+            Instrumentation.listen()
+
+            @blueprint.before_request
+            def start_timings():
+                if request.endpoint.endswith(".static"):
+                    return
+                # stats are kept per table & operation, so urls naming ones that don't
+                # exist (they're 404s) aren't timed or there'd be no end to them
+                tablename = request.view_args.get("tablename")
+                model = self.get_model(tablename) if tablename is not None else None
+                if tablename is not None and model is None:
+                    return
+                operation = request.endpoint.rsplit(".", 1)[-1]
+                if "operation" in request.view_args:
+                    if request.view_args["operation"] not in model.operations:
+                        return
+                    operation += ":" + request.view_args["operation"]
+                self.instrumentation.start(tablename, operation)
+
+            @blueprint.after_request
+            def finish_timings(response):
+                return self.instrumentation.finish(response)
+
+        # registered last so it runs first, and the compression is timed
+        blueprint.after_request(encode_response)
+
         @blueprint.errorhandler(CRUDFailure)
         def handle_crud_failure(crud_failure):
-            return jsonify(message=crud_failure.message, success=False)
+            return respond(message=crud_failure.message, success=False)
+
+        @blueprint.errorhandler(LimitExceeded)
+        def handle_limit_exceeded(limit_exceeded):
+            return respond(message=str(limit_exceeded), success=False)
+
+        @blueprint.route("/static/<path:filename>")
+        def static(filename):
+            return self.assets.send(filename)
 
         # have chosen this way to design endpoints as it's most common
         @blueprint.route("/")
         def index():
-            return render_template("index.html.jinja2")
+            search = request.args.get("q", "").strip().lower()
+            tablenames = [name for name in self.tablenames if search in name.lower()]
+
+            pages = max((len(tablenames) - 1) // INDEX_PAGE_LENGTH + 1, 1)
+            page = min(max(request.args.get("page", 1, type=int), 1), pages)
+            start = (page - 1) * INDEX_PAGE_LENGTH
+            return render_template(
+                "index.html.jinja2",
+                tablenames=tablenames[start : start + INDEX_PAGE_LENGTH],
+                matches=len(tablenames),
+                search=search,
+                page=page,
+                pages=pages,
+            )
+
+        @blueprint.route("/stats")
+        def stats():
+            if self.instrumentation is None and self.cache is None:
+                abort(404)
+            return render_template(
+                "stats.html.jinja2",
+                stats=self.instrumentation.summary() if self.instrumentation else None,
+                cache_stats=self.cache.summary() if self.cache else None,
+                sample_limit=SAMPLE_LIMIT,
+            )
 
         @blueprint.route("/<tablename>/")
         def table(tablename):
             model = get_model(tablename)
-            return render_template("table.html.jinja2", model=model)
+            count = get_crud().count(model)
+            return render_template("table.html.jinja2", model=model, count=count)
 
         @blueprint.route("/<tablename>/<operation>")
         def table_operation(tablename, operation):
             model = get_model(tablename)
-            form = model.form(operation, request.args)
             template = "operations/" + operation + ".html.jinja2"
-            return render_template(template, model=model, form=form)
+
+            def render():
+                form = model.form(operation, request.args)
+                return render_template(template, model=model, form=form)
+
+            # without args (which prefill the form) the page only depends on the model
+            # so it is rendered once, its rows are loaded by ajax. Flashed messages are
+            # only for this visitor so a page showing them is never cached
+            if request.args or current_app.jinja_env.auto_reload or "_flashes" in session:
+                return render()
+            return model.page((operation, request.script_root), render)
 
         @blueprint.route("/api/<tablename>", methods=["POST"])
         def create(tablename):
@@ -117,41 +632,358 @@ class ModelManager:
             form = model.form("create", request.form)
             if form.validate_on_submit():
                 data = get_crud().create_single(model, insert=form.insert_params)
-                return jsonify(message=f"{tablename} created", success=True, data=data)
+                return respond(message=f"{tablename} created", success=True, data=data)
             else:
-                return jsonify(message=f"Invalid query fields: {form.errors}", success=False)
+                return respond(message=f"Invalid query fields: {form.errors}", success=False)
+
+        @blueprint.route("/api/<tablename>/bulk", methods=["POST"])
+        def create_bulk(tablename):
+            model = get_model(tablename)
+            rows = get_uploaded_rows(request)
+            if rows is None:
+                return respond(
+                    message="Expected a json array of objects or a csv upload", success=False
+                )
+
+            batch_size = max(request.args.get("batch_size", CREATE_BATCH_SIZE, type=int), 1)
+            result = get_crud().create_bulk(model, rows, batch_size=batch_size)
+            return respond(
+                message=f"{tablename} created: {result['count']} entries, "
+                f"{len(result['failures'])} failures",
+                success=not result["failures"],
+                **result,
+            )
+
+        @blueprint.route("/api/_batch", methods=["POST"])
+        def batch():
+            operations, errors = parse_batch(request.get_json(silent=True), self.get_model)
+            if errors:
+                return respond(
+                    message="Invalid batch, nothing was run", success=False, errors=errors
+                )
+
+            dry_run = is_dry_run()
+            results = get_crud().batch(operations, dry_run=dry_run)
+            return respond(
+                message=f"batch {'checked' if dry_run else 'committed'}: {len(results)} operations",
+                success=True,
+                dry_run=dry_run,
+                results=results,
+            )
+
+        if self.async_session is None:
+
+            @blueprint.route("/api/<tablename>", methods=["GET"])
+            @conditional
+            def read(tablename):
+                model = get_model(tablename)
+                form = model.form("read", request.args)
+                if form.validate():
+                    if Page.is_requested(request.args):
+                        page = Page.from_args(request.args, model)
+                        result = get_crud().read_page(
+                            model,
+                            filter_by=form.filter_params,
+                            page=page,
+                            columns=get_columns(model),
+                            columnar=is_columnar(),
+                        )
+                        return respond(message=f"{tablename} read", success=True, **result)
+
+                    if negotiate(JSON, MSGPACK, ARROW) == ARROW:
+                        return respond_arrow(
+                            get_crud().read_arrow(
+                                model, filter_by=form.filter_params, columns=get_columns(model)
+                            )
+                        )
+
+                    data = get_crud().read_bulk(
+                        model,
+                        filter_by=form.filter_params,
+                        columns=get_columns(model),
+                        columnar=is_columnar(),
+                    )
+                    return respond(message=f"{tablename} read", success=True, data=data)
+                else:
+                    return respond(message=f"Invalid query fields: {form.errors}", success=False)
+
+        else:
+
+            @blueprint.route("/api/<tablename>", methods=["GET"])
+            @conditional
+            async def read(tablename):
+                model = get_model(tablename)
+                form = model.form("read", request.args)
+                if not form.validate():
+                    return respond(message=f"Invalid query fields: {form.errors}", success=False)
+
+                if Page.is_requested(request.args):
+                    page = Page.from_args(request.args, model)
+                    result = await get_async_crud().read_page(
+                        model,
+                        filter_by=form.filter_params,
+                        page=page,
+                        columns=get_columns(model),
+                        columnar=is_columnar(),
+                    )
+                    return respond(message=f"{tablename} read", success=True, **result)
+
+                if negotiate(JSON, MSGPACK, ARROW) == ARROW:
+                    return respond_arrow(
+                        await get_async_crud().read_arrow(
+                            model, filter_by=form.filter_params, columns=get_columns(model)
+                        )
+                    )
+
+                data = await get_async_crud().read_bulk(
+                    model,
+                    filter_by=form.filter_params,
+                    columns=get_columns(model),
+                    columnar=is_columnar(),
+                )
+                return respond(message=f"{tablename} read", success=True, data=data)
 
-        @blueprint.route("/api/<tablename>", methods=["GET"])
-        def read(tablename):
+        @blueprint.route("/api/<tablename>/references/<column>", methods=["GET"])
+        def references(tablename, column):
             model = get_model(tablename)
+            reference = model.references.get(column)
+            if reference is None:
+                abort(404)
+
+            data = get_crud().autocomplete(
+                model,
+                reference,
+                prefix=request.args.get("q", ""),
+                limit=request.args.get("limit", AUTOCOMPLETE_LIMIT, type=int),
+            )
+            return respond(message=f"{reference.tablename} read", success=True, data=data)
+
+        @blueprint.route("/api/<tablename>/explain", methods=["GET"])
+        def explain(tablename):
+            model = get_model(tablename)
+            operation = request.args.get("operation", "read")
+            if operation not in EXPLAIN_OPERATIONS or operation not in model.operations:
+                return respond(
+                    message=f"Only {', '.join(EXPLAIN_OPERATIONS)} can be explained", success=False
+                )
+
+            form = model.form(operation, request.args)
+            if form.validate():
+                insert = form.insert_params if operation == "update" else None
+                result = get_crud().explain(model, operation, form.filter_params, insert)
+                return respond(message=f"{tablename} {operation} explained", success=True, **result)
+            else:
+                return respond(message=f"Invalid query fields: {form.errors}", success=False)
+
+        @blueprint.route("/api/<tablename>/export", methods=["GET"])
+        def export(tablename):
+            model = get_model(tablename)
+            export_format = negotiate_export_format()
+            if export_format is None:
+                return respond(message="Invalid export format", success=False)
+
             form = model.form("read", request.args)
             if form.validate():
-                data = get_crud().read_bulk(model, filter_by=form.filter_params)
-                return jsonify(message=f"{tablename} read", success=True, data=data)
+                rows = get_crud().export(
+                    model,
+                    filter_by=form.filter_params,
+                    export_format=export_format,
+                    columns=get_columns(model),
+                )
+                filename = f"{tablename}.{export_format.extension}"
+                return Response(
+                    stream_with_context(rows),
+                    mimetype=export_format.mimetype,
+                    headers={"Content-Disposition": f"attachment; filename={filename}"},
+                )
             else:
-                return jsonify(message=f"Invalid query fields: {form.errors}", success=False)
+                return respond(message=f"Invalid query fields: {form.errors}", success=False)
 
         @blueprint.route("/api/<tablename>", methods=["PUT"])
         def update(tablename):
             model = get_model(tablename)
             form = model.form("update", request.form)
             if form.validate_on_submit():
-                data = get_crud().update_bulk(
-                    model, filter_by=form.filter_params, insert=form.insert_params
+                if is_dry_run():
+                    result = get_crud().preview(model, filter_by=form.filter_params)
+                    return respond(
+                        message=f"{tablename} would update: {result['count']} entries",
+                        success=True,
+                        dry_run=True,
+                        **result,
+                    )
+
+                result = get_crud().update_bulk(
+                    model,
+                    filter_by=form.filter_params,
+                    insert=form.insert_params,
+                    returning=get_returning(request.form),
+                )
+                return respond(
+                    message=f"{tablename} updated: {result['count']} entries",
+                    success=True,
+                    **result,
                 )
-                return jsonify(message=f"{tablename} updated", success=True, data=data)
             else:
-                return jsonify(message=f"Invalid query fields: {form.errors}", success=False)
+                return respond(message=f"Invalid query fields: {form.errors}", success=False)
 
         @blueprint.route("/api/<tablename>", methods=["DELETE"])
         def delete(tablename):
             model = get_model(tablename)
             form = model.form("delete", request.form)
             if form.validate_on_submit():
-                data = get_crud().delete_bulk(model, filter_by=form.filter_params)
-                return jsonify(message=f"{tablename} deleted", success=True, data=data)
+                if is_dry_run():
+                    result = get_crud().preview(model, filter_by=form.filter_params)
+                    return respond(
+                        message=f"{tablename} would delete: {result['count']} entries",
+                        success=True,
+                        dry_run=True,
+                        **result,
+                    )
+
+                result = get_crud().delete_bulk(
+                    model, filter_by=form.filter_params, returning=get_returning(request.form)
+                )
+                return respond(
+                    message=f"{tablename} deleted: {result['count']} entries",
+                    success=True,
+                    **result,
+                )
+            else:
+                return respond(message=f"Invalid query fields: {form.errors}", success=False)
+
+        @blueprint.route("/api/<tablename>/jobs", methods=["POST"])
+        def create_job(tablename):
+            model = get_model(tablename)
+            operation = request.form.get("operation")
+            if operation not in JOB_OPERATIONS or operation not in model.operations:
+                operations = [op for op in JOB_OPERATIONS if op in model.operations]
+                message = f"Jobs can only {' or '.join(operations)} {tablename}"
+                if not operations:
+                    message = f"Jobs can't change {tablename}"
+                return respond(message=message, success=False)
+            if len(model.primary_keys) != 1:
+                return respond(message="Jobs need a single primary key column", success=False)
+
+            form = model.form(operation, request.form)
+            if form.validate_on_submit():
+                chunk_size = max(request.form.get("chunk_size", DEFAULT_CHUNK_SIZE, type=int), 1)
+                job = Job(tablename, operation, request.form.copy(), chunk_size, status=RUNNING)
+                self.job_store.add(job)
+                self.jobs.submit(current_app._get_current_object(), self.job_store, model, job)
+                return respond(
+                    message=f"{tablename} {operation} job started", success=True, job=job.to_json()
+                )
+            else:
+                return respond(message=f"Invalid query fields: {form.errors}", success=False)
+
+        @blueprint.route("/api/<tablename>/jobs", methods=["GET"])
+        def read_jobs(tablename):
+            get_model(tablename)
+            jobs = [job.to_json() for job in self.job_store.list(tablename)]
+            return respond(message=f"{tablename} jobs read", success=True, data=jobs)
+
+        def get_job(tablename, job_id):
+            job = self.job_store.get(job_id)
+            if job is None or job.tablename != tablename:
+                abort(404)
+            return job
+
+        @blueprint.route("/api/<tablename>/jobs/<job_id>", methods=["GET"])
+        def read_job(tablename, job_id):
+            job = get_job(tablename, job_id)
+            return respond(message=f"job {job_id} {job.status}", success=True, job=job.to_json())
+
+        @blueprint.route("/api/<tablename>/jobs/<job_id>/cancel", methods=["POST"])
+        def cancel_job(tablename, job_id):
+            job = get_job(tablename, job_id)
+            # the job stops after the chunk it is on, which is committed
+            if not self.job_store.set_status(job, CANCELLED, expected=(PENDING, RUNNING)):
+                return respond(message=f"job {job_id} is {job.status}", success=False)
+            return respond(message=f"job {job_id} cancelled", success=True, job=job.to_json())
+
+        @blueprint.route("/api/<tablename>/jobs/<job_id>/resume", methods=["POST"])
+        def resume_job(tablename, job_id):
+            model = get_model(tablename)
+            job = get_job(tablename, job_id)
+            if job.status == DONE or self.jobs.is_running(job_id):
+                return respond(message=f"job {job_id} is {job.status}", success=False)
+            # a job left running by a worker that has stopped can be picked up again, once
+            # it has gone `job_lease` seconds without saving progress
+            if job.status == RUNNING and not job.lease_expired(self.job_lease):
+                return respond(
+                    message=f"job {job_id} is running, it can be resumed if it makes no "
+                    f"progress for {self.job_lease} seconds",
+                    success=False,
+                )
+            if not self.job_store.claim(job):
+                return respond(message=f"job {job_id} changed, try again", success=False)
+
+            self.jobs.submit(current_app._get_current_object(), self.job_store, model, job)
+            return respond(message=f"job {job_id} resumed", success=True, job=job.to_json())
+
+        # single entries are addressed by primary key so lookups go straight to its index
+        if self.async_session is None:
+
+            @blueprint.route("/api/<tablename>/<pk>", methods=["GET"])
+            @conditional
+            def read_single(tablename, pk):
+                model = get_model(tablename)
+                identity = model.parse_identity(pk)
+                if identity is None:
+                    return respond(message=f"Invalid primary key: {pk}", success=False)
+
+                data = get_crud().read_single(model, identity)
+                if data is None:
+                    return respond(message=f"{tablename} {pk} not found", success=False), 404
+                return respond(message=f"{tablename} {pk} read", success=True, data=data)
+
+        else:
+
+            @blueprint.route("/api/<tablename>/<pk>", methods=["GET"])
+            @conditional
+            async def read_single(tablename, pk):
+                model = get_model(tablename)
+                identity = model.parse_identity(pk)
+                if identity is None:
+                    return respond(message=f"Invalid primary key: {pk}", success=False)
+
+                data = await get_async_crud().read_single(model, identity)
+                if data is None:
+                    return respond(message=f"{tablename} {pk} not found", success=False), 404
+                return respond(message=f"{tablename} {pk} read", success=True, data=data)
+
+        @blueprint.route("/api/<tablename>/<pk>", methods=["PUT", "PATCH"])
+        def update_single(tablename, pk):
+            model = get_model(tablename)
+            identity = model.parse_identity(pk)
+            if identity is None:
+                return respond(message=f"Invalid primary key: {pk}", success=False)
+
+            form = model.form("update", request.form)
+            if form.validate_on_submit():
+                # PUT replaces the whole entry, PATCH only changes the fields given
+                insert = form.replace_params if request.method == "PUT" else form.insert_params
+                keys = {column.name for column in model.primary_keys}
+                insert = {k: v for k, v in insert.items() if k not in keys}
+                data = get_crud().update_single(model, identity, insert)
+                if data is None:
+                    return respond(message=f"{tablename} {pk} not found", success=False), 404
+                return respond(message=f"{tablename} {pk} updated", success=True, data=data)
             else:
-                return jsonify(message=f"Invalid query fields: {form.errors}", success=False)
+                return respond(message=f"Invalid query fields: {form.errors}", success=False)
+
+        @blueprint.route("/api/<tablename>/<pk>", methods=["DELETE"])
+        def delete_single(tablename, pk):
+            model = get_model(tablename)
+            identity = model.parse_identity(pk)
+            if identity is None:
+                return respond(message=f"Invalid primary key: {pk}", success=False)
+
+            data = get_crud().delete_single(model, identity)
+            if data is None:
+                return respond(message=f"{tablename} {pk} not found", success=False), 404
+            return respond(message=f"{tablename} {pk} deleted", success=True, data=data)
 
         app.register_blueprint(blueprint)
         app.extensions[EXTENSION] = self
@@ -162,6 +994,5 @@ class ModelManager:
             __name__,
             url_prefix=self.url_prefix,
             template_folder=TEMPLATES_DIR,
-            static_folder=str(STATIC_DIR),
         )
         return blueprint
@@ -0,0 +1,77 @@
+import re
+
+import attr
+
+DEFAULT_PAGE_LENGTH = 10
+
+COLUMN_DATA_ARG = re.compile(r"^columns\[(\d+)\]\[data\]$")
+ORDER_COLUMN_ARG = re.compile(r"^order\[(\d+)\]\[column\]$")
+
+PAGE_ARGS = ("draw", "start", "length")
+
+
+@attr.s
+class Order:
+    """A single ordering instruction: a column name and a direction"""
+
+    column = attr.ib()
+    descending = attr.ib(default=False)
+
+
+@attr.s
+class Page:
+    """A request for one page of entries, as sent by the DataTables server-side protocol
+
+    `after` is the primary key of the last entry of the previous page, when it is
+    given (and the page is ordered by the primary key) a keyset seek is used instead
+    of an offset so deep pages cost the same as the first one
+    """
+
+    start = attr.ib(default=0)
+    length = attr.ib(default=DEFAULT_PAGE_LENGTH)
+    order = attr.ib(factory=list)
+    search = attr.ib(default=None)
+    search_columns = attr.ib(factory=list)
+    after = attr.ib(default=None)
+    draw = attr.ib(default=None)
+
+    @staticmethod
+    def is_requested(args):
+        return any(arg in args for arg in PAGE_ARGS)
+
+    @classmethod
+    def from_args(cls, args, model):
+        column_names = [column.name for column in model.columns]
+
+        # datatables refers to columns by their index in the table
+        requested_columns = {}
+        for arg, value in args.items():
+            match = COLUMN_DATA_ARG.match(arg)
+            if match:
+                requested_columns[match.group(1)] = value
+
+        requested_order = {}
+        for arg, value in args.items():
+            match = ORDER_COLUMN_ARG.match(arg)
+            if match:
+                requested_order[int(match.group(1))] = value
+
+        order = []
+        for index, value in sorted(requested_order.items()):
+            name = requested_columns.get(value)
+            if name in column_names:
+                direction = args.get(f"order[{index}][dir]", "asc")
+                order.append(Order(name, descending=direction == "desc"))
+
+        length = args.get("length", DEFAULT_PAGE_LENGTH, type=int)
+        page = cls(
+            start=max(args.get("start", 0, type=int), 0),
+            # datatables uses -1 to mean 'everything'
+            length=length if length >= 0 else None,
+            order=order,
+            search=args.get("search[value]") or None,
+            search_columns=[column.name for column in model.columns if column.searchable],
+            after=model.coerce_primary_key(args.get("after")),
+            draw=args.get("draw", type=int),
+        )
+        return page
@@ -0,0 +1,128 @@
+import base64
+from datetime import date
+from datetime import datetime
+from datetime import time
+from datetime import timedelta
+from decimal import Decimal
+from operator import attrgetter
+from operator import itemgetter
+
+import attr
+
+# json has these natively so their values are passed through untouched
+NATIVE_TYPES = (bool, int, float, str)
+
+
+def isoformat(value):
+    return value.isoformat()
+
+
+def get_encoder(python_type):
+    """How to turn a (non null) value of a column's python type into a json type"""
+    if python_type is None or issubclass(python_type, NATIVE_TYPES):
+        return None
+    elif issubclass(python_type, (datetime, date, time)):
+        return isoformat
+    elif issubclass(python_type, Decimal):
+        # as a string so no precision is lost to a float
+        return str
+    elif issubclass(python_type, timedelta):
+        return timedelta.total_seconds
+    elif issubclass(python_type, bytes):
+        return lambda value: base64.b64encode(value).decode()
+    else:
+        return str
+
+
+def get_decoder(python_type):
+    """How to turn a string of what `get_encoder` made back into the column's python type,
+    None for types a form field parses on its own"""
+    if python_type is None:
+        return None
+    elif issubclass(python_type, datetime):
+        return datetime.fromisoformat
+    elif issubclass(python_type, time):
+        return time.fromisoformat
+    elif issubclass(python_type, timedelta):
+        return lambda value: timedelta(seconds=float(value))
+    elif issubclass(python_type, bytes):
+        return lambda value: base64.b64decode(value, validate=True)
+    else:
+        return None
+
+
+@attr.s
+class Serializer:
+    """Turns entries of one model into json ready dicts
+
+    It is compiled once from a model's columns: only those columns are read, always
+    in the same order, and only values that json can't represent are converted
+    """
+
+    names = attr.ib()
+    keys = attr.ib()
+    encoders = attr.ib()
+
+    def __attrs_post_init__(self):
+        self._get_loaded = itemgetter(*self.keys) if self.keys else lambda state: ()
+        self._get_values = attrgetter(*self.keys) if self.keys else lambda entry: ()
+        self._encoded = [
+            (name, encoder) for name, encoder in zip(self.names, self.encoders) if encoder
+        ]
+
+    @classmethod
+    def from_columns(cls, columns):
+        return cls(
+            [column.name for column in columns],
+            [column.key for column in columns],
+            [get_encoder(column.type.python_type) for column in columns],
+        )
+
+    def values(self, entry):
+        try:
+            # loaded values sit in the instance dict, reading it directly skips the
+            # instrumented attributes which is most of the cost
+            values = self._get_loaded(entry.__dict__)
+        except KeyError:
+            # something is expired or deferred, let the attributes load it
+            values = self._get_values(entry)
+        return values if len(self.keys) != 1 else (values,)
+
+    def encode(self, row):
+        for name, encoder in self._encoded:
+            value = row[name]
+            if value is not None:
+                row[name] = encoder(value)
+        return row
+
+    def entry(self, entry):
+        row = dict(zip(self.names, self.values(entry)))
+        return self.encode(row) if self._encoded else row
+
+    def entries(self, entries):
+        return [self.entry(entry) for entry in entries]
+
+    def iter_rows(self, rows):
+        """Core rows, e.g. from a projection or RETURNING, which might only have some
+        of the columns, all rows of one result share the same columns"""
+        names = None
+        encoded = None
+        for row in rows:
+            if names is None:
+                names = row._fields
+                encoded = [(name, encoder) for name, encoder in self._encoded if name in names]
+
+            item = dict(zip(names, row))
+            for name, encoder in encoded:
+                value = item[name]
+                if value is not None:
+                    item[name] = encoder(value)
+            yield item
+
+    def rows(self, rows):
+        return list(self.iter_rows(rows))
+
+    def columnar(self, rows):
+        """Turn serialized rows into one array per column, which is far smaller as json"""
+        names = list(rows[0]) if rows else self.names
+        return {name: [row.get(name) for row in rows] for name in names}
@@ -10,6 +10,23 @@ function getFormData(formId, reset) {
     return formData
 }
 
+// show the query plan of an operation, and the rows it's estimated to touch, without running it
+function explain(url, formData) {
+    $.getJSON(url + (formData ? "&" + formData : ""), function (result) {
+        if (!result.success) {
+            $("#failure-text").text(result.message);
+            $("#failure-alert").show();
+            return;
+        }
+        var summary = "estimated rows: " + (result.estimated_rows === null ? "unknown" : result.estimated_rows);
+        if (result.full_scan) {
+            summary += ", reads every entry of a table";
+        }
+        var lines = [result.statement, "", summary, ""].concat(result.lines);
+        $("#explain-plan").text(lines.join("\n")).show();
+    });
+}
+
 $(".date").flatpickr({
     wrap: true
 });
@@ -18,3 +35,19 @@ $(".datetime").flatpickr({
     wrap: true,
     enableTime: true,
 });
+
+// suggest the entries a foreign key can reference from its `references` endpoint
+var autocompleteTimeout = null;
+
+$("input[data-autocomplete]").on("input", function () {
+    var input = $(this);
+    clearTimeout(autocompleteTimeout);
+    autocompleteTimeout = setTimeout(function () {
+        $.getJSON(input.data("autocomplete"), {q: input.val()}, function (json) {
+            var options = $("#" + input.attr("list")).empty();
+            (json.data || []).forEach(function (entry) {
+                options.append($("<option>").attr("value", entry.value).text(entry.label));
+            });
+        });
+    }, 200);
+});
@@ -23,6 +23,13 @@ setup(
     long_description_content_type="text/markdown",
     test_suite="tests",
     install_requires=["Flask", "Flask-SQLAlchemy", "WTForms", "Flask-WTF", "attrs"],
+    extras_require={
+        "async": ["Flask[async]", "SQLAlchemy[asyncio]"],
+        "brotli": ["Brotli"],
+        "msgpack": ["msgpack"],
+        "arrow": ["pyarrow"],
+        "zstd": ["zstandard"],
+    },
     classifiers=[
         "Programming Language :: Python",
         "Programming Language :: Python :: 3",
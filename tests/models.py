@@ -18,6 +18,7 @@ from sqlalchemy import Integer
 from sqlalchemy import Interval
 from sqlalchemy import LargeBinary
 from sqlalchemy import Numeric
+from sqlalchemy import PrimaryKeyConstraint
 from sqlalchemy import SmallInteger
 from sqlalchemy import sql
 from sqlalchemy import String
@@ -110,6 +111,17 @@ class RandomTypeTable(db.Model):
     unicode_text = Column(UnicodeText)
 
 
+class Membership(db.Model):
+    """A composite primary key in a different order to the columns"""
+
+    __tablename__ = "membership"
+    __table_args__ = (PrimaryKeyConstraint("member", "GROUP"),)
+
+    group = Column("GROUP", String)
+    member = Column(String)
+    role = Column(String)
+
+
 random_type_table_mock_data = [
     {
         "big_integer": 123456789123456789,
@@ -1,11 +1,49 @@
+import gzip
+import io
+import json
+import logging
+import re
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+from urllib.parse import quote
+
 import pytest
+from flask import flash
 from flask import Flask
+from sqlalchemy import Column
+from sqlalchemy import create_engine
+from sqlalchemy import Integer
+from sqlalchemy import MetaData
+from sqlalchemy import select
+from sqlalchemy import String
+from sqlalchemy import Table
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+from werkzeug.datastructures import MultiDict
 
+from flask_model_management import limits
+from flask_model_management.cache import LocalCache
+from flask_model_management.cache import RedisCache
+from flask_model_management.cache import ResultCache
+from flask_model_management.crud import CRUD
 from flask_model_management.domain import CRUD_OPERATIONS
+from flask_model_management.domain import format_identity
+from flask_model_management.domain import Model
+from flask_model_management.jobs import Job
+from flask_model_management.limits import Limits
+from flask_model_management.limits import statement_timeout
+from flask_model_management.limits import StatementTimeout
 from flask_model_management.manager import ModelManager as ModelManagement
+from flask_model_management.manager import READ_PRIMARY_COOKIE
+from flask_model_management.paging import Order
+from flask_model_management.paging import Page
 from tests.models import Address
 from tests.models import db
+from tests.models import Membership
 from tests.models import populate
+from tests.models import RandomTypeTable
 from tests.models import User
 
 MODELS_AND_COLUMNS = [
@@ -15,8 +53,8 @@ MODELS_AND_COLUMNS = [
 
 @pytest.fixture(scope="function")
 def client_factory(sqlalchemy_url):
-    def factory(model=None, **kwargs):
-        mgmt = ModelManagement()
+    def factory(model=None, manager_kwargs=None, **kwargs):
+        mgmt = ModelManagement(**(manager_kwargs or {}))
 
         app = Flask(__name__)
         app.config["SECRET_KEY"] = "hello world"
@@ -85,3 +123,1182 @@ def test_operation(client_factory, operation, models_and_columns):
 #         # for c in columns:
 #         #     if c != col:
 #         #         assert c in resp.data.decode()
+
+
+def datatables_args(columns, start=0, length=2, order=None, search=""):
+    args = {"draw": 1, "start": start, "length": length, "search[value]": search}
+    for i, col in enumerate(columns):
+        args[f"columns[{i}][data]"] = col
+    for i, (col, direction) in enumerate(order or []):
+        args[f"order[{i}][column]"] = columns.index(col)
+        args[f"order[{i}][dir]"] = direction
+    return args
+
+
+def test_read_page(client_factory):
+    client = client_factory(User, searchable_columns=["first_name", "last_name"])
+    columns = [col.name for col in User.__table__.columns]
+
+    resp = client.get("/model-management/api/user", query_string=datatables_args(columns))
+    assert resp.json["success"]
+    assert resp.json["draw"] == 1
+    assert resp.json["recordsTotal"] == 3
+    assert resp.json["recordsFiltered"] == 3
+    assert [row["id"] for row in resp.json["data"]] == [1, 2]
+
+    args = datatables_args(columns, order=[("first_name", "desc")], search="o")
+    resp = client.get("/model-management/api/user", query_string=args)
+    assert resp.json["recordsFiltered"] == 3
+    assert [row["first_name"] for row in resp.json["data"]] == ["hello", "goodbye"]
+
+    args = dict(datatables_args(columns, search="hello"), filter_last_name="world")
+    resp = client.get("/model-management/api/user", query_string=args)
+    assert resp.json["recordsTotal"] == 3
+    assert resp.json["recordsFiltered"] == 1
+
+
+def test_read_page_keyset(client_factory):
+    client = client_factory(User)
+    columns = [col.name for col in User.__table__.columns]
+
+    args = dict(datatables_args(columns, start=2), after=2)
+    resp = client.get("/model-management/api/user", query_string=args)
+    assert [row["id"] for row in resp.json["data"]] == [3]
+
+    args = dict(datatables_args(columns, order=[("id", "desc")]), after=3)
+    resp = client.get("/model-management/api/user", query_string=args)
+    assert [row["id"] for row in resp.json["data"]] == [2, 1]
+
+
+def test_read_page_tiebreak():
+    def order_by(model, order):
+        statement = CRUD(model).paginate(select(model.__table__), Page(order=order))
+        return str(statement).split("ORDER BY ")[1].split("\n")[0]
+
+    # entries tying on the order keep their place between pages
+    assert order_by(User, [Order("last_name")]) == '"user".last_name ASC, "user".id ASC'
+    assert order_by(User, [Order("id", descending=True)]) == '"user".id DESC'
+    assert order_by(Membership, []) == 'membership.member ASC, membership."GROUP" ASC'
+
+
+def test_export(client_factory):
+    client = client_factory(User)
+
+    resp = client.get("/model-management/api/user/export")
+    assert resp.mimetype == "application/x-ndjson"
+    rows = [json.loads(line) for line in resp.data.decode().splitlines()]
+    assert [row["first_name"] for row in rows] == ["hello", "goodbye", "another"]
+
+    resp = client.get("/model-management/api/user/export?format=csv&filter_last_name=world")
+    assert resp.mimetype == "text/csv"
+    lines = resp.data.decode().splitlines()
+    assert lines[0] == "id,first_name,last_name,is_admin"
+    assert len(lines) == 3
+
+    resp = client.get("/model-management/api/user/export?format=xml")
+    assert not resp.json["success"]
+
+
+@pytest.mark.parametrize("orm_events", [False, True])
+def test_update_bulk(client_factory, orm_events):
+    client = client_factory(User, orm_events=orm_events)
+
+    data = {"filter_last_name": "world", "insert_last_name": "earth", "returning": "id"}
+    resp = client.put("/model-management/api/user", data=data)
+    assert resp.json["success"]
+    assert resp.json["count"] == 2
+
+    resp = client.get("/model-management/api/user?filter_last_name=earth")
+    assert len(resp.json["data"]) == 2
+
+
+@pytest.mark.parametrize("orm_events", [False, True])
+def test_delete_bulk(client_factory, orm_events):
+    client = client_factory(User, orm_events=orm_events)
+
+    resp = client.delete("/model-management/api/user", data={"filter_last_name": "world"})
+    assert resp.json["success"]
+    assert resp.json["count"] == 2
+
+    resp = client.get("/model-management/api/user")
+    assert [row["first_name"] for row in resp.json["data"]] == ["another"]
+
+
+def test_delete_bulk_returning(client_factory):
+    client = client_factory(User)
+
+    data = {"filter_first_name": "hello", "returning": "id,first_name"}
+    resp = client.delete("/model-management/api/user", data=data)
+    assert resp.json["count"] == 1
+    assert resp.json["data"] in ([], [{"id": 1, "first_name": "hello"}])
+
+
+def test_single_composite_key(client_factory):
+    client = client_factory(Membership)
+    with client.application.app_context():
+        # without encoding both would be /c,a,b
+        db.session.add(Membership(group="a,b", member="c", role="first"))
+        db.session.add(Membership(group="b,c", member="a", role="second"))
+        db.session.commit()
+
+    def url(*values):
+        # the key in the mapper's order, as the single entry url has it
+        return "/model-management/api/membership/" + quote(format_identity(values))
+
+    assert client.get(url("c", "a,b")).json["data"]["role"] == "first"
+    assert client.get(url("a", "b,c")).json["data"]["role"] == "second"
+    assert client.get(url("a,b", "c")).status_code == 404
+
+    resp = client.patch(url("c", "a,b"), data={"insert_role": "changed"})
+    assert resp.json["data"] == {"GROUP": "a,b", "member": "c", "role": "changed"}
+    assert client.delete(url("a", "b,c")).json["success"]
+    assert client.get(url("a", "b,c")).status_code == 404
+
+    # a key that is one of the api's own routes is still an entry
+    assert format_identity(["export"]) == "%65xport"
+    assert Model(User).parse_identity("1") == (1,)
+
+
+def test_create_bulk_json(client_factory):
+    client = client_factory(User)
+
+    rows = [
+        {"first_name": "a", "last_name": "b", "is_admin": True},
+        {"first_name": "c", "is_admin": "false"},
+        {"id": 1, "first_name": "duplicate"},
+        {"id": "not an int"},
+    ]
+    resp = client.post("/model-management/api/user/bulk?batch_size=2", json=rows)
+    assert resp.json["count"] == 2
+    assert [failure["rows"] for failure in resp.json["failures"]] == [[3], [2]]
+
+    resp = client.get("/model-management/api/user")
+    assert len(resp.json["data"]) == 5
+
+
+def test_create_bulk_round_trip(client_factory):
+    client = client_factory(RandomTypeTable)
+    url = "/model-management/api/random_type_table"
+
+    # what the api reads can be created again: iso datetimes, interval seconds, base64 bytes
+    rows = client.get(url).json["data"]
+    for row in rows:
+        del row["id"]
+    resp = client.post(f"{url}/bulk", json=rows)
+    assert resp.json["success"], resp.json["failures"]
+    assert resp.json["count"] == len(rows)
+
+    created = client.get(url, query_string={"filter_id__gt": len(rows)}).json["data"]
+    for row in created:
+        del row["id"]
+    assert created == rows
+
+    # and so can what it exports
+    columns = ",".join(rows[0])
+    resp = client.get(f"{url}/export", query_string={"format": "csv", "columns": columns})
+    resp = client.post(f"{url}/bulk", data={"file": (io.BytesIO(resp.data), "export.csv")})
+    assert resp.json["success"], resp.json["failures"]
+    assert resp.json["count"] == len(rows) * 2
+
+
+def test_create_bulk_csv(client_factory):
+    client = client_factory(User)
+
+    data = {"file": (io.BytesIO(b"first_name,last_name\nx,y\nz,\n"), "users.csv")}
+    resp = client.post("/model-management/api/user/bulk", data=data)
+    assert resp.json["success"]
+    assert resp.json["count"] == 2
+
+    resp = client.post("/model-management/api/user/bulk", data="nonsense")
+    assert not resp.json["success"]
+
+
+def test_model_caches_columns_and_forms():
+    model = Model(User)
+    assert model.columns is model.columns
+    assert model.form_class("update") is model.form_class("update")
+    assert model.form_class("update") is not model.form_class("delete")
+
+    form_class = model.form_class("read")
+    model.excluded_columns.append("last_name")
+    model.invalidate()
+    assert "last_name" not in [column.name for column in model.columns]
+    assert model.form_class("read") is not form_class
+
+
+def test_single_operations(client_factory):
+    client = client_factory(User)
+
+    resp = client.get("/model-management/api/user/2")
+    assert resp.json["data"]["first_name"] == "goodbye"
+
+    resp = client.patch("/model-management/api/user/2", data={"insert_first_name": "farewell"})
+    assert resp.json["data"]["first_name"] == "farewell"
+    assert resp.json["data"]["last_name"] == "world"
+
+    data = {"insert_first_name": "adieu", "insert_is_admin": "true"}
+    resp = client.put("/model-management/api/user/2", data=data)
+    assert resp.json["data"]["first_name"] == "adieu"
+    assert resp.json["data"]["last_name"] is None
+
+    resp = client.delete("/model-management/api/user/2")
+    assert resp.json["success"]
+
+    resp = client.get("/model-management/api/user/2")
+    assert resp.status_code == 404
+
+    resp = client.get("/model-management/api/user/abc")
+    assert not resp.json["success"]
+
+
+@pytest.mark.parametrize("operation", ["update", "delete"])
+def test_single_operation_page(client_factory, operation):
+    client = client_factory(User)
+    resp = client.get(
+        f"/model-management/user/{operation}?filter_id=2&_operation_protocol=single&_pk=2"
+    )
+    assert resp.status_code == 200
+    assert "/model-management/api/user/2" in resp.data.decode()
+
+
+@pytest.mark.parametrize("log_payloads", [False, True])
+def test_operation_logging(client_factory, caplog, log_payloads):
+    client = client_factory(User, manager_kwargs={"log_payloads": log_payloads})
+    client.application.logger.setLevel(logging.DEBUG)
+
+    with caplog.at_level(logging.DEBUG, logger=client.application.logger.name):
+        client.get("/model-management/api/user")
+
+    info = [r.getMessage() for r in caplog.records if r.levelno == logging.INFO]
+    assert len(info) == 1
+    assert "CRUD APP READ: table='user'" in info[0]
+    assert "rows=3" in info[0]
+    assert "duration=" in info[0]
+
+    debug = [r.getMessage() for r in caplog.records if r.levelno == logging.DEBUG]
+    assert bool(debug) == log_payloads
+
+
+def test_instrumentation(client_factory):
+    client = client_factory(User, manager_kwargs={"instrument": True})
+    recorded = []
+    client.application.extensions["model_management"].instrumentation.connect(recorded.append)
+
+    resp = client.get("/model-management/api/user?filter_last_name=world")
+    timing = resp.headers["Server-Timing"]
+    for name in ("form", "validate", "query", "serialize", "jsonify", "db", "total"):
+        assert name + ";dur=" in timing
+
+    assert recorded[0].table == "user"
+    assert recorded[0].operation == "read"
+    assert recorded[0].statements == 1
+
+    resp = client.get("/model-management/stats")
+    assert resp.status_code == 200
+    assert "read" in resp.data.decode()
+
+    # 404s for tables or operations that don't exist aren't kept
+    instrumentation = client.application.extensions["model_management"].instrumentation
+    keys = set(instrumentation.stats)
+    for i in range(5):
+        assert client.get(f"/model-management/api/missing{i}").status_code == 404
+        client.get(f"/model-management/user/missing{i}")
+    assert set(instrumentation.stats) == keys
+
+
+def test_instrumentation_off(client_factory):
+    client = client_factory(User)
+    resp = client.get("/model-management/api/user")
+    assert "Server-Timing" not in resp.headers
+    assert client.get("/model-management/stats").status_code == 404
+
+
+def test_read_preserves_types(client_factory):
+    client = client_factory(RandomTypeTable)
+
+    resp = client.get("/model-management/api/random_type_table")
+    row = resp.json["data"][0]
+    assert set(row) == {col.name for col in RandomTypeTable.__table__.columns}
+    assert row["id"] == 1
+    assert row["boolean"] is True
+    assert row["integer"] == 420
+    assert row["float"] == 0.123456789
+    assert row["date"] == "2020-11-20"
+    assert row["datetime"] == "2000-06-25T20:30:50.000010"
+    assert row["interval"] == 86402.004003
+    assert isinstance(row["numeric"], str)
+
+
+def test_read_columnar(client_factory):
+    client = client_factory(User)
+
+    resp = client.get("/model-management/api/user?orient=columns")
+    assert resp.json["data"]["id"] == [1, 2, 3]
+    assert resp.json["data"]["is_admin"] == [True, False, False]
+
+
+def test_read_projection(client_factory):
+    client = client_factory(User)
+
+    resp = client.get("/model-management/api/user?columns=id,first_name")
+    assert resp.json["data"][0] == {"id": 1, "first_name": "hello"}
+
+    args = dict(datatables_args(["id", "last_name"]), columns="id,last_name")
+    resp = client.get("/model-management/api/user", query_string=args)
+    assert resp.json["data"] == [{"id": 1, "last_name": "world"}, {"id": 2, "last_name": "world"}]
+
+    resp = client.get("/model-management/api/user/export?format=csv&columns=first_name")
+    assert resp.data.decode().splitlines() == ["first_name", "hello", "goodbye", "another"]
+
+    resp = client.get("/model-management/api/user?columns=id,password")
+    assert not resp.json["success"]
+
+
+def test_read_page_search_is_opt_in(client_factory):
+    client = client_factory(User)
+    columns = [col.name for col in User.__table__.columns]
+
+    args = datatables_args(columns, search="nothing matches this")
+    resp = client.get("/model-management/api/user", query_string=args)
+    assert resp.json["recordsFiltered"] == 3
+    # so the table doesn't show a search box
+    assert b'"searching": false' in client.get("/model-management/user/read").data
+
+    client = client_factory(User, searchable_columns=["first_name"])
+    assert b'"searching": true' in client.get("/model-management/user/read").data
+
+
+@pytest.mark.parametrize(
+    "filters, expected",
+    [
+        ({"filter_id__gt": 1}, [2, 3]),
+        ({"filter_id__le": 2}, [1, 2]),
+        ({"filter_id__between": "2,3"}, [2, 3]),
+        ({"filter_id__in": "1,3"}, [1, 3]),
+        ({"filter_first_name__startswith": "go"}, [2]),
+        # a range, not LIKE, so it is case-sensitive and has no wildcards
+        ({"filter_first_name__startswith": "Go"}, []),
+        ({"filter_first_name__startswith": "%o"}, []),
+        ({"filter_first_name__in": "hello,another"}, [1, 3]),
+        ({"filter_first_name__null": "false", "filter_id__lt": 3}, [1, 2]),
+        ({"filter_first_name__null": "true"}, []),
+    ],
+)
+def test_filter_operators(client_factory, filters, expected):
+    client = client_factory(User)
+
+    resp = client.get("/model-management/api/user", query_string=filters)
+    assert [row["id"] for row in resp.json["data"]] == expected
+
+
+def test_filter_operators_validated(client_factory):
+    client = client_factory(User)
+
+    for filters in ({"filter_id__between": "1"}, {"filter_id__in": "1,a"}):
+        resp = client.get("/model-management/api/user", query_string=filters)
+        assert not resp.json["success"]
+
+    # searching inside text is opt in
+    resp = client.get("/model-management/api/user?filter_first_name__contains=ell")
+    assert len(resp.json["data"]) == 3
+
+
+def test_filter_operators_searchable(client_factory):
+    client = client_factory(User, searchable_columns=["first_name"])
+    resp = client.get("/model-management/api/user?filter_first_name__contains=ell")
+    assert [row["id"] for row in resp.json["data"]] == [1]
+
+
+def test_filter_operators_update(client_factory):
+    client = client_factory(User)
+
+    data = {"filter_id__ge": 2, "insert_last_name": "changed"}
+    resp = client.put("/model-management/api/user", data=data)
+    assert resp.json["count"] == 2
+
+
+def page_total(client):
+    resp = client.get("/model-management/api/user", query_string={"draw": 1})
+    return resp.json["recordsTotal"], resp.json["recordsEstimated"]
+
+
+def test_count_estimate(client_factory):
+    client = client_factory(User, count_strategy="estimate")
+
+    # without statistics the count is exact
+    assert page_total(client) == (3, False)
+
+    with client.application.app_context():
+        db.session.execute(text("ANALYZE"))
+        db.session.commit()
+    assert page_total(client) == (3, True)
+
+    resp = client.get("/model-management/user/")
+    assert "entries: ~3" in resp.data.decode()
+
+
+def test_count_cached(client_factory):
+    client = client_factory(User, count_strategy="cached")
+    assert page_total(client) == (3, False)
+
+    # writes from outside the extension aren't seen until the ttl runs out
+    with client.application.app_context():
+        db.session.add(User(first_name="outside"))
+        db.session.commit()
+    assert page_total(client) == (3, False)
+
+    # but writes through it invalidate the count
+    client.post("/model-management/api/user", data={"insert_first_name": "inside"})
+    assert page_total(client) == (5, False)
+
+    # every filter has its own count, only the most recently used are kept
+    counter = client.application.extensions["model_management"].counter
+    counter.max_size = 2
+    for id in (1, 2, 3):
+        client.get("/model-management/api/user", query_string={"draw": 1, "filter_id__gt": id})
+    assert len(counter._cache) == 2
+
+
+def read_first_names(client):
+    resp = client.get("/model-management/api/user", query_string={"columns": "first_name"})
+    return sorted(row["first_name"] for row in resp.json["data"])
+
+
+@pytest.mark.parametrize(
+    "cache", [True, ResultCache(LocalCache(max_size=2)), ResultCache(RedisCache(LocalCache()))]
+)
+def test_result_cache(client_factory, cache):
+    client = client_factory(User, manager_kwargs={"cache": cache})
+    names = read_first_names(client)
+    assert len(names) == 3
+
+    # writes from outside the extension aren't seen until the ttl runs out
+    with client.application.app_context():
+        db.session.add(User(first_name="outside"))
+        db.session.commit()
+    assert read_first_names(client) == names
+
+    # but writes through it invalidate the table's cached reads
+    client.post("/model-management/api/user", data={"insert_first_name": "inside"})
+    assert read_first_names(client) == sorted(names + ["inside", "outside"])
+
+    resp = client.get("/model-management/api/user", query_string={"draw": 7})
+    assert resp.json["draw"] == 7
+    resp = client.get("/model-management/api/user", query_string={"draw": 8})
+    assert resp.json["draw"] == 8
+    assert resp.json["recordsTotal"] == 5
+
+    stats = client.application.extensions["model_management"].cache.summary()
+    assert stats == [{"table": "user", "hits": 2, "misses": 3, "ratio": 0.4}]
+    assert client.get("/model-management/stats").status_code == 200
+
+
+def test_local_cache_evicts_least_recently_used():
+    cache = LocalCache(max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (1, None, 3)
+
+    cache.set("d", 4, ex=-1)
+    assert cache.get("d") is None
+
+
+def test_async_reads(client_factory, sqlalchemy_url):
+    pytest.importorskip("asgiref")
+    pytest.importorskip("aiosqlite")
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    url = sqlalchemy_url.replace("sqlite:", "sqlite+aiosqlite:")
+    # each async view runs on its own event loop, a pooled connection can't move between them
+    with pytest.raises(ValueError):
+        ModelManagement(async_engine=create_async_engine(url))
+
+    async_engine = create_async_engine(url, poolclass=NullPool)
+    client = client_factory(
+        User, manager_kwargs={"async_engine": async_engine, "etags": True}, fingerprint="id"
+    )
+
+    resp = client.get("/model-management/api/user", query_string={"filter_id__gt": 1})
+    assert [row["id"] for row in resp.json["data"]] == [2, 3]
+
+    resp = client.get("/model-management/api/user", query_string={"draw": 1, "length": 2})
+    assert resp.json["recordsTotal"] == 3
+    assert [row["id"] for row in resp.json["data"]] == [1, 2]
+
+    resp = client.get("/model-management/api/user/2")
+    assert resp.json["data"]["id"] == 2
+    assert client.get("/model-management/api/user/9").status_code == 404
+
+    # the fingerprint of an async view is read on the async engine
+    resp = client.get(
+        "/model-management/api/user/2", headers={"If-None-Match": resp.headers["ETag"]}
+    )
+    assert resp.status_code == 304
+
+    # writes stay on the sync session
+    client.post("/model-management/api/user", data={"insert_first_name": "async"})
+    resp = client.get("/model-management/api/user", query_string={"draw": 1})
+    assert resp.json["recordsTotal"] == 4
+
+
+def test_read_replica(client_factory, sqlalchemy_url):
+    replica = create_engine(sqlalchemy_url.replace(".db", ".replica.db"))
+    db.metadata.create_all(replica)
+    with Session(replica) as session:
+        session.add(User(first_name="replica"))
+        session.commit()
+
+    client = client_factory(User, manager_kwargs={"read_bind": replica})
+    assert read_first_names(client) == ["replica"]
+    assert page_total(client) == (1, False)
+    assert "entries: 1" in client.get("/model-management/user/").data.decode()
+
+    # after a write the client reads its own writes from the primary for a while
+    resp = client.post("/model-management/api/user", data={"insert_first_name": "primary"})
+    assert READ_PRIMARY_COOKIE in resp.headers["Set-Cookie"]
+    assert page_total(client) == (4, False)
+
+    client.delete_cookie(READ_PRIMARY_COOKIE, path="/model-management")
+    assert page_total(client) == (1, False)
+
+
+def test_read_replica_cache(client_factory, sqlalchemy_url):
+    replica = create_engine(sqlalchemy_url.replace(".db", ".replica.db"))
+    db.metadata.create_all(replica)
+    client = client_factory(
+        User, manager_kwargs={"read_bind": replica, "cache": True, "etags": True}
+    )
+    url = "/model-management/api/user"
+    assert read_first_names(client) == []
+    assert "ETag" in client.get(url).headers
+
+    # the writer reads the primary, neither from the cache nor with an ETag
+    client.post(url, data={"insert_first_name": "primary"})
+    assert "primary" in read_first_names(client)
+    assert "ETag" not in client.get(url).headers
+
+    # reads of the lagging replica right after the write aren't cached either
+    client.delete_cookie(READ_PRIMARY_COOKIE, path="/model-management")
+    assert read_first_names(client) == []
+    assert "ETag" not in client.get(url).headers
+    manager = client.application.extensions["model_management"]
+    assert manager.cache.summary()[0]["hits"] == 0
+
+
+def test_max_rows(client_factory):
+    client = client_factory(User, limits=Limits(max_rows=2))
+
+    resp = client.get("/model-management/api/user")
+    assert resp.json["success"] is False
+    assert "More than 2 entries" in resp.json["message"]
+
+    resp = client.get("/model-management/api/user", query_string={"filter_id__gt": 1})
+    assert len(resp.json["data"]) == 2
+
+    resp = client.get("/model-management/api/user", query_string={"draw": 1, "length": 3})
+    assert resp.json["success"] is False
+    resp = client.get("/model-management/api/user", query_string={"draw": 1, "length": 2})
+    assert len(resp.json["data"]) == 2
+
+
+@pytest.mark.parametrize("orm_events", [False, True])
+def test_max_affected(client_factory, orm_events):
+    client = client_factory(
+        User, manager_kwargs={"limits": Limits(max_affected=1)}, orm_events=orm_events
+    )
+
+    resp = client.delete("/model-management/api/user", data={"dry_run": "true"})
+    assert resp.json["dry_run"] is True
+    assert (resp.json["count"], resp.json["max_affected"]) == (3, 1)
+
+    resp = client.delete("/model-management/api/user")
+    assert resp.json["success"] is False
+    assert "3 entries match" in resp.json["message"]
+    assert page_total(client) == (3, False)
+
+    resp = client.delete("/model-management/api/user", data={"filter_id": 1})
+    assert resp.json["count"] == 1
+    assert page_total(client) == (2, False)
+
+
+def test_statement_timeout(sqlalchemy_url):
+    engine = create_engine(sqlalchemy_url)
+    endless = text(
+        "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c) SELECT count(*) FROM c"
+    )
+    with Session(engine) as session:
+        with pytest.raises(StatementTimeout):
+            with statement_timeout(session, 0.05):
+                session.execute(endless)
+
+        # the connection is usable again afterwards
+        session.rollback()
+        assert session.execute(text("SELECT 1")).scalar() == 1
+
+
+def test_stream_statement_timeout(client_factory, monkeypatch):
+    handlers = []
+    set_progress_handler = limits.set_progress_handler
+
+    def record(session, handler):
+        handlers.append(handler)
+        set_progress_handler(session, handler)
+
+    monkeypatch.setattr(limits, "set_progress_handler", record)
+    client = client_factory(User)
+    with client.application.app_context():
+        rows = CRUD(User, Limits(statement_timeout=5)).stream({})
+        # the rows are fetched as the export is sent, so it stays bounded until they're done
+        assert handlers[-1] is not None
+        assert len(list(rows)) == 3
+        assert handlers[-1] is None
+
+
+def test_async_statement_timeout(sqlalchemy_url):
+    pytest.importorskip("aiosqlite")
+    import asyncio
+    from sqlalchemy.ext.asyncio import AsyncSession
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from flask_model_management.async_crud import run_sync
+
+    engine = create_async_engine(sqlalchemy_url.replace("sqlite:", "sqlite+aiosqlite:"))
+    endless = text(
+        "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c) SELECT count(*) FROM c"
+    )
+
+    async def read():
+        async with AsyncSession(engine) as session:
+            await run_sync(session, 0.05, lambda session: session.execute(endless).scalar())
+
+    with pytest.raises(StatementTimeout):
+        asyncio.run(read())
+
+
+def wait_for_job(client, job_id):
+    client.application.extensions["model_management"].jobs._futures[job_id].result(timeout=10)
+    return client.get(f"/model-management/api/user/jobs/{job_id}").json["job"]
+
+
+def test_job(client_factory):
+    client = client_factory(User)
+    resp = client.post(
+        "/model-management/api/user/jobs",
+        data={
+            "operation": "update",
+            "chunk_size": 1,
+            "filter_id__gt": 1,
+            "insert_last_name": "chunked",
+        },
+    )
+    assert resp.json["job"]["status"] == "running"
+
+    job = wait_for_job(client, resp.json["job"]["id"])
+    assert (job["status"], job["count"], job["last_key"]) == ("done", 2, "3")
+
+    resp = client.get("/model-management/api/user", query_string={"filter_last_name": "chunked"})
+    assert [row["id"] for row in resp.json["data"]] == [2, 3]
+
+    resp = client.get("/model-management/api/user/jobs")
+    assert [job["id"] for job in resp.json["data"]] == [job["id"]]
+    assert datetime.fromisoformat(job["updated_at"]).tzinfo == timezone.utc
+
+    # only the operations the model allows
+    client.application.extensions["model_management"].models["user"].excluded_operations = [
+        "delete"
+    ]
+    resp = client.post("/model-management/api/user/jobs", data={"operation": "delete"})
+    assert resp.json["message"] == "Jobs can only update user"
+
+
+def test_job_resume(client_factory):
+    client = client_factory(User)
+    manager = client.application.extensions["model_management"]
+
+    # a job whose worker stopped after deleting the first entry
+    job = Job("user", "delete", MultiDict(), chunk_size=1, status="running", last_key="1")
+    with client.application.app_context():
+        manager.job_store.add(job)
+
+    resp = client.post(f"/model-management/api/user/jobs/{job.id}/cancel")
+    assert resp.json["job"]["status"] == "cancelled"
+
+    resp = client.post(f"/model-management/api/user/jobs/{job.id}/resume")
+    assert resp.json["success"] is True
+    job = wait_for_job(client, job.id)
+    assert (job["status"], job["count"]) == ("done", 2)
+    assert read_first_names(client) == ["hello"]
+
+    resp = client.post(f"/model-management/api/user/jobs/{job['id']}/resume")
+    assert resp.json["success"] is False
+
+
+def test_job_resume_lease(client_factory):
+    client = client_factory(User, manager_kwargs={"job_lease": 60})
+    manager = client.application.extensions["model_management"]
+    url = "/model-management/api/user/jobs"
+
+    # running on another worker, which saved progress recently
+    job = Job("user", "delete", MultiDict(), chunk_size=1, status="running", last_key="1")
+    with client.application.app_context():
+        manager.job_store.add(job)
+    resp = client.post(f"{url}/{job.id}/resume")
+    assert resp.json["success"] is False
+    assert "is running" in resp.json["message"]
+
+    # its worker stopped, a resume takes the job over and the old runner can't save
+    stale = Job(
+        "user",
+        "delete",
+        MultiDict(),
+        chunk_size=1,
+        status="running",
+        last_key="1",
+        updated_at=datetime.now(timezone.utc) - timedelta(seconds=61),
+    )
+    with client.application.app_context():
+        manager.job_store.add(stale)
+    assert client.post(f"{url}/{stale.id}/resume").json["success"] is True
+    assert wait_for_job(client, stale.id)["status"] == "done"
+    with client.application.app_context():
+        assert not manager.job_store.save_progress(stale)
+
+
+def test_static_assets(client_factory):
+    client = client_factory(User)
+    page = client.get("/model-management/").data.decode()
+    url = re.search(r'src="(/model-management/static/js/app.js\?v=\w+)"', page).group(1)
+
+    resp = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert resp.headers["Cache-Control"] == "public, max-age=31536000, immutable"
+    assert resp.headers["Content-Encoding"] == "gzip"
+    assert b"getFormData" in gzip.decompress(resp.data)
+
+    resp = client.get("/model-management/static/js/app.js")
+    assert resp.headers["Cache-Control"] == "no-cache"
+    assert "Content-Encoding" not in resp.headers
+    resp = client.get(
+        "/model-management/static/js/app.js", headers={"If-None-Match": resp.headers["ETag"]}
+    )
+    assert resp.status_code == 304
+
+    assert client.get("/model-management/static/../manager.py").status_code == 404
+    assert client.get("/model-management/static/js/missing.js").status_code == 404
+
+
+def test_page_cache(client_factory):
+    client = client_factory(User)
+    model = client.application.extensions["model_management"].models["user"]
+
+    first = client.get("/model-management/user/read").data
+    assert client.get("/model-management/user/read").data == first
+    assert ("read", "") in model._pages
+
+    # a prefilled form isn't cached
+    resp = client.get("/model-management/user/update", query_string={"filter_id": 1})
+    assert resp.status_code == 200
+    assert not any(key[0] == "update" for key in model._pages)
+
+
+def test_page_cache_flashes(client_factory):
+    client = client_factory(User)
+    app = client.application
+
+    @app.route("/flash")
+    def flash_message():
+        flash("only for this visitor")
+        return ""
+
+    client.get("/flash")
+    assert b"only for this visitor" in client.get("/model-management/user/read").data
+    other = app.test_client()
+    assert b"only for this visitor" not in other.get("/model-management/user/read").data
+    assert b"only for this visitor" not in client.get("/model-management/user/read").data
+
+
+def test_register_base(client_factory):
+    client = client_factory()
+    manager = client.application.extensions["model_management"]
+    manager.register_base(db, searchable_columns=["first_name"])
+    assert manager.models == {}
+
+    page = client.get("/model-management/").data.decode()
+    assert all(name in page for name in ("address", "random_type_table", "user"))
+    page = client.get("/model-management/", query_string={"q": "ADD"}).data.decode()
+    assert "models: 1" in page
+    assert manager.models == {}
+
+    assert client.get("/model-management/user/").status_code == 200
+    assert list(manager.models) == ["user"]
+    assert manager.models["user"].searchable_columns == ["first_name"]
+    assert client.get("/model-management/missing/").status_code == 404
+
+
+def test_register_metadata(client_factory):
+    metadata = MetaData()
+    Table("note", metadata, Column("id", Integer, primary_key=True), Column("body", String))
+    Table("no_primary_key", metadata, Column("body", String))
+
+    client = client_factory()
+    manager = client.application.extensions["model_management"]
+    manager.register_base(metadata)
+    assert manager.tablenames == ["note"]
+
+    with client.application.app_context():
+        metadata.create_all(db.engine)
+    client.post("/model-management/api/note", data={"insert_body": "lazy"})
+    resp = client.get("/model-management/api/note")
+    assert resp.json["data"] == [{"id": 1, "body": "lazy"}]
+
+
+def test_reference_labels(client_factory):
+    client = client_factory(Address, reference_labels={"user_id": "first_name"})
+    resp = client.get("/model-management/api/address", query_string={"draw": 1, "length": 10})
+    # the fixture's addresses reference users 0 (missing), 1 and 2
+    assert resp.json["labels"] == {"user_id": {"1": "hello", "2": "goodbye"}}
+
+    resp = client.get(
+        "/model-management/api/address",
+        query_string={"draw": 1, "columns": "id,email_address"},
+    )
+    assert resp.json["labels"] == {}
+
+    model = client.application.extensions["model_management"].models["address"]
+    assert model.references["user_id"].label.name == "first_name"
+    # user has no indexed text column, looking entries up by an unindexed one would scan
+    assert Model(Address).references["user_id"].label is None
+
+
+def test_reference_autocomplete(client_factory):
+    client = client_factory(Address, reference_labels={"user_id": "first_name"})
+    url = "/model-management/api/address/references/user_id"
+    resp = client.get(url, query_string={"q": "go"})
+    assert resp.json["data"] == [{"value": 2, "label": "goodbye"}]
+    resp = client.get(url, query_string={"limit": 2})
+    assert [entry["label"] for entry in resp.json["data"]] == ["another", "goodbye"]
+
+    assert client.get("/model-management/api/address/references/email_address").status_code == 404
+    page = client.get("/model-management/address/create").data.decode()
+    assert f'data-autocomplete="{url}"' in page
+
+    # without a label the entries are matched on their key
+    client = client_factory(Address)
+    assert client.get(url, query_string={"q": "2"}).json["data"] == [{"value": 2, "label": "2"}]
+    assert client.get(url, query_string={"q": "go"}).json["data"] == []
+
+
+def test_indexed_columns():
+    model = Model(User)
+    assert [column.name for column in model.columns if column.indexed] == ["id"]
+    form = model.form_class("update")
+    assert form.filter_id.kwargs["description"] == "indexed"
+    assert form.filter_id__gt.kwargs["description"] == "indexed"
+    assert form.filter_first_name.kwargs["description"] == ""
+    assert form.insert_id.kwargs["description"] == ""
+
+
+def test_explain(client_factory):
+    client = client_factory(User)
+    url = "/model-management/api/user/explain"
+    resp = client.get(url, query_string={"filter_first_name": "hello"})
+    assert resp.json["success"]
+    assert resp.json["dialect"] == "sqlite"
+    assert resp.json["full_scan"]
+    assert "WHERE" in resp.json["statement"]
+
+    resp = client.get(url, query_string={"operation": "delete", "filter_id": 1})
+    assert resp.json["lines"] and not resp.json["full_scan"]
+    resp = client.get(
+        url,
+        query_string={"operation": "update", "filter_id__gt": 1, "insert_last_name": "x"},
+    )
+    assert resp.json["statement"].startswith("UPDATE")
+    # nothing was run
+    assert len(client.get("/model-management/api/user").json["data"]) == 3
+    assert (
+        client.get("/model-management/api/user", query_string={"filter_last_name": "x"}).json[
+            "data"
+        ]
+        == []
+    )
+    assert not client.get(url, query_string={"operation": "create"}).json["success"]
+
+
+def test_unindexed_filter_rows(client_factory):
+    client = client_factory(User, manager_kwargs={"limits": Limits(unindexed_filter_rows=2)})
+    resp = client.get("/model-management/api/user", query_string={"filter_first_name": "hello"})
+    assert not resp.json["success"]
+    assert "filter it on an indexed column: id" in resp.json["message"]
+    resp = client.put(
+        "/model-management/api/user",
+        data={"filter_last_name": "world", "insert_is_admin": "true"},
+    )
+    assert not resp.json["success"]
+
+    query = {"filter_id__le": 2, "filter_first_name": "hello"}
+    resp = client.get("/model-management/api/user", query_string=query)
+    assert [row["id"] for row in resp.json["data"]] == [1]
+    # explaining is how the cost of a refused filter can be seen
+    resp = client.get("/model-management/api/user/explain", query_string={"filter_first_name": "x"})
+    assert resp.json["success"]
+
+    client = client_factory(User, manager_kwargs={"limits": Limits(unindexed_filter_rows=10)})
+    resp = client.get("/model-management/api/user", query_string={"filter_first_name": "hello"})
+    assert resp.json["success"]
+
+
+def test_batch(client_factory):
+    client = client_factory(User)
+    client.application.extensions["model_management"].register_model(Address)
+    url = "/model-management/api/_batch"
+    operations = [
+        {"tablename": "user", "operation": "create", "insert": {"first_name": "batch"}},
+        {
+            "tablename": "address",
+            "operation": "update",
+            "filter": {"user_id": 1},
+            "insert": {"email_address": "batch@mail.com"},
+        },
+        {"tablename": "user", "operation": "delete", "filter": {"first_name": "another"}},
+    ]
+    resp = client.post(url, json=operations, query_string={"dry_run": "true"})
+    assert resp.json["success"] and resp.json["dry_run"]
+    assert [result.get("count") for result in resp.json["results"]] == [None, 1, 1]
+    assert len(client.get("/model-management/api/user").json["data"]) == 3
+
+    resp = client.post(url, json=operations)
+    assert resp.json["success"]
+    assert resp.json["results"][0]["data"]["first_name"] == "batch"
+    users = client.get("/model-management/api/user").json["data"]
+    assert [user["first_name"] for user in users] == ["hello", "goodbye", "batch"]
+    resp = client.get("/model-management/api/address", query_string={"filter_user_id": 1})
+    assert resp.json["data"][0]["email_address"] == "batch@mail.com"
+
+    # the second operation breaks a constraint so the first isn't kept either
+    resp = client.post(
+        url,
+        json=[
+            {"tablename": "user", "operation": "delete", "filter": {"first_name": "hello"}},
+            {"tablename": "address", "operation": "create", "insert": {"user_id": 1}},
+        ],
+    )
+    assert not resp.json["success"]
+    assert resp.json["message"].startswith("Operation 1 failed, nothing was changed")
+    assert len(client.get("/model-management/api/user").json["data"]) == 3
+
+    resp = client.post(
+        url,
+        json=[
+            {"tablename": "missing", "operation": "create"},
+            {"tablename": "user", "operation": "read"},
+            {"tablename": "user", "operation": "update", "filter": {"id": "one"}},
+        ],
+    )
+    assert [error["index"] for error in resp.json["errors"]] == [0, 1, 2]
+    assert not client.post(url, json={"tablename": "user"}).json["success"]
+
+
+def test_etags(client_factory):
+    client = client_factory(User, manager_kwargs={"etags": True})
+    url = "/model-management/api/user"
+    resp = client.get(url)
+    etag = resp.headers["ETag"]
+    assert resp.headers["Cache-Control"] == "no-cache"
+    assert "Last-Modified" in resp.headers
+
+    last_modified = resp.headers["Last-Modified"]
+    resp = client.get(url, headers={"If-None-Match": etag})
+    assert resp.status_code == 304
+    assert resp.data == b""
+    assert resp.headers["ETag"] == etag
+    assert resp.headers["Last-Modified"] == last_modified
+    assert resp.headers["Cache-Control"] == "no-cache"
+    assert client.get(f"{url}/1", headers={"If-None-Match": etag}).status_code == 200
+    assert client.get(url, query_string={"filter_id": 1}).headers["ETag"] != etag
+
+    client.post(url, data={"insert_first_name": "new"})
+    resp = client.get(url, headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    assert resp.headers["ETag"] != etag
+    assert len(resp.json["data"]) == 4
+
+    # pages without `draw` have the same url until their rows change
+    resp = client.get(url, query_string={"start": 0, "length": 2})
+    assert "draw" not in resp.json
+    resp = client.get(
+        url,
+        query_string={"start": 0, "length": 2},
+        headers={"If-None-Match": resp.headers["ETag"]},
+    )
+    assert resp.status_code == 304
+
+    resp = client.get(url, query_string={"filter_id": "one"})
+    assert not resp.json["success"] and "ETag" not in resp.headers
+
+
+def test_etags_read_page(client_factory):
+    client = client_factory(User, manager_kwargs={"etags": True})
+    assert b"cache: true" in client.get("/model-management/user/read").data
+
+    # the params the read page sends, `_` is only there if jquery's cache is turned off
+    columns = [col.name for col in User.__table__.columns]
+    args = datatables_args(columns)
+    del args["draw"]
+    args["columns"] = ",".join(columns)
+    url = "/model-management/api/user"
+    etag = client.get(url, query_string=dict(args, _=1)).headers["ETag"]
+    resp = client.get(url, query_string=dict(args, _=2), headers={"If-None-Match": etag})
+    assert resp.status_code == 304
+
+
+def test_etags_fingerprint(client_factory):
+    client = client_factory(User, fingerprint="count")
+    url = "/model-management/api/user"
+    etag = client.get(url).headers["ETag"]
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+    # a write made outside this extension
+    with client.application.app_context():
+        db.session.add(User(first_name="outside"))
+        db.session.commit()
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_etags_processes(client_factory):
+    url = "/model-management/api/user"
+    # versions kept in one process could go stale, so they aren't used by default
+    client = client_factory(User)
+    assert "ETag" not in client.get(url).headers
+
+    # two apps, like two workers, sharing a redis-like cache backend
+    backend = RedisCache(LocalCache())
+    first, second = [
+        client_factory(User, manager_kwargs={"cache": ResultCache(backend)}) for _ in range(2)
+    ]
+    etag = second.get(url).headers["ETag"]
+    assert first.get(url).headers["ETag"] == etag
+    assert second.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+    first.post(url, data={"insert_first_name": "new"})
+    assert second.get(url, headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_msgpack(client_factory):
+    msgpack = pytest.importorskip("msgpack")
+    client = client_factory(User)
+    url = "/model-management/api/user"
+
+    resp = client.get(url, headers={"Accept": "application/msgpack"})
+    assert resp.mimetype == "application/msgpack"
+    assert "Accept" in resp.vary
+    result = msgpack.unpackb(resp.data)
+    assert result["success"]
+    assert [row["first_name"] for row in result["data"]] == ["hello", "goodbye", "another"]
+
+    resp = client.get(f"{url}/export?format=msgpack")
+    rows = list(msgpack.Unpacker(io.BytesIO(resp.data)))
+    assert [row["id"] for row in rows] == [1, 2, 3]
+
+    # json stays the default for anything else
+    assert client.get(url, headers={"Accept": "*/*"}).mimetype == "application/json"
+
+
+def test_arrow(client_factory):
+    pyarrow = pytest.importorskip("pyarrow")
+    client = client_factory(RandomTypeTable)
+    accept = {"Accept": "application/vnd.apache.arrow.stream"}
+
+    resp = client.get("/model-management/api/random_type_table", headers=accept)
+    assert resp.mimetype == "application/vnd.apache.arrow.stream"
+    table = pyarrow.ipc.open_stream(resp.data).read_all()
+    assert table.num_rows > 0
+    types = {field.name: str(field.type) for field in table.schema}
+    assert types["big_integer"] == "int64"
+    assert types["boolean"] == "bool"
+    assert types["date"] == "date32[day]"
+    assert types["datetime"] == "timestamp[us]"
+    assert types["interval"] == "duration[us]"
+    assert types["large_binary"] == "binary"
+    # decimals are text, like in json, so no precision is lost
+    assert types["numeric"] == "string"
+
+    resp = client.get("/model-management/api/random_type_table/export", headers=accept)
+    assert pyarrow.ipc.open_stream(resp.data).read_all().equals(table)
+
+    resp = client.get("/model-management/api/random_type_table?columns=id", headers=accept)
+    assert pyarrow.ipc.open_stream(resp.data).read_all().column_names == ["id"]
+
+    # a page has its counts, so it is sent as json
+    resp = client.get("/model-management/api/random_type_table?start=0&length=1", headers=accept)
+    assert resp.mimetype == "application/json"
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "zstd"])
+def test_compressed_responses(client_factory, encoding):
+    if encoding == "zstd":
+        zstandard = pytest.importorskip("zstandard")
+
+        def decompress(data):
+            # a streamed response's frame doesn't say its size up front
+            return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+
+    else:
+        decompress = gzip.decompress
+    client = client_factory(User, manager_kwargs={"etags": True})
+    url = "/model-management/api/user"
+    client.post(f"{url}/bulk", json=[{"first_name": f"user {i}"} for i in range(100)])
+
+    resp = client.get(url, headers={"Accept-Encoding": encoding})
+    assert resp.content_encoding == encoding
+    assert "Accept-Encoding" in resp.vary
+    assert len(json.loads(decompress(resp.data))["data"]) == 103
+    etag = resp.headers["ETag"]
+    assert etag.endswith(f'-{encoding}"')
+    resp = client.get(url, headers={"Accept-Encoding": encoding, "If-None-Match": etag})
+    assert resp.status_code == 304
+
+    resp = client.get(f"{url}/export", headers={"Accept-Encoding": encoding})
+    assert resp.content_encoding == encoding
+    assert len(decompress(resp.data).decode().splitlines()) == 103
+
+    # small responses aren't worth compressing
+    resp = client.get(f"{url}/1", headers={"Accept-Encoding": encoding})
+    assert resp.content_encoding is None
+
+
+@pytest.mark.parametrize("orm_events", [False, True])
+def test_batch_unindexed_filter_rows(client_factory, monkeypatch, orm_events):
+    client = client_factory(User, manager_kwargs={"limits": Limits(unindexed_filter_rows=100)})
+    manager = client.application.extensions["model_management"]
+    manager.register_model(Address, orm_events=orm_events)
+    checked = []
+    check_indexed = CRUD.check_indexed
+    monkeypatch.setattr(
+        CRUD, "check_indexed", lambda *args: checked.append(args[1]) or check_indexed(*args)
+    )
+    url = "/model-management/api/_batch"
+    update = {
+        "tablename": "address",
+        "operation": "update",
+        "filter": {"email_address": "nobody@mail.com"},
+        "insert": {"email_address": "batch@mail.com"},
+    }
+    resp = client.post(
+        url,
+        json=[{"tablename": "user", "operation": "create", "insert": {"first_name": "b"}}, update],
+    )
+    assert resp.json["success"]
+    # the filters are checked once, when the batch is parsed
+    assert checked == [update["filter"]]
+    users = client.get("/model-management/api/user").json["data"]
+    assert users[-1]["first_name"] == "b"
+
+    # refused before anything is run
+    manager.limits = Limits(unindexed_filter_rows=0)
+    resp = client.post(
+        url,
+        json=[{"tablename": "user", "operation": "create", "insert": {"first_name": "c"}}, update],
+    )
+    assert [error["index"] for error in resp.json["errors"]] == [1]
+    assert len(client.get("/model-management/api/user").json["data"]) == len(users)